@@ -0,0 +1,313 @@
+"""
+Incrementally maintained sales and scan rollups for the organizer dashboard
+
+Summing ``orders`` and ``verification_logs`` for every dashboard load
+grows with the tables. Instead, the transaction that writes a row also
+adds it to small rollup tables (migration 8):
+
+- ``sales_rollup`` -- orders, tickets and revenue (gwei) per event, seat
+  type, hour and order status, and ``sales_totals``, the same without the
+  hour, so an event's totals are a handful of primary-key rows
+- ``scan_rollup`` / ``scan_totals`` -- valid and invalid scans per event
+  (per hour, and in total). Scans of a token id no ticket has are counted
+  under event 0. The event is stored on the log row when the scan is
+  written (migration 10), so a token minted later does not move its
+  earlier scans
+
+Purchases add a pending order. Confirmation and hold expiry move it to
+``confirmed`` or ``failed`` under the hour it was created. Each flush of
+the verification log adds its scans. A ``Rollup`` collects these deltas
+for one transaction and merges them per key, so a batch of 500 scans
+costs one upsert per event and hour rather than 500.
+
+``Repository.check_analytics`` recomputes every rollup from the raw
+tables (expected_rollups) and lists the keys that differ, or rebuilds them;
+``python analytics.py --check [--repair]`` runs it from the shell. Workers
+of an older release do not maintain the rollups, so run it with
+``--repair`` after a rolling upgrade.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+UPSERT_SALES = """
+    INSERT INTO sales_rollup (event_id, seat_type, hour, status, orders, tickets, revenue_gwei)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (event_id, seat_type, hour, status) DO UPDATE SET
+        orders = sales_rollup.orders + excluded.orders,
+        tickets = sales_rollup.tickets + excluded.tickets,
+        revenue_gwei = sales_rollup.revenue_gwei + excluded.revenue_gwei
+"""
+
+UPSERT_SALES_TOTALS = """
+    INSERT INTO sales_totals (event_id, seat_type, status, orders, tickets, revenue_gwei)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (event_id, seat_type, status) DO UPDATE SET
+        orders = sales_totals.orders + excluded.orders,
+        tickets = sales_totals.tickets + excluded.tickets,
+        revenue_gwei = sales_totals.revenue_gwei + excluded.revenue_gwei
+"""
+
+UPSERT_SCANS = """
+    INSERT INTO scan_rollup (event_id, hour, valid, invalid)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (event_id, hour) DO UPDATE SET
+        valid = scan_rollup.valid + excluded.valid,
+        invalid = scan_rollup.invalid + excluded.invalid
+"""
+
+UPSERT_SCAN_TOTALS = """
+    INSERT INTO scan_totals (event_id, valid, invalid)
+    VALUES (?, ?, ?)
+    ON CONFLICT (event_id) DO UPDATE SET
+        valid = scan_totals.valid + excluded.valid,
+        invalid = scan_totals.invalid + excluded.invalid
+"""
+
+# The hourly rollups recomputed from the raw tables, in the rollup's columns
+SALES_FROM_ORDERS = """
+    SELECT event_id, seat_type, substr(created_at, 1, 13) || ':00:00' AS hour, status,
+           COUNT(*) AS orders, SUM(quantity) AS tickets,
+           CAST(COALESCE(SUM(total_price_gwei), 0) AS BIGINT) AS revenue_gwei
+    FROM orders
+    GROUP BY event_id, seat_type, substr(created_at, 1, 13), status
+"""
+
+# Rows written by a release before migration 10 have no event_id; those
+# fall back to the ticket's event as it is now
+SCANS_FROM_LOGS = """
+    SELECT COALESCE(l.event_id, t.event_id, 0) AS event_id, substr(l.verified_at, 1, 13) || ':00:00' AS hour,
+           CAST(SUM(CASE WHEN l.status = 'valid' THEN 1 ELSE 0 END) AS BIGINT) AS valid,
+           CAST(SUM(CASE WHEN l.status = 'valid' THEN 0 ELSE 1 END) AS BIGINT) AS invalid
+    FROM verification_logs l LEFT JOIN tickets t ON l.event_id IS NULL AND t.token_id = l.token_id
+    GROUP BY COALESCE(l.event_id, t.event_id, 0), substr(l.verified_at, 1, 13)
+"""
+
+# Rollup table -> its columns, key columns first
+ROLLUP_COLUMNS = {
+    "sales_rollup": "event_id, seat_type, hour, status, orders, tickets, revenue_gwei",
+    "sales_totals": "event_id, seat_type, status, orders, tickets, revenue_gwei",
+    "scan_rollup": "event_id, hour, valid, invalid",
+    "scan_totals": "event_id, valid, invalid",
+}
+
+# Leading columns of each rollup row that form its key
+KEY_COLUMNS = {"sales_rollup": 4, "sales_totals": 3, "scan_rollup": 2, "scan_totals": 1}
+
+
+def insert_rows(table: str) -> str:
+    """INSERT of whole rows into a rollup table, for rebuilding it"""
+    columns = ROLLUP_COLUMNS[table]
+    return f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' for _ in columns.split(','))})"
+
+
+def hour_of(timestamp: str) -> str:
+    """The ``YYYY-MM-DD HH:00:00`` bucket of a UTC timestamp string"""
+    return timestamp[:13] + ":00:00"
+
+
+class Rollup:
+    """Rollup deltas of one transaction, merged per key"""
+
+    __slots__ = ("sales", "scans")
+
+    def __init__(self):
+        # (event_id, seat_type, hour, status) -> [orders, tickets, revenue_gwei]
+        self.sales: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+        # (event_id, hour) -> [valid, invalid]
+        self.scans: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+
+    def order(self, order, status: str, sign: int = 1):
+        """Count an order (event_id, seat_type, created_at, quantity, total_price_gwei) under ``status``"""
+        self.sale(order["event_id"], order["seat_type"], order["created_at"], status,
+                  order["quantity"], order["total_price_gwei"], sign)
+
+    def sale(self, event_id: int, seat_type: str, created_at: str, status: str, quantity: int,
+             gwei: Optional[int], sign: int = 1):
+        totals = self.sales[event_id, seat_type, hour_of(created_at), status]
+        totals[0] += sign
+        totals[1] += sign * quantity
+        totals[2] += sign * (gwei or 0)
+
+    def move(self, order, old_status: str, new_status: str):
+        if old_status != new_status:
+            self.order(order, old_status, -1)
+            self.order(order, new_status)
+
+    def revenue(self, order, status: str, gwei: int):
+        """Revenue of an order counted before its price was converted"""
+        self.sales[order["event_id"], order["seat_type"], hour_of(order["created_at"]), status][2] += gwei
+
+    def scan(self, event_id: Optional[int], verified_at: str, valid: bool):
+        self.scans[event_id or 0, hour_of(verified_at)][0 if valid else 1] += 1
+
+    def statements(self) -> List[Tuple[str, List[tuple]]]:
+        """(upsert, rows) to run in the caller's transaction, rows in key order"""
+        sales = sorted(key + tuple(values) for key, values in self.sales.items() if any(values))
+        sales_totals: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+        for event_id, seat_type, _, status, *values in sales:
+            totals = sales_totals[event_id, seat_type, status]
+            for i, value in enumerate(values):
+                totals[i] += value
+        scans = sorted(key + tuple(values) for key, values in self.scans.items() if any(values))
+        scan_totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        for event_id, _, valid, invalid in scans:
+            scan_totals[event_id][0] += valid
+            scan_totals[event_id][1] += invalid
+        return [
+            (sql, rows) for sql, rows in (
+                (UPSERT_SALES, sales),
+                (UPSERT_SALES_TOTALS, sorted(key + tuple(values) for key, values in sales_totals.items())),
+                (UPSERT_SCANS, scans),
+                (UPSERT_SCAN_TOTALS, sorted((key,) + tuple(values) for key, values in scan_totals.items())),
+            ) if rows
+        ]
+
+
+def write_rollup(conn, rollup: Rollup):
+    """Apply a Rollup on a SQLite connection, inside the caller's transaction"""
+    for sql, rows in rollup.statements():
+        conn.executemany(sql, rows)
+
+
+def expected_rollups(sales_rows, scan_rows) -> Dict[str, List[tuple]]:
+    """Every rollup table's rows from SALES_FROM_ORDERS and SCANS_FROM_LOGS rows
+
+    The totals are summed here rather than by a second pass over the raw tables.
+    """
+    sales = [tuple(row) for row in sales_rows]
+    scans = [tuple(row) for row in scan_rows]
+    sales_totals: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+    for event_id, seat_type, _, status, *values in sales:
+        totals = sales_totals[event_id, seat_type, status]
+        for i, value in enumerate(values):
+            totals[i] += value
+    scan_totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for event_id, _, valid, invalid in scans:
+        scan_totals[event_id][0] += valid
+        scan_totals[event_id][1] += invalid
+    return {
+        "sales_rollup": sales,
+        "sales_totals": [key + tuple(values) for key, values in sales_totals.items()],
+        "scan_rollup": scans,
+        "scan_totals": [(key,) + tuple(values) for key, values in scan_totals.items()],
+    }
+
+
+def compare(table: str, expected_rows, stored_rows) -> List[dict]:
+    """Keys whose stored rollup differs from the raw tables (all-zero rows count as absent)"""
+    size = KEY_COLUMNS[table]
+    expected = {tuple(row[:size]): tuple(row[size:]) for row in map(tuple, expected_rows)}
+    stored = {tuple(row[:size]): tuple(row[size:]) for row in map(tuple, stored_rows) if any(row[size:])}
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys(), key=repr):
+        if expected.get(key) != stored.get(key):
+            mismatches.append({"table": table, "key": list(key),
+                               "expected": expected.get(key), "stored": stored.get(key)})
+    return mismatches
+
+
+def totals_queries(event_id: Optional[int] = None) -> List[Tuple[str, List]]:
+    """sales_totals and scan_totals rows of one event, or of every event"""
+    where, params = ("WHERE event_id = ?", [event_id]) if event_id is not None else ("", [])
+    return [
+        (f"""
+            SELECT event_id, seat_type, status, orders, tickets, revenue_gwei FROM sales_totals {where}
+            ORDER BY event_id, seat_type, status
+        """, params),
+        (f"SELECT event_id, valid, invalid FROM scan_totals {where} ORDER BY event_id", params),
+    ]
+
+
+def hourly_queries(event_id: int, since: Optional[str], until: Optional[str]) -> List[Tuple[str, List]]:
+    """sales_rollup and scan_rollup rows of one event with ``since <= hour < until``"""
+    clauses, params = ["event_id = ?"], [event_id]
+    if since is not None:
+        clauses.append("hour >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("hour < ?")
+        params.append(until)
+    where = " AND ".join(clauses)
+    return [
+        (f"""
+            SELECT hour, seat_type, status, orders, tickets, revenue_gwei AS revenue, revenue_gwei AS revenue_wei
+            FROM sales_rollup WHERE {where} ORDER BY hour, seat_type, status
+        """, params),
+        (f"SELECT hour, valid, invalid FROM scan_rollup WHERE {where} ORDER BY hour", params),
+    ]
+
+
+def event_stats(event_id: int, sales_rows, scan_row) -> dict:
+    """Dashboard figures of one event from its sales_totals rows and scan_totals row"""
+    by_seat_type: Dict[str, dict] = {}
+    totals = {"orders": 0, "sold": 0, "pending": 0, "revenue": 0, "revenue_wei": 0}
+    for row in sales_rows:
+        seat = by_seat_type.setdefault(row["seat_type"], {"seat_type": row["seat_type"], "sold": 0, "pending": 0,
+                                                          "revenue": 0, "revenue_wei": 0})
+        if row["status"] == "confirmed":
+            seat["sold"] += row["tickets"]
+            seat["revenue"] += row["revenue_gwei"]
+            seat["revenue_wei"] += row["revenue_gwei"]
+            totals["orders"] += row["orders"]
+            totals["sold"] += row["tickets"]
+            totals["revenue"] += row["revenue_gwei"]
+            totals["revenue_wei"] += row["revenue_gwei"]
+        elif row["status"] == "pending":
+            seat["pending"] += row["tickets"]
+            totals["pending"] += row["tickets"]
+    valid, invalid = (scan_row["valid"], scan_row["invalid"]) if scan_row else (0, 0)
+    return {
+        "event_id": event_id,
+        **totals,
+        "avg_ticket_price": totals["revenue"] // totals["sold"] if totals["sold"] else None,
+        "scans": {
+            "valid": valid,
+            "invalid": invalid,
+            "valid_rate": round(valid / (valid + invalid), 4) if valid + invalid else None,
+            # Scans per ticket sold: above 1 means re-scans at the gate
+            "per_ticket": round(valid / totals["sold"], 4) if totals["sold"] else None,
+        },
+        "seat_types": sorted(by_seat_type.values(), key=lambda seat: seat["seat_type"]),
+    }
+
+
+def dashboard(sales_rows, scan_rows) -> List[dict]:
+    """event_stats of every event with sales or scans, from totals_queries() rows"""
+    sales: Dict[int, list] = defaultdict(list)
+    for row in sales_rows:
+        sales[row["event_id"]].append(row)
+    scans = {row["event_id"]: row for row in scan_rows}
+    return [event_stats(event_id, sales[event_id], scans.get(event_id))
+            for event_id in sorted(sales.keys() | scans.keys())]
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import json
+    import logging
+
+    from repository import get_repository
+
+    parser = argparse.ArgumentParser(description="Compare analytics rollups against the raw tables")
+    parser.add_argument("--check", action="store_true", help="Report rollup keys that differ (default)")
+    parser.add_argument("--repair", action="store_true", help="Rebuild the rollups from the raw tables")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        repository = get_repository()
+        try:
+            await repository.init_schema()
+            result = await repository.check_analytics(repair=args.repair)
+        finally:
+            await repository.close()
+        for mismatch in result["mismatches"][:50]:
+            print(json.dumps(mismatch))
+        print(f"{repository.name}: {len(result['mismatches'])} rollup mismatches"
+              + (", rebuilt" if result["repaired"] else ""))
+        return result["consistent"] or result["repaired"]
+
+    raise SystemExit(0 if asyncio.run(run()) else 1)
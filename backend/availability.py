@@ -0,0 +1,311 @@
+"""
+Live seat availability over Server-Sent Events
+
+During an on-sale every open browser used to poll /events/{id} to see
+``capacity - sold`` move, so reads grew with the audience. Instead,
+clients subscribe to a text/event-stream and the server pushes changes.
+
+Writers call ``mark(event_id)`` after changing ``sold`` (purchases,
+expired holds, the indexer, imports). A background ticker runs at most
+AVAILABILITY_UPDATES_PER_SECOND times a second: if anything was marked,
+it reads (id, capacity, sold) of the marked events in one query, and
+every change since the last tick goes out as one coalesced frame. Other
+workers learn of a change through the "availability" generation counter
+and re-read every event's counts, since they cannot know which changed.
+Either way it is one query per tick per worker, whatever the number of
+subscribers.
+
+Fan-out is built for many idle connections. Subscribers of the same
+channel (one event, or every event) share a ring of encoded frames and
+wait on one ``asyncio.Event`` that is swapped on every push, so a frame
+is encoded once per channel and a subscriber holds no queue, buffer or
+timer of its own. One that falls further behind than the ring gets a
+fresh snapshot instead. Keep-alive comments are pushed to every channel
+from the ticker. Streams end after AVAILABILITY_STREAM_SECONDS so they
+do not hold up a graceful shutdown. EventSource then reconnects by
+itself and gets a new snapshot, possibly from another worker.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from json_body import encode_json
+from repository import get_repository
+from shared_state import GenerationWatch
+
+AVAILABILITY_UPDATES_PER_SECOND = float(os.getenv("AVAILABILITY_UPDATES_PER_SECOND", "2"))
+AVAILABILITY_HEARTBEAT = float(os.getenv("AVAILABILITY_HEARTBEAT", "15"))  # seconds
+AVAILABILITY_STREAM_SECONDS = float(os.getenv("AVAILABILITY_STREAM_SECONDS", "300"))
+AVAILABILITY_BACKLOG = int(os.getenv("AVAILABILITY_BACKLOG", "32"))  # frames kept per channel
+# Reconnect delay EventSource is told to use, in milliseconds
+AVAILABILITY_RETRY_MS = int(os.getenv("AVAILABILITY_RETRY_MS", "3000"))
+
+# Past this many marked events, one full read is cheaper than an IN list
+MAX_MARKED_READ = 500
+
+KEEPALIVE = b": keepalive\n\n"
+
+STREAM_START = {
+    "type": "http.response.start",
+    "status": 200,
+    "headers": [
+        (b"content-type", b"text/event-stream; charset=utf-8"),
+        (b"cache-control", b"no-cache"),
+        # No proxy buffering, or updates would arrive in bursts
+        (b"x-accel-buffering", b"no"),
+    ],
+}
+
+logger = logging.getLogger("nft_tickets.availability")
+
+
+def _entry(event_id: int, capacity: int, sold: int) -> dict:
+    return {"event_id": event_id, "capacity": capacity, "sold": sold, "available": max(capacity - sold, 0)}
+
+
+async def _disconnected(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _frame(kind: str, entries: List[dict]) -> bytes:
+    return b"event: " + kind.encode() + b"\ndata: " + encode_json(entries) + b"\n\n"
+
+
+class Channel:
+    """Encoded frames for the subscribers of one event (or of every event, ``event_id=None``)"""
+
+    __slots__ = ("event_id", "subscribers", "seq", "frames", "changed", "snapshot")
+
+    def __init__(self, event_id: Optional[int], backlog: int):
+        self.event_id = event_id
+        self.subscribers = 0
+        self.seq = 0
+        self.frames = deque(maxlen=backlog)
+        # One future all subscribers wait on, replaced on every push
+        self.changed = asyncio.get_running_loop().create_future()
+        # (seq, frame) of the latest snapshot, built on demand
+        self.snapshot: Optional[Tuple[int, bytes]] = None
+
+    def push(self, frame: bytes):
+        self.seq += 1
+        self.frames.append((self.seq, frame))
+        self.snapshot = None
+        # Swap before waking: a subscriber that waits again gets the new future
+        changed, self.changed = self.changed, self.changed.get_loop().create_future()
+        changed.set_result(None)
+
+    def since(self, seq: int) -> Optional[bytes]:
+        """Frames after ``seq``, or None when some were already dropped from the ring"""
+        if not self.frames or self.frames[0][0] > seq + 1:
+            return None
+        return b"".join(frame for number, frame in self.frames if number > seq)
+
+
+class AvailabilityFeed:
+    """Coalesces sold-count changes and fans them out to SSE subscribers"""
+
+    def __init__(self, updates_per_second: float = None, heartbeat: float = None,
+                 stream_seconds: float = None, backlog: int = None):
+        self.interval = 1 / (updates_per_second or AVAILABILITY_UPDATES_PER_SECOND)
+        self.heartbeat = heartbeat or AVAILABILITY_HEARTBEAT
+        self.stream_seconds = stream_seconds or AVAILABILITY_STREAM_SECONDS
+        self.backlog = backlog or AVAILABILITY_BACKLOG
+        # event_id -> (capacity, sold) as last read
+        self._counts: Dict[int, Tuple[int, int]] = {}
+        # True while nobody listens: counts are not kept up to date then
+        self._stale = True
+        self._marked = set()
+        self._everything = False
+        self._watch = GenerationWatch("availability")
+        self._channels: Dict[Optional[int], Channel] = {}
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._closed = False
+        self._stopping: Optional[asyncio.Event] = None
+        self.subscribers = 0
+        self.reads = 0
+        self.frames = 0
+
+    def mark(self, event_id: int = None):
+        """Note that an event's sold count (or, with no id, any event) changed"""
+        if event_id is None:
+            self._everything = True
+        else:
+            self._marked.add(event_id)
+        self._watch.publish()
+
+    def _take_marked(self) -> Optional[List[int]]:
+        """Ids to read on this tick: [] for none, None for every event"""
+        remote = self._watch.check()
+        marked, self._marked = self._marked, set()
+        everything, self._everything = self._everything, False
+        if remote or everything or len(marked) > MAX_MARKED_READ:
+            return None
+        return sorted(marked)
+
+    def _apply(self, rows) -> List[dict]:
+        """Store read counts; entries of the events whose counts changed"""
+        changed = []
+        counts = self._counts
+        for row in rows:
+            event_id, current = row["id"], (row["capacity"], row["sold"])
+            if counts.get(event_id) != current:
+                counts[event_id] = current
+                changed.append(_entry(event_id, *current))
+        return changed
+
+    async def load(self):
+        """Read every event's counts if they went stale while nobody listened"""
+        if not self._stale:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._stale:
+                # Taken before the read, so changes made during it are read again
+                self._take_marked()
+                changed = self._apply(await get_repository().fetch_availability())
+                self.reads += 1
+                self._stale = False
+                if changed:
+                    self._broadcast(changed)
+
+    def has_event(self, event_id: int) -> bool:
+        return event_id in self._counts
+
+    async def tick(self):
+        """Read marked events and push what changed (the ticker calls this)"""
+        if not self.subscribers:
+            if self._marked or self._everything or self._watch.check():
+                self._take_marked()
+                self._stale = True
+            return
+        if self._stale:
+            await self.load()
+            return
+        event_ids = self._take_marked()
+        if event_ids == []:
+            return
+        changed = self._apply(await get_repository().fetch_availability(event_ids))
+        self.reads += 1
+        if changed:
+            self._broadcast(changed)
+
+    def _broadcast(self, changed: List[dict]):
+        everything = self._channels.get(None)
+        if everything is not None:
+            everything.push(_frame("availability", changed))
+            self.frames += 1
+        for entry in changed:
+            channel = self._channels.get(entry["event_id"])
+            if channel is not None:
+                channel.push(_frame("availability", [entry]))
+                self.frames += 1
+
+    def _snapshot(self, channel: Channel) -> bytes:
+        if channel.snapshot is None or channel.snapshot[0] != channel.seq:
+            if channel.event_id is None:
+                entries = [_entry(event_id, *counts) for event_id, counts in sorted(self._counts.items())]
+            else:
+                entries = [_entry(channel.event_id, *self._counts[channel.event_id])]
+            channel.snapshot = (channel.seq, _frame("snapshot", entries))
+        return channel.snapshot[1]
+
+    async def serve(self, event_id: Optional[int], receive, send):
+        """Send one subscriber's stream (raw ASGI): a snapshot, then changes until its time is up
+
+        Call ``load`` first (and check ``has_event``). Waits on the channel's
+        shared future and on the client going away, with nothing else per
+        connection.
+        """
+        channel = self._channels.get(event_id)
+        if channel is None:
+            channel = self._channels[event_id] = Channel(event_id, self.backlog)
+        channel.subscribers += 1
+        self.subscribers += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.stream_seconds
+        gone = loop.create_task(_disconnected(receive))
+        try:
+            seq = channel.seq
+            await send(STREAM_START)
+            await send({"type": "http.response.body", "more_body": True,
+                        "body": b"retry: %d\n" % AVAILABILITY_RETRY_MS + self._snapshot(channel)})
+            # The ticker's keep-alives wake every subscriber, so the deadline is
+            # checked without a timer per connection
+            while loop.time() < deadline:
+                if channel.seq == seq:
+                    await asyncio.wait((channel.changed, gone), return_when=asyncio.FIRST_COMPLETED)
+                    if gone.done():
+                        return
+                    if self._closed:
+                        break
+                frames = channel.since(seq)
+                if frames is None:
+                    frames = self._snapshot(channel)
+                seq = channel.seq
+                await send({"type": "http.response.body", "body": frames, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            gone.cancel()
+            channel.subscribers -= 1
+            self.subscribers -= 1
+            if not channel.subscribers and self._channels.get(event_id) is channel:
+                del self._channels[event_id]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat
+        while self._running:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if not self._running:
+                break
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Failed to read seat availability")
+            if loop.time() >= next_heartbeat:
+                next_heartbeat = loop.time() + self.heartbeat
+                for channel in list(self._channels.values()):
+                    channel.push(KEEPALIVE)
+
+    def start(self):
+        """Start the ticker on the running event loop"""
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._running = True
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the ticker and end every open stream"""
+        if self._task is None:
+            return
+        self._running = False
+        self._stopping.set()
+        await self._task
+        self._task = None
+        self._closed = True
+        for channel in list(self._channels.values()):
+            channel.push(b"")
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscribers,
+            "channels": len(self._channels),
+            "reads": self.reads,
+            "frames": self.frames,
+            "updates_per_second": 1 / self.interval,
+        }
+
+
+availability_feed = AvailabilityFeed()
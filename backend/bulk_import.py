@@ -0,0 +1,342 @@
+"""
+Bulk import of events, tickets and orders from CSV or NDJSON
+
+The input is read line by line and validated into rows in the column
+order of IMPORTS, IMPORT_CHUNK_ROWS at a time, so memory stays flat
+however large the file is. ``Repository.import_rows`` then writes the
+whole file in one transaction: SQLite with executemany per chunk (into an
+empty table, its secondary indexes are dropped first and built once at
+the end), PostgreSQL with COPY. Any bad row, duplicate key or unknown
+event rolls back the entire import.
+
+Columns are the ones the exports write, so an export can be loaded into
+another database; columns not listed here are ignored. Prices are integer
+gwei (``price_gwei``, ``total_price_gwei``) or text like ``0.05 ETH``
+(``price``, ``total_price``). Imported tickets are recorded in
+ticket_changes for scanner snapshots and imported orders in the analytics
+rollups. Orders are history: they must be confirmed or failed, and they
+do not change events.sold, so import events with their sold counts.
+
+    python bulk_import.py events catalog.ndjson
+    python bulk_import.py tickets tickets.csv [--chunk-rows 50000]
+
+Also served as ``POST /admin/import/{table}``.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+from availability import availability_feed
+from catalog_cache import catalog_cache
+from export import parse_timestamp
+from json_body import compact_json
+from prices import format_eth, parse_eth
+from repository import ORDER_TOTAL_PLACES, get_repository
+from verification_index import verification_index
+
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "20000"))
+
+FORMATS = ("ndjson", "csv")
+
+HEX_DIGITS = "0123456789abcdef"
+
+# CURRENT_TIMESTAMP's format, as every export writes it
+TIMESTAMP = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d", re.ASCII)
+
+# Field defaults: must be present, or the time the import started
+REQUIRED = object()
+NOW = object()
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def _integer(value) -> int:
+    # type() rather than isinstance: JSON true/false are not counts
+    if type(value) is int or type(value) is str:
+        number = int(value)
+        if number >= 0:
+            return number
+    raise ValueError(f"not a non-negative integer: {value!r}")
+
+
+def _positive(value) -> int:
+    if type(value) is int or type(value) is str:
+        number = int(value)
+        if number > 0:
+            return number
+    raise ValueError(f"not a positive integer: {value!r}")
+
+
+def _text(value) -> str:
+    if type(value) is str:
+        return value
+    if type(value) is int:
+        return str(value)
+    raise ValueError(f"not text: {value!r}")
+
+
+def _address(value) -> str:
+    if type(value) is str and len(value) == 42 and value[:2] in ("0x", "0X"):
+        address = value.lower()
+        if not address[2:].strip(HEX_DIGITS):
+            return address
+    raise ValueError(f"not an address: {value!r}")
+
+
+def _timestamp(value) -> str:
+    if type(value) is not str:
+        raise ValueError(f"not a timestamp: {value!r}")
+    if TIMESTAMP.fullmatch(value):
+        return value
+    return parse_timestamp(value)
+
+
+def _json_array(value) -> str:
+    # Stored compact and valid: event responses splice features and artists as they are
+    if type(value) is str:
+        value = json.loads(value)
+    if type(value) is list:
+        return compact_json(value)
+    raise ValueError(f"not a JSON array: {value!r}")
+
+
+def _choice(*options):
+    def parse(value) -> str:
+        if value in options:
+            return value
+        raise ValueError(f"must be one of {', '.join(options)}: {value!r}")
+    return parse
+
+
+# table -> ([(column, parser, default)], [(derived column, source column, function)])
+IMPORTS = {
+    "events": (
+        [
+            ("id", _positive, None),
+            ("name", _text, REQUIRED),
+            ("description", _text, None),
+            ("date", _text, REQUIRED),
+            ("time", _text, REQUIRED),
+            ("venue", _text, REQUIRED),
+            ("location", _text, REQUIRED),
+            ("price_gwei", _integer, REQUIRED),
+            ("capacity", _integer, REQUIRED),
+            ("sold", _integer, 0),
+            ("image_url", _text, None),
+            ("features", _json_array, "[]"),
+            ("artists", _json_array, "[]"),
+            ("created_at", _timestamp, NOW),
+        ],
+        [("price", "price_gwei", format_eth)],
+    ),
+    "tickets": (
+        [
+            ("token_id", _integer, REQUIRED),
+            ("event_id", _positive, REQUIRED),
+            ("owner_address", _address, REQUIRED),
+            ("seat", _text, REQUIRED),
+            ("status", _choice("active", "used", "expired"), "active"),
+            ("metadata_uri", _text, None),
+            ("created_at", _timestamp, NOW),
+            ("verified_at", _timestamp, None),
+        ],
+        [],
+    ),
+    "orders": (
+        [
+            ("id", _positive, None),
+            ("user_address", _address, REQUIRED),
+            ("event_id", _positive, REQUIRED),
+            ("quantity", _positive, REQUIRED),
+            ("seat_type", _text, REQUIRED),
+            ("total_price_gwei", _integer, REQUIRED),
+            ("status", _choice("confirmed", "failed"), "confirmed"),
+            ("tx_hash", _text, None),
+            ("token_ids", _json_array, None),
+            ("created_at", _timestamp, NOW),
+        ],
+        [("total_price", "total_price_gwei", lambda gwei: format_eth(gwei, ORDER_TOTAL_PLACES))],
+    ),
+}
+
+
+
+def _sold_within_capacity(sold: int, capacity: int):
+    # create_order reserves with ``sold + ? <= capacity``
+    if sold > capacity:
+        return f"sold {sold} exceeds capacity {capacity}"
+
+
+# table -> [(columns, check)]: check(*values) returns an error message or None
+ROW_CHECKS = {
+    "events": [(("sold", "capacity"), _sold_within_capacity)],
+}
+
+# gwei column -> text price accepted in its place
+PRICE_ALIASES = {"price_gwei": "price", "total_price_gwei": "total_price"}
+
+
+def import_columns(table: str) -> List[str]:
+    """Column order of the rows read_chunks yields for ``table``"""
+    fields, derived = IMPORTS[table]
+    return [field[0] for field in fields] + [column for column, _, _ in derived]
+
+
+def _row_builder(table: str, keys: dict, now: str, indexed: bool):
+    """record -> row
+
+    ``keys`` maps input field names to where a record holds them: CSV
+    positions (``indexed``) or NDJSON keys. Fields without one keep their
+    default.
+    """
+    fields, derived = IMPORTS[table]
+    template, present, fallbacks = [], [], []
+    for target, (column, parse, default) in enumerate(fields):
+        template.append(now if default is NOW else default)
+        if column in keys:
+            present.append((target, keys[column], parse))
+        if PRICE_ALIASES.get(column) in keys:
+            fallbacks.append((target, keys[PRICE_ALIASES[column]]))
+    sources = [(import_columns(table).index(source), derive) for _, source, derive in derived]
+
+    def finish(row: list, get) -> list:
+        if REQUIRED in row:
+            for target, key in fallbacks:
+                value = get(key)
+                if row[target] is REQUIRED and value is not None and value != "":
+                    row[target] = parse_eth(_text(value))
+            for value, (column, _, _) in zip(row, fields):
+                if value is REQUIRED:
+                    raise ValueError(f"missing {column}")
+        for position, derive in sources:
+            row.append(derive(row[position]))
+        return row
+
+    if indexed:
+        def build(record: list) -> list:
+            row = template.copy()
+            for target, key, parse in present:
+                value = record[key]
+                if value != "":
+                    row[target] = parse(value)
+            if sources or REQUIRED in row:
+                return finish(row, record.__getitem__)
+            return row
+    else:
+        def build(record: dict) -> list:
+            row = template.copy()
+            get = record.get
+            for target, key, parse in present:
+                value = get(key)
+                if value is not None and value != "":
+                    row[target] = parse(value)
+            if sources or REQUIRED in row:
+                return finish(row, get)
+            return row
+
+    checks = [([import_columns(table).index(column) for column in columns], check)
+              for columns, check in ROW_CHECKS.get(table, ())]
+    if checks:
+        unchecked = build
+
+        def build(record) -> list:
+            row = unchecked(record)
+            for positions, check in checks:
+                error = check(*[row[position] for position in positions])
+                if error:
+                    raise ValueError(error)
+            return row
+    return build
+
+
+def _csv_source(table: str, lines: Iterable[str], now: str):
+    """(row builder, records, line number of the latest record)"""
+    reader = csv.reader(lines)
+    positions = {name.strip(): position for position, name in enumerate(next(reader, []))}
+    for column, _, default in IMPORTS[table][0]:
+        if default is REQUIRED and column not in positions and PRICE_ALIASES.get(column) not in positions:
+            raise InvalidRow(f"line 1: no {column} column")
+    # filter(None, ...) skips blank lines
+    return _row_builder(table, positions, now, indexed=True), filter(None, reader), lambda: reader.line_num
+
+
+def _ndjson_source(table: str, lines: Iterable[str], now: str):
+    names = [column for column, _, _ in IMPORTS[table][0]] + list(PRICE_ALIASES.values())
+    line = [0]
+
+    def records():
+        loads = json.loads
+        for line[0], text in enumerate(lines, 1):
+            if text and not text.isspace():
+                yield loads(text)
+
+    return _row_builder(table, {name: name for name in names}, now, indexed=False), records(), lambda: line[0]
+
+
+def read_chunks(table: str, lines: Iterable[str], fmt: str = "ndjson", chunk_rows: int = None) -> Iterator[List[list]]:
+    """Validated rows of ``lines`` (an open text file), in chunks; raises InvalidRow at the first bad one"""
+    now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    build, records, line = (_csv_source if fmt == "csv" else _ndjson_source)(table, lines, now)
+    chunk_rows = chunk_rows or IMPORT_CHUNK_ROWS
+    while True:
+        try:
+            chunk = [build(record) for record in islice(records, chunk_rows)]
+        except (ValueError, TypeError) as exc:
+            raise InvalidRow(f"line {line()}: {exc}") from exc
+        except IndexError as exc:
+            raise InvalidRow(f"line {line()}: fewer fields than the header") from exc
+        except AttributeError as exc:
+            raise InvalidRow(f"line {line()}: not a JSON object") from exc
+        if not chunk:
+            return
+        yield chunk
+
+
+def publish(table: str):
+    """Tell every worker's caches about imported rows"""
+    if table == "events":
+        catalog_cache.invalidate()
+        availability_feed.mark()
+    elif table == "tickets":
+        verification_index.publish()
+
+
+async def run(table: str, path: str, fmt: str, chunk_rows: int) -> bool:
+    repository = get_repository()
+    try:
+        await repository.init_schema()
+        start = time.perf_counter()
+        with (sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")) as lines:
+            rows = await repository.import_rows(table, import_columns(table),
+                                                read_chunks(table, lines, fmt, chunk_rows))
+    except ValueError as exc:
+        print(f"{repository.name}: nothing imported: {exc}", file=sys.stderr)
+        return False
+    finally:
+        await repository.close()
+    elapsed = time.perf_counter() - start
+    publish(table)
+    print(f"{repository.name}: imported {rows} {table} in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import events, tickets or orders")
+    parser.add_argument("table", choices=sorted(IMPORTS))
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension, else ndjson")
+    parser.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS, help="Rows per executemany/COPY")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    sys.exit(0 if asyncio.run(run(args.table, args.path, fmt, args.chunk_rows)) else 1)
@@ -0,0 +1,135 @@
+"""
+In-memory event catalog cache
+
+Holds pre-serialised JSON response bodies and their ETags, so /events and
+/events/{id} can be answered without touching SQLite or encoding anything.
+Entries expire after a TTL and are invalidated explicitly whenever an
+event row changes. Invalidations are published to other worker processes,
+which drop their whole cache the next time they read from it.
+
+List pages are keyed by the client's query (cursor, limit, fields), so
+they are kept in an LRU of CATALOG_CACHE_MAX_PAGES: a client walking
+cursors evicts its own cold pages, not the hot first page.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from shared_state import GenerationWatch
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))  # seconds, 0 disables caching
+CATALOG_CACHE_MAX_PAGES = int(os.getenv("CATALOG_CACHE_MAX_PAGES", "256"))
+
+
+class CacheEntry:
+    """A JSON response body and its strong ETag"""
+
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.expires_at = time.monotonic() + ttl
+
+
+class EventCatalogCache:
+    """TTL cache for event list pages and individual events"""
+
+    def __init__(self, ttl: float = None, max_pages: int = None):
+        self.ttl = CATALOG_CACHE_TTL if ttl is None else ttl
+        self.max_pages = max_pages or CATALOG_CACHE_MAX_PAGES
+        # List pages keyed by (cursor, limit, fields), least recently used first
+        self._pages: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._events = {}
+        # Bumped on every invalidation so loads that raced a write are discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._watch = GenerationWatch("catalog")
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _sync(self):
+        """Drop everything if another worker invalidated since we last looked"""
+        if self._watch.check():
+            with self._lock:
+                self._generation += 1
+                self._pages.clear()
+                self._events.clear()
+
+    def _fresh(self, entry: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def get_events(self, page_key) -> Optional[CacheEntry]:
+        """Return a cached event list page, if still fresh"""
+        self._sync()
+        with self._lock:
+            entry = self._pages.get(page_key)
+            if entry is not None:
+                self._pages.move_to_end(page_key)
+        return self._fresh(entry)
+
+    def get_event(self, event_id: int) -> Optional[CacheEntry]:
+        """Return a cached single-event response, if still fresh"""
+        self._sync()
+        return self._fresh(self._events.get(event_id))
+
+    def store_events(self, page_key, body: bytes, generation: int) -> CacheEntry:
+        """Cache an event list page loaded at ``generation``"""
+        entry = CacheEntry(body, self.ttl)
+        with self._lock:
+            if self.ttl > 0 and generation == self._generation:
+                self._pages[page_key] = entry
+                self._pages.move_to_end(page_key)
+                # Arbitrary query combinations must not grow the cache unbounded
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return entry
+
+    def store_event(self, event_id: int, body: bytes, generation: int) -> CacheEntry:
+        """Cache a single-event response loaded at ``generation``"""
+        entry = CacheEntry(body, self.ttl)
+        with self._lock:
+            if self.ttl > 0 and generation == self._generation:
+                self._events[event_id] = entry
+        return entry
+
+    def invalidate(self, event_id: int = None):
+        """Drop every list page and one event (or every event when no id is given)"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._pages.clear()
+            if event_id is None:
+                self._events.clear()
+            else:
+                self._events.pop(event_id, None)
+        self._watch.publish()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "cached_events": len(self._events),
+            "cached_pages": len(self._pages),
+            "ttl_seconds": self.ttl,
+        }
+
+
+catalog_cache = EventCatalogCache()
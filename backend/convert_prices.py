@@ -0,0 +1,41 @@
+"""
+Bulk conversion of text prices ("0.05 ETH") to the integer gwei columns
+
+Migration 7 adds events.price_gwei and orders.total_price_gwei; this fills
+them in for rows written before it, --chunk-rows rows per transaction, so
+converting a large orders table never holds one long write lock. Only
+rows still without a gwei price are read, so it can be re-run at any time
+(the API also runs it at startup). Run it before deploying to keep that
+startup pass short:
+
+    python convert_prices.py [--chunk-rows 20000]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from repository import get_repository
+
+
+async def run(chunk_rows: int):
+    repository = get_repository()
+    try:
+        await repository.init_schema()
+        start = time.perf_counter()
+        converted = await repository.convert_prices(chunk_rows)
+    finally:
+        await repository.close()
+    elapsed = time.perf_counter() - start
+    print(f"{repository.name}: converted {converted['events']} events and "
+          f"{converted['orders']} orders in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert text prices to integer gwei columns")
+    parser.add_argument("--chunk-rows", type=int, default=20000, help="Rows updated per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.chunk_rows))
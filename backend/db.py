@@ -0,0 +1,193 @@
+"""
+SQLite connection pool for the NFT Ticketing backend
+
+Connections are opened once, tuned with PRAGMAs (WAL journal, relaxed
+fsync, large page cache, memory-mapped I/O) and then reused across
+requests. Reusing a connection also reuses its prepared-statement cache,
+so hot queries are compiled once per connection instead of once per call.
+
+Async handlers must not touch sqlite3 directly: ``run_db`` ships the work
+to a dedicated thread pool so the event loop keeps serving other requests
+while SQLite waits on disk or on the write lock.
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import METRICS_ENABLED, InstrumentedConnection
+
+# Database configuration (all overridable through the environment)
+# DATABASE_URL picks the backend (see repository.py); for sqlite:/// URLs
+# the path part is the database file unless DATABASE_PATH is set
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+DATABASE_PATH = os.getenv("DATABASE_PATH") or (
+    DATABASE_URL[len("sqlite:///"):] if DATABASE_URL.startswith("sqlite:///") else "nft_tickets.db"
+)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-65536"))  # negative = KiB, i.e. 64 MiB
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_BUSY_TIMEOUT = int(os.getenv("DB_BUSY_TIMEOUT", "5000"))  # milliseconds
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+# 0 runs queries inline on the event loop (the old blocking behaviour)
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Open a tuned SQLite connection"""
+    conn = sqlite3.connect(
+        path or DATABASE_PATH,
+        timeout=DB_BUSY_TIMEOUT / 1000,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE,
+        # Times every statement for /metrics
+        factory=InstrumentedConnection if METRICS_ENABLED else sqlite3.Connection,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = {DB_CACHE_SIZE}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of reusable SQLite connections"""
+
+    def __init__(self, path: str = None, size: int = None, timeout: float = None):
+        self.path = path or DATABASE_PATH
+        self.size = size or DB_POOL_SIZE
+        self.timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+        # LIFO keeps the most recently used (warmest) connection at the top
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return connect(self.path)
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError("Timed out waiting for a database connection")
+
+    def _release(self, conn: sqlite3.Connection):
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            finally:
+                self._release(conn)
+            raise
+        self._release(conn)
+
+    def close(self):
+        """Close every idle connection and stop pooling returned ones"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None or _pool._closed:
+        with _pool_lock:
+            if _pool is None or _pool._closed:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+# Async data access
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the thread pool that runs database work, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # Never run more DB threads than there are pooled connections
+                workers = min(DB_EXECUTOR_WORKERS, get_pool().size)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+    return _executor
+
+
+def _run_with_connection(fn, args):
+    with get_pool().connection() as conn:
+        return fn(conn, *args)
+
+
+async def run_db(fn, *args):
+    """Run ``fn(conn, *args)`` on a pooled connection without blocking the event loop"""
+    if DB_EXECUTOR_WORKERS <= 0:
+        return _run_with_connection(fn, args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _run_with_connection, fn, args)
+
+
+def shutdown_executor():
+    """Wait for in-flight database work and stop the DB thread pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
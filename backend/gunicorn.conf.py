@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for running the API on several cores
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Each worker is a separate uvicorn process with its own event loop, DB pool
+and in-memory caches. With more than one worker the shared state backend
+is switched to ``local`` so nonces, rate limits and cache invalidations
+are visible to every worker (see shared_state.py).
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app in each worker, not in the master: SQLite connections,
+# thread pools and mmaps must not be inherited across fork()
+preload_app = False
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+# Recycle workers now and then to bound memory growth; jitter avoids
+# restarting them all at once
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_BACKEND", "local")
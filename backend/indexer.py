@@ -0,0 +1,235 @@
+"""
+Blockchain event indexer for the EventTicket contract
+
+Pulls contract logs in block-range batches via ``eth_getLogs``, stopping
+INDEXER_CONFIRMATIONS blocks behind the chain head so reorged blocks are
+never ingested. Each batch is applied in a single transaction together with
+its checkpoint (through the repository, so on either database backend),
+so a crash never skips or double-applies a range:
+
+- TicketMinted bulk-upserts rows into ``tickets`` and confirms the pending
+  order whose ``tx_hash`` minted them (its seat hold becomes a sale)
+- Transfer keeps ``owner_address`` in sync on resale
+- TicketUsed marks tickets ``used``; TicketVerified stamps ``verified_at``
+
+Logs can come from a JSON-RPC node or from a recorded fixture file, which
+is what scripts/bench_indexer.py uses.
+
+Run standalone with ``python indexer.py`` (see --help), or set
+INDEXER_RPC_URL and CONTRACT_ADDRESS to run it inside the API process.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import urllib.request
+from typing import Dict, List, Optional
+
+from repository import get_repository
+
+INDEXER_RPC_URL = os.getenv("INDEXER_RPC_URL", "")
+CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS", "")
+INDEXER_CONFIRMATIONS = int(os.getenv("INDEXER_CONFIRMATIONS", "12"))
+INDEXER_BATCH_BLOCKS = int(os.getenv("INDEXER_BATCH_BLOCKS", "2000"))
+INDEXER_START_BLOCK = int(os.getenv("INDEXER_START_BLOCK", "0"))
+INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", "5"))  # seconds
+
+logger = logging.getLogger("nft_tickets.indexer")
+
+# keccak256 of the event signatures in contracts/EventTicket.sol
+TICKET_MINTED = "0xc2dced6c804cbcaeaebd371dc6955420208f69c13f5400864d51339a5cc41ec2"  # TicketMinted(uint256,address,uint256,string)
+TICKET_USED = "0x07c2221c844690cb15e32907258d38446cd4a17bc9b84e2069cd955615d547fd"  # TicketUsed(uint256,address)
+TICKET_VERIFIED = "0xea840a3e5276c9c5900888d8ea2b866014cb091795c53ba39d6382b853104c51"  # TicketVerified(uint256,address)
+TRANSFER = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"  # Transfer(address,address,uint256)
+TOPICS = [TICKET_MINTED, TICKET_USED, TICKET_VERIFIED, TRANSFER]
+
+ZERO_ADDRESS = "0x" + "0" * 40
+CHECKPOINT_NAME = "event_ticket"
+
+
+class JsonRpcSource:
+    """Minimal Ethereum JSON-RPC client (eth_blockNumber / eth_getLogs)"""
+
+    def __init__(self, url: str, contract_address: str, timeout: float = 30):
+        self.url = url
+        self.contract_address = contract_address
+        self.timeout = timeout
+        self._id = 0
+
+    def _call(self, method: str, params: list):
+        self._id += 1
+        body = json.dumps({"jsonrpc": "2.0", "id": self._id, "method": method, "params": params}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            reply = json.loads(response.read())
+        if reply.get("error"):
+            raise RuntimeError(f"{method} failed: {reply['error']}")
+        return reply["result"]
+
+    def block_number(self) -> int:
+        return int(self._call("eth_blockNumber", []), 16)
+
+    def get_logs(self, from_block: int, to_block: int) -> List[dict]:
+        return self._call("eth_getLogs", [{
+            "address": self.contract_address,
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "topics": [TOPICS],
+        }])
+
+
+class FixtureSource:
+    """Replays recorded logs: ``{"head": <block>, "logs": [<eth_getLogs entries>]}``"""
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            recording = json.load(f)
+        self.head = recording["head"]
+        self.logs = sorted(recording["logs"], key=_log_position)
+
+    def block_number(self) -> int:
+        return self.head
+
+    def get_logs(self, from_block: int, to_block: int) -> List[dict]:
+        return [log for log in self.logs if from_block <= int(log["blockNumber"], 16) <= to_block]
+
+
+def _log_position(log: dict):
+    return int(log["blockNumber"], 16), int(log["logIndex"], 16)
+
+
+def _word_to_int(word: str) -> int:
+    return int(word, 16)
+
+
+def _word_to_address(word: str) -> str:
+    return "0x" + word[-40:].lower()
+
+
+def _decode_string(data: str) -> str:
+    """Decode a single ABI-encoded dynamic ``string`` from log data"""
+    raw = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    offset = int.from_bytes(raw[0:32], "big")
+    length = int.from_bytes(raw[offset:offset + 32], "big")
+    return raw[offset + 32:offset + 32 + length].decode("utf-8", errors="replace")
+
+
+def decode_logs(logs: List[dict]) -> Dict[str, object]:
+    """Turn raw contract logs into the row changes the repository applies"""
+    mints, transfers, used, verified = [], [], [], []
+    minted_by_tx: Dict[str, List[int]] = {}
+
+    for log in sorted(logs, key=_log_position):
+        topics = log["topics"]
+        signature = topics[0].lower()
+        if signature == TICKET_MINTED:
+            token_id = _word_to_int(topics[1])
+            owner = _word_to_address(topics[2])
+            event_id = _word_to_int(topics[3])
+            mints.append((token_id, event_id, owner, _decode_string(log["data"])))
+            minted_by_tx.setdefault(log["transactionHash"].lower(), []).append(token_id)
+        elif signature == TRANSFER and len(topics) == 4:
+            sender, receiver = _word_to_address(topics[1]), _word_to_address(topics[2])
+            if sender != ZERO_ADDRESS:
+                transfers.append((receiver, _word_to_int(topics[3])))
+        elif signature == TICKET_USED:
+            used.append(_word_to_int(topics[1]))
+        elif signature == TICKET_VERIFIED:
+            verified.append(_word_to_int(topics[1]))
+
+    return {
+        "mints": mints,
+        "transfers": transfers,
+        "used": used,
+        "verified": verified,
+        "minted_by_tx": minted_by_tx,
+    }
+
+
+class Indexer:
+    """Moves the checkpoint towards the confirmed chain head, one batch at a time"""
+
+    def __init__(self, source, confirmations: int = None, batch_blocks: int = None,
+                 start_block: int = None, on_batch=None, repository=None):
+        self.source = source
+        self.confirmations = INDEXER_CONFIRMATIONS if confirmations is None else confirmations
+        self.batch_blocks = batch_blocks or INDEXER_BATCH_BLOCKS
+        self.start_block = INDEXER_START_BLOCK if start_block is None else start_block
+        # Called with a summary of each committed batch
+        self.on_batch = on_batch
+        self.repository = repository or get_repository()
+        self.logs_ingested = 0
+
+    async def run_once(self) -> int:
+        """Index every confirmed block not yet processed; returns logs ingested"""
+        # The sources block on HTTP or file I/O; keep them off the event loop
+        safe_head = await asyncio.to_thread(self.source.block_number) - self.confirmations
+        checkpoint = await self.repository.load_checkpoint(CHECKPOINT_NAME, self.start_block - 1)
+
+        ingested = 0
+        while checkpoint < safe_head:
+            from_block = checkpoint + 1
+            to_block = min(from_block + self.batch_blocks - 1, safe_head)
+            logs = await asyncio.to_thread(self.source.get_logs, from_block, to_block)
+            changes = decode_logs(logs)
+            applied = await self.repository.apply_chain_changes(changes, CHECKPOINT_NAME, to_block)
+            if self.on_batch is not None:
+                self.on_batch({
+                    "mints": changes["mints"],
+                    "transfers": changes["transfers"],
+                    "used": changes["used"],
+                    **applied,
+                })
+            checkpoint = to_block
+            ingested += len(logs)
+            logger.info("Indexed blocks %d-%d: %d logs", from_block, to_block, len(logs))
+
+        self.logs_ingested += ingested
+        return ingested
+
+    async def run_forever(self, poll_interval: float = None):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Indexer pass failed")
+            await asyncio.sleep(INDEXER_POLL_INTERVAL if poll_interval is None else poll_interval)
+
+
+def source_from_env() -> Optional[JsonRpcSource]:
+    if INDEXER_RPC_URL and CONTRACT_ADDRESS:
+        return JsonRpcSource(INDEXER_RPC_URL, CONTRACT_ADDRESS)
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index EventTicket contract logs into the tickets table")
+    parser.add_argument("--rpc-url", default=INDEXER_RPC_URL)
+    parser.add_argument("--contract", default=CONTRACT_ADDRESS)
+    parser.add_argument("--fixture", help="Replay recorded logs from a JSON file instead of a node")
+    parser.add_argument("--once", action="store_true", help="Catch up once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.fixture:
+        source = FixtureSource(args.fixture)
+    elif args.rpc_url and args.contract:
+        source = JsonRpcSource(args.rpc_url, args.contract)
+    else:
+        parser.error("set --rpc-url and --contract (or INDEXER_RPC_URL / CONTRACT_ADDRESS), or use --fixture")
+
+    async def run():
+        indexer = Indexer(source)
+        try:
+            await indexer.repository.init_schema()
+            if args.once or args.fixture:
+                print(f"Ingested {await indexer.run_once()} logs")
+            else:
+                await indexer.run_forever()
+        finally:
+            await indexer.repository.close()
+
+    asyncio.run(run())
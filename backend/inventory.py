@@ -0,0 +1,118 @@
+"""
+Seat inventory engine
+
+Seats are reserved with a single conditional UPDATE, so the capacity check
+and the increment happen atomically inside the database and concurrent
+buyers can never oversell an event. Every reservation is recorded as a hold that
+expires unless the order's on-chain transaction is confirmed in time;
+expired holds are returned to inventory and their orders marked failed.
+"""
+
+import os
+import time
+from typing import List, Optional
+
+from analytics import Rollup, write_rollup
+
+HOLD_TTL = float(os.getenv("INVENTORY_HOLD_TTL", "900"))  # seconds, 0 keeps holds forever
+SWEEP_INTERVAL = float(os.getenv("INVENTORY_SWEEP_INTERVAL", "30"))  # seconds
+
+
+class InventoryError(Exception):
+    """Base class for reservation failures"""
+
+
+class EventNotFound(InventoryError):
+    pass
+
+
+class NotEnoughTickets(InventoryError):
+    pass
+
+
+def reserve_seats(conn, event_id: int, quantity: int):
+    """Atomically take ``quantity`` seats and return the event's price row
+
+    Must run inside the caller's transaction; the write lock is taken by
+    the first statement, so the check and increment cannot interleave with
+    another purchase.
+    """
+    if quantity <= 0:
+        raise NotEnoughTickets("Quantity must be positive")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE events SET sold = sold + ?
+        WHERE id = ? AND sold + ? <= capacity
+    """, (quantity, event_id, quantity))
+    reserved = cursor.rowcount == 1
+
+    cursor.execute("SELECT price_gwei, capacity, sold FROM events WHERE id = ?", (event_id,))
+    event = cursor.fetchone()
+    if event is None:
+        raise EventNotFound("Event not found")
+    if not reserved:
+        raise NotEnoughTickets("Not enough tickets available")
+    return event
+
+
+def hold_expiry(ttl: float = None) -> Optional[float]:
+    """Unix time a hold created now expires at, or None if holds never expire"""
+    ttl = HOLD_TTL if ttl is None else ttl
+    return time.time() + ttl if ttl > 0 else None
+
+
+def create_hold(conn, order_id: int, event_id: int, quantity: int, ttl: float = None):
+    """Record a reservation that is released unless confirmed before it expires"""
+    expires_at = hold_expiry(ttl)
+    conn.execute("""
+        INSERT INTO seat_holds (order_id, event_id, quantity, expires_at)
+        VALUES (?, ?, ?, ?)
+    """, (order_id, event_id, quantity, expires_at))
+
+
+def confirm_hold(conn, order_id: int) -> bool:
+    """Turn a hold into a sale once its transaction is confirmed on-chain"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM seat_holds WHERE order_id = ?", (order_id,))
+    cursor.execute("""
+        UPDATE orders SET status = 'confirmed' WHERE id = ? AND status = 'pending'
+    """, (order_id,))
+    return cursor.rowcount > 0
+
+
+def release_expired_holds(conn, now: float = None) -> List[int]:
+    """Return expired holds to inventory and fail their orders
+
+    Commits and returns the ids of events whose ``sold`` count changed.
+    """
+    now = time.time() if now is None else now
+    cursor = conn.cursor()
+    # Claimed by the DELETE, which opens the write transaction: a hold the
+    # indexer confirms concurrently is either gone already or confirmed
+    # after this commits, when its order is no longer pending
+    cursor.execute("""
+        DELETE FROM seat_holds
+        WHERE expires_at IS NOT NULL AND expires_at <= ?
+        RETURNING order_id, event_id, quantity
+    """, (now,))
+    expired = cursor.fetchall()
+    if not expired:
+        conn.commit()
+        return []
+
+    cursor.executemany(
+        "UPDATE events SET sold = MAX(sold - ?, 0) WHERE id = ?",
+        [(hold["quantity"], hold["event_id"]) for hold in expired],
+    )
+    rollup = Rollup()
+    for hold in expired:
+        cursor.execute("""
+            UPDATE orders SET status = 'failed' WHERE id = ? AND status = 'pending'
+            RETURNING event_id, seat_type, created_at, quantity, total_price_gwei
+        """, (hold["order_id"],))
+        for order in cursor.fetchall():
+            rollup.move(order, "pending", "failed")
+    write_rollup(conn, rollup)
+    conn.commit()
+    return sorted({hold["event_id"] for hold in expired})
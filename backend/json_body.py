@@ -0,0 +1,82 @@
+"""
+JSON response bodies
+
+encode_json serialises like Starlette's JSONResponse (compact, UTF-8),
+with orjson when it is installed and the standard library otherwise.
+orjson is several times faster on list pages; what it cannot encode
+(integers past 64 bits, non-string keys) falls back to json.
+
+FastAPI passes whatever an endpoint returns through jsonable_encoder,
+which copies every row of a page before it is serialised. Endpoints that
+build their content themselves return a ``JSONBody`` instead, which is
+sent as is. It is also the app's default response class.
+
+Event ``features`` and ``artists`` are stored as compact JSON arrays
+(migration 9). ``encode_row`` splices that text into the body as it is,
+rather than json.loads-ing it only to encode it again.
+"""
+
+import json
+from typing import Iterable, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: standard library json
+    orjson = None
+
+ENCODER = f"orjson {orjson.__version__}" if orjson is not None else "json"
+
+
+def _dumps(content) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def encode_json(content) -> bytes:
+    """Serialise like Starlette's JSONResponse, with orjson when installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            pass
+    return _dumps(content)
+
+
+def compact_json(value) -> str:
+    """Text to store in a JSON column that ``encode_row`` splices"""
+    return encode_json(value).decode("utf-8")
+
+
+def encode_row(row: dict, raw_fields: Sequence[str], empty: bytes = b"null") -> bytes:
+    """``row`` as a JSON object, with ``raw_fields`` (text already holding JSON) spliced in as they are
+
+    Removes those fields from ``row``; they come last in the object. A
+    NULL or empty one is written as ``empty``.
+    """
+    spliced = [(name, row.pop(name)) for name in raw_fields if name in row]
+    body = encode_json(row)[:-1]
+    for name, value in spliced:
+        if len(body) > 1:
+            body += b","
+        body += b'"' + name.encode() + b'":' + (value.encode("utf-8") if value else empty)
+    return body + b"}"
+
+
+def encode_page(name: str, items: Iterable[bytes], next_cursor) -> bytes:
+    """``{name: [items], "next_cursor": ...}`` from already encoded items"""
+    return (b'{"' + name.encode() + b'":[' + b",".join(items) + b'],"next_cursor":'
+            + encode_json(next_cursor) + b"}")
+
+
+class JSONBody(JSONResponse):
+    """JSONResponse encoded with encode_json"""
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
@@ -1,24 +1,51 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import HTMLResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
 import uvicorn
 import os
 from datetime import datetime, timedelta
 import jwt
 import hashlib
 import secrets
-from typing import Optional, List
-import sqlite3
-import json
-from pydantic import BaseModel
-from contextlib import contextmanager
+from typing import List, Optional
+import math
+import asyncio
+import io
+import logging
+import tempfile
+from pydantic import BaseModel, Field
+
+from db import connect, get_pool
+from json_body import JSONBody, compact_json, encode_page, encode_row
+import analytics
+from availability import availability_feed
+import bulk_import
+from catalog_cache import catalog_cache
+import inventory
+import metrics
+from pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, select_fields
+from prices import format_prices
+from repository import EVENT_COLUMNS, ORDER_COLUMNS, TICKET_COLUMNS, create_schema, get_repository, seed_events
+import export
+import indexer
+from verification_log import verification_log
+from verification_index import VERIFICATION_SYNC_INTERVAL, verification_index, preload_event_ids
+from verification_pages import verification_pages, choose_encoding
+from scan_snapshot import DELTA, ScanSnapshotCache
+from signatures import signature_verifier
+from nonce_store import nonce_store, RateLimited, StoreFull
+from token_cache import TokenCache, revocation_id, revoked_tokens
+from shared_state import get_state
+from profiler import profiler
 
 # Initialize FastAPI app
 app = FastAPI(
     title="NFT Ticketing API",
     description="Backend API for NFT Ticketing dApp",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=JSONBody
 )
 
 # CORS middleware
@@ -29,105 +56,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request latency, status codes and in-flight requests for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+logger = logging.getLogger("nft_tickets")
 
 # Security
 security = HTTPBearer()
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
+token_cache = TokenCache(JWT_ALGORITHM, revoked_tokens)
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+# Offline scanner snapshots are signed with a key derived from this secret
+SNAPSHOT_SIGNING_SECRET = os.getenv("SNAPSHOT_SIGNING_SECRET") or JWT_SECRET
+scan_snapshots = ScanSnapshotCache(SNAPSHOT_SIGNING_SECRET)
 
-# Database setup
-DATABASE_PATH = "nft_tickets.db"
+# Database setup (DATABASE_URL picks SQLite or PostgreSQL, see repository.py)
+repository = get_repository()
 
 def init_database():
-    """Initialize SQLite database with required tables"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Users table for nonce-based authentication
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            address TEXT PRIMARY KEY,
-            nonce TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
-        )
-    """)
-    
-    # Events table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            date TEXT NOT NULL,
-            time TEXT NOT NULL,
-            venue TEXT NOT NULL,
-            location TEXT NOT NULL,
-            price TEXT NOT NULL,
-            capacity INTEGER NOT NULL,
-            sold INTEGER DEFAULT 0,
-            image_url TEXT,
-            features TEXT, -- JSON array
-            artists TEXT, -- JSON array
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Orders table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_address TEXT NOT NULL,
-            event_id INTEGER NOT NULL,
-            quantity INTEGER NOT NULL,
-            seat_type TEXT NOT NULL,
-            total_price TEXT NOT NULL,
-            status TEXT DEFAULT 'pending', -- pending, confirmed, failed
-            tx_hash TEXT,
-            token_ids TEXT, -- JSON array of minted token IDs
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (event_id) REFERENCES events (id)
-        )
-    """)
-    
-    # Tickets table for verification
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tickets (
-            token_id INTEGER PRIMARY KEY,
-            event_id INTEGER NOT NULL,
-            owner_address TEXT NOT NULL,
-            seat TEXT NOT NULL,
-            status TEXT DEFAULT 'active', -- active, used, expired
-            metadata_uri TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            verified_at TIMESTAMP,
-            FOREIGN KEY (event_id) REFERENCES events (id)
-        )
-    """)
-    
-    # Verification logs
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS verification_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            token_id INTEGER NOT NULL,
-            verifier_address TEXT,
-            status TEXT NOT NULL, -- valid, invalid
-            verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
+    """Create the SQLite schema synchronously (scripts; the API uses repository.init_schema)"""
+    conn = connect()
+    create_schema(conn)
     conn.close()
 
-@contextmanager
 def get_db():
-    """Database connection context manager"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """SQLite connection context manager (borrows a pooled connection)"""
+    return get_pool().connection()
 
 # Pydantic models
 class NonceRequest(BaseModel):
@@ -144,37 +100,38 @@ class PurchaseRequest(BaseModel):
     seat_type: str
     tx_hash: str
 
+VERIFY_BATCH_MAX = int(os.getenv("VERIFY_BATCH_MAX", "500"))  # tickets per /verify/batch request
+
+class BatchVerifyRequest(BaseModel):
+    token_ids: List[int] = Field(..., min_length=1, max_length=VERIFY_BATCH_MAX)
+    event_id: Optional[int] = None
+    all_or_nothing: bool = False
+
 class VerifyTicketResponse(BaseModel):
     is_valid: bool
     ticket: Optional[dict] = None
     error: Optional[str] = None
 
 # Utility functions
-def generate_nonce() -> str:
-    """Generate a random nonce for signature verification"""
-    return secrets.token_hex(16)
-
 def create_jwt_token(address: str) -> str:
     """Create JWT token for authenticated user"""
     payload = {
         "address": address,
         "exp": datetime.utcnow() + timedelta(hours=24),
-        "iat": datetime.utcnow()
+        "iat": datetime.utcnow(),
+        "jti": secrets.token_hex(12)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def verify_jwt_token(token: str) -> Optional[str]:
     """Verify JWT token and return address"""
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload.get("address")
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
-        return None
+    payload = token_cache.verify(token, JWT_SECRET)
+    return payload.get("address") if payload else None
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     """Get current authenticated user from JWT token"""
+    if revoked_tokens.changed():
+        await revoked_tokens.load()
     address = verify_jwt_token(credentials.credentials)
     if not address:
         raise HTTPException(
@@ -183,82 +140,162 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     return address
 
+async def require_admin(api_key: Optional[str] = Depends(admin_key_header)):
+    """Allow admin endpoints only with the configured X-Admin-Key"""
+    if not ADMIN_API_KEY or not api_key or not secrets.compare_digest(api_key, ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
 # Seed initial data
+SEED_EVENTS = [
+    {
+        "name": "Neon Dreams Festival",
+        "description": "Experience the future of music at Neon Dreams Festival. Featuring top electronic artists, holographic performances, and immersive 3D visuals that will transport you to another dimension.",
+        "date": "2024-03-15",
+        "time": "19:00",
+        "venue": "Cyber Arena",
+        "location": "Neo Tokyo, Sector 7",
+        "price": "0.05 ETH",
+        "capacity": 5000,
+        "sold": 3247,
+        "image_url": "/futuristic-concert-stage-with-neon-lights.jpg",
+        "features": compact_json(["3D Holographic Stage", "VR Experience Zones", "NFT Art Gallery", "Exclusive Merch"]),
+        "artists": compact_json(["CyberSynth", "Neon Pulse", "Digital Dreams", "Quantum Beat"])
+    },
+    {
+        "name": "Digital Art Expo",
+        "description": "Discover the cutting-edge of digital art in this immersive exhibition featuring NFT masterpieces, interactive installations, and live digital art creation.",
+        "date": "2024-03-22",
+        "time": "14:00",
+        "venue": "Meta Gallery",
+        "location": "Virtual District, Level 42",
+        "price": "0.03 ETH",
+        "capacity": 2000,
+        "sold": 1456,
+        "image_url": "/digital-art-gallery-with-holographic-displays.jpg",
+        "features": compact_json(["Interactive NFT Gallery", "Live Art Creation", "AR Exhibitions", "Artist Meet & Greet"]),
+        "artists": compact_json(["PixelMaster", "CryptoCanvas", "MetaArt Collective", "Digital Dreamers"])
+    },
+    {
+        "name": "Blockchain Summit",
+        "description": "Join industry leaders and innovators at the premier blockchain conference. Learn about the latest developments in DeFi, NFTs, and Web3 technologies.",
+        "date": "2024-04-01",
+        "time": "09:00",
+        "venue": "Tech Hub",
+        "location": "Innovation Center, Floor 50",
+        "price": "0.08 ETH",
+        "capacity": 3000,
+        "sold": 2789,
+        "image_url": "/futuristic-tech-conference-with-blockchain-visuals.jpg",
+        "features": compact_json(["Expert Keynotes", "Networking Sessions", "Tech Demos", "Startup Showcase"]),
+        "artists": compact_json(["Vitalik Buterin", "Changpeng Zhao", "Brian Armstrong", "Cathie Wood"])
+    }
+]
+
 def seed_database():
-    """Seed database with initial event data"""
+    """Seed the SQLite database with initial event data (scripts)"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Check if events already exist
-        cursor.execute("SELECT COUNT(*) FROM events")
-        if cursor.fetchone()[0] > 0:
-            return
-        
-        # Insert sample events
-        events = [
-            {
-                "name": "Neon Dreams Festival",
-                "description": "Experience the future of music at Neon Dreams Festival. Featuring top electronic artists, holographic performances, and immersive 3D visuals that will transport you to another dimension.",
-                "date": "2024-03-15",
-                "time": "19:00",
-                "venue": "Cyber Arena",
-                "location": "Neo Tokyo, Sector 7",
-                "price": "0.05 ETH",
-                "capacity": 5000,
-                "sold": 3247,
-                "image_url": "/futuristic-concert-stage-with-neon-lights.jpg",
-                "features": json.dumps(["3D Holographic Stage", "VR Experience Zones", "NFT Art Gallery", "Exclusive Merch"]),
-                "artists": json.dumps(["CyberSynth", "Neon Pulse", "Digital Dreams", "Quantum Beat"])
-            },
-            {
-                "name": "Digital Art Expo",
-                "description": "Discover the cutting-edge of digital art in this immersive exhibition featuring NFT masterpieces, interactive installations, and live digital art creation.",
-                "date": "2024-03-22",
-                "time": "14:00",
-                "venue": "Meta Gallery",
-                "location": "Virtual District, Level 42",
-                "price": "0.03 ETH",
-                "capacity": 2000,
-                "sold": 1456,
-                "image_url": "/digital-art-gallery-with-holographic-displays.jpg",
-                "features": json.dumps(["Interactive NFT Gallery", "Live Art Creation", "AR Exhibitions", "Artist Meet & Greet"]),
-                "artists": json.dumps(["PixelMaster", "CryptoCanvas", "MetaArt Collective", "Digital Dreamers"])
-            },
-            {
-                "name": "Blockchain Summit",
-                "description": "Join industry leaders and innovators at the premier blockchain conference. Learn about the latest developments in DeFi, NFTs, and Web3 technologies.",
-                "date": "2024-04-01",
-                "time": "09:00",
-                "venue": "Tech Hub",
-                "location": "Innovation Center, Floor 50",
-                "price": "0.08 ETH",
-                "capacity": 3000,
-                "sold": 2789,
-                "image_url": "/futuristic-tech-conference-with-blockchain-visuals.jpg",
-                "features": json.dumps(["Expert Keynotes", "Networking Sessions", "Tech Demos", "Startup Showcase"]),
-                "artists": json.dumps(["Vitalik Buterin", "Changpeng Zhao", "Brian Armstrong", "Cathie Wood"])
-            }
-        ]
-        
-        for event in events:
-            cursor.execute("""
-                INSERT INTO events (name, description, date, time, venue, location, price, capacity, sold, image_url, features, artists)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                event["name"], event["description"], event["date"], event["time"],
-                event["venue"], event["location"], event["price"], event["capacity"],
-                event["sold"], event["image_url"], event["features"], event["artists"]
-            ))
-        
-        conn.commit()
+        seeded = seed_events(conn, SEED_EVENTS)
+    if seeded:
+        catalog_cache.invalidate()
+        availability_feed.mark()
 
 # API Routes
 
+async def release_expired_holds_periodically():
+    """Return seats from expired holds to inventory"""
+    while True:
+        await asyncio.sleep(inventory.SWEEP_INTERVAL)
+        try:
+            for event_id in await repository.release_expired_holds():
+                catalog_cache.invalidate(event_id)
+                availability_feed.mark(event_id)
+        except Exception:
+            logger.exception("Failed to release expired seat holds")
+
+def publish_ticket_changes(changes):
+    """Drop cached pages of changed tickets and send the (token_id, event_id, owner, seat, status) records to other workers"""
+    verification_index.publish(changes)
+    verification_pages.invalidate([change[0] for change in changes])
+
+def apply_indexed_changes(summary: dict):
+    """Keep in-memory state in step with tickets written by the indexer"""
+    changes = [(token_id, event_id, owner, seat, "active") for token_id, event_id, owner, seat in summary["mints"]]
+    changes += [(token_id, None, owner, None, None) for owner, token_id in summary["transfers"]]
+    changes += [(token_id, None, None, None, "used") for token_id in summary["used"]]
+    verification_index.apply(changes)
+    if changes:
+        publish_ticket_changes(changes)
+    for event_id in summary["restored_events"]:
+        catalog_cache.invalidate(event_id)
+        availability_feed.mark(event_id)
+
+async def index_chain_periodically(source):
+    """Ingest confirmed contract logs into the tickets table"""
+    chain_indexer = indexer.Indexer(source, on_batch=apply_indexed_changes, repository=repository)
+    while True:
+        try:
+            # One worker indexes; another takes over if it exits
+            if get_state().leader("indexer"):
+                await chain_indexer.run_once()
+        except Exception:
+            logger.exception("Blockchain indexer pass failed")
+        await asyncio.sleep(indexer.INDEXER_POLL_INTERVAL)
+
+async def pull_verification_index_periodically():
+    """Apply other workers' ticket changes even while nobody scans here"""
+    while True:
+        await asyncio.sleep(VERIFICATION_SYNC_INTERVAL)
+        try:
+            if verification_index.changed():
+                await pull_verification_index()
+        except Exception:
+            logger.exception("Failed to apply ticket changes from other workers")
+
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and seed data on startup"""
-    init_database()
-    seed_database()
+    # Workers start concurrently; let one migrate and seed at a time
+    with get_state().exclusive("startup"):
+        await repository.init_schema()
+        # Rows written before integer prices (or by an older worker mid-deploy)
+        await repository.convert_prices()
+        if await repository.seed_events(SEED_EVENTS):
+            catalog_cache.invalidate()
+            availability_feed.mark()
+    background_tasks.append(asyncio.create_task(release_expired_holds_periodically()))
+    verification_log.start()
+    availability_feed.start()
+    await nonce_store.load()
+    await revoked_tokens.load()
+    nonce_store.start()
+    for event_id in preload_event_ids():
+        verification_index.pin(event_id)
+    await sync_verification_index()
+    background_tasks.append(asyncio.create_task(pull_verification_index_periodically()))
+    chain_source = indexer.source_from_env()
+    if chain_source is not None:
+        background_tasks.append(asyncio.create_task(index_chain_periodically(chain_source)))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered writes and release pooled database connections"""
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    if index_reload is not None:
+        index_reload.cancel()
+    verification_index.shutdown()
+    await availability_feed.stop()
+    await verification_log.stop()
+    await nonce_store.stop()
+    signature_verifier.shutdown()
+    profiler.stop()
+    await repository.close()
 
 @app.get("/")
 async def root():
@@ -270,49 +307,134 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Event catalog and JWT cache hit/miss counters"""
+    return {
+        "catalog": catalog_cache.stats(),
+        "jwt": token_cache.stats(),
+        "verification_pages": verification_pages.stats(),
+        "scan_snapshots": scan_snapshots.stats(),
+    }
+
+# Observability
+def _cache_metrics():
+    """Hit and miss counters of the in-memory caches, for /metrics"""
+    caches = {"catalog": catalog_cache, "jwt": token_cache, "verification_pages": verification_pages}
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    for stat in ("hits", "misses"):
+        yield (f"cache_{stat}_total", "counter", f"Cache {stat}",
+               [({"cache": name}, values[stat]) for name, values in stats.items()])
+
+metrics.registry.collectors.append(_cache_metrics)
+
+def _availability_metrics():
+    """Live availability feed subscribers and pushes, for /metrics"""
+    stats = availability_feed.stats()
+    yield ("availability_subscribers", "gauge", "Open availability streams", [({}, stats["subscribers"])])
+    yield ("availability_reads_total", "counter", "Sold-count reads by the availability feed", [({}, stats["reads"])])
+    yield ("availability_frames_total", "counter", "Availability frames encoded for subscribers",
+           [({}, stats["frames"])])
+
+metrics.registry.collectors.append(_availability_metrics)
+
+def _verification_log_metrics():
+    """Scans waiting to be written, and scans dropped during a database outage, for /metrics"""
+    stats = verification_log.stats()
+    yield ("verification_log_pending", "gauge", "Scans buffered for the verification log", [({}, stats["pending"])])
+    yield ("verification_log_dropped_total", "counter", "Scans dropped from a verification log backlog",
+           [({}, stats["dropped"])])
+
+metrics.registry.collectors.append(_verification_log_metrics)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request, SQL and cache metrics of this worker in the Prometheus text format"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admin/metrics/slow-queries", dependencies=[Depends(require_admin)])
+async def slow_queries():
+    """The latest SQL statements slower than DB_SLOW_QUERY_MS, newest first"""
+    return {
+        "threshold_ms": metrics.DB_SLOW_QUERY_MS,
+        "queries": [
+            {"at": datetime.utcfromtimestamp(at).isoformat(), "ms": ms, "rows": rows, "sql": sql}
+            for at, ms, rows, sql in reversed(metrics.slow_queries)
+        ],
+    }
+
+@app.get("/admin/profiler", dependencies=[Depends(require_admin)])
+async def profiler_status():
+    return profiler.status()
+
+@app.post("/admin/profiler/start", dependencies=[Depends(require_admin)])
+async def start_profiler(
+    interval_ms: Optional[float] = Query(None, gt=0, le=1000),
+    max_seconds: Optional[float] = Query(None, gt=0)
+):
+    """Start sampling every thread's stack; the previous samples are discarded"""
+    if not profiler.start(interval_ms, max_seconds):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return profiler.status()
+
+@app.post("/admin/profiler/stop", dependencies=[Depends(require_admin)])
+async def stop_profiler():
+    profiler.stop()
+    return profiler.status()
+
+@app.get("/admin/profiler/folded", dependencies=[Depends(require_admin)])
+async def profiler_folded(limit: Optional[int] = Query(None, ge=1)):
+    """Samples so far as folded stacks, for flamegraph.pl or speedscope"""
+    return Response(content=profiler.folded(limit), media_type="text/plain")
+
 # Authentication endpoints
+AUTH_MESSAGE = "Sign this message to authenticate with NFT Tickets: {nonce}"
+
 @app.get("/auth/nonce")
-async def get_nonce(address: str):
+async def get_nonce(address: str, request: Request):
     """Get nonce for wallet signature authentication"""
     if not address:
         raise HTTPException(status_code=400, detail="Address is required")
     
-    nonce = generate_nonce()
-    
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO users (address, nonce)
-            VALUES (?, ?)
-        """, (address.lower(), nonce))
-        conn.commit()
+    client = request.client.host if request.client else ""
+    try:
+        nonce = await nonce_store.issue_async(address.lower(), client)
+    except StoreFull as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))}
+        )
+    except RateLimited as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many nonce requests",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))}
+        )
     
     return {
         "nonce": nonce,
-        "message": f"Sign this message to authenticate with NFT Tickets: {nonce}"
+        "message": AUTH_MESSAGE.format(nonce=nonce)
     }
 
 @app.post("/auth/verify")
 async def verify_signature(request: VerifySignatureRequest):
     """Verify wallet signature and return JWT token"""
     address = request.address.lower()
-    
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT nonce FROM users WHERE address = ?", (address,))
-        user = cursor.fetchone()
-        
-        if not user:
-            raise HTTPException(status_code=400, detail="Nonce not found for address")
-        
-        # In a real implementation, you would verify the signature here
-        # For demo purposes, we'll assume the signature is valid
-        
-        # Update last login
-        cursor.execute("""
-            UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE address = ?
-        """, (address,))
-        conn.commit()
+    nonce = await nonce_store.peek_async(address)
+    if nonce is None:
+        raise HTTPException(status_code=400, detail="Nonce not found or expired")
+    message = AUTH_MESSAGE.format(nonce=nonce)
+    if request.message != message:
+        raise HTTPException(status_code=400, detail="Message does not match the issued nonce")
+    if not await signature_verifier.verify(address, message, request.signature):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    # Single use, consumed only by the wallet's own signature: anyone can
+    # post a bad one for this address, and that must not burn the nonce
+    if await nonce_store.take_async(address, nonce) is None:
+        raise HTTPException(status_code=400, detail="Nonce not found or expired")
+
+    await repository.record_login(address, nonce)
     
     token = create_jwt_token(address)
     
@@ -322,49 +444,88 @@ async def verify_signature(request: VerifySignatureRequest):
         "expires_in": 86400  # 24 hours
     }
 
+@app.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the presented JWT before it expires"""
+    payload = token_cache.verify(credentials.credentials, JWT_SECRET)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+    if "exp" not in payload:
+        raise HTTPException(status_code=400, detail="Token without expiry cannot be revoked")
+    await revoked_tokens.revoke(revocation_id(credentials.credentials, payload), payload["exp"])
+    return {"revoked": True}
+
 # Events endpoints
+# Stored as JSON text and spliced into responses as is
+EVENT_JSON_FIELDS = ("features", "artists")
+
+def _encode_event(event: dict) -> bytes:
+    return encode_row(format_prices(event), EVENT_JSON_FIELDS, empty=b"[]")
+
+def _cached_response(request: Request, entry) -> Response:
+    """Serve a pre-serialised cache entry, or 304 if the client already has it"""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
 @app.get("/events")
-async def get_events():
-    """Get all events"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, name, description, date, time, venue, location, price, 
-                   capacity, sold, image_url, features, artists, created_at
-            FROM events
-            ORDER BY date ASC
-        """)
-        events = cursor.fetchall()
-    
-    result = []
-    for event in events:
-        event_dict = dict(event)
-        event_dict["features"] = json.loads(event_dict["features"]) if event_dict["features"] else []
-        event_dict["artists"] = json.loads(event_dict["artists"]) if event_dict["artists"] else []
-        result.append(event_dict)
+async def get_events(
+    request: Request,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get events, ordered by date (paginated)"""
+    page_key = (cursor, limit, fields)
+    entry = catalog_cache.get_events(page_key)
+    if entry is None:
+        columns = select_fields(fields, EVENT_COLUMNS)
+        generation = catalog_cache.generation
+        events, next_cursor = await repository.fetch_events(columns, cursor, limit)
+        # Page rows are fresh dicts, encoded without copying
+        body = encode_page("events", map(_encode_event, events), next_cursor)
+        entry = catalog_cache.store_events(page_key, body, generation)
     
-    return {"events": result}
+    return _cached_response(request, entry)
 
 @app.get("/events/{event_id}")
-async def get_event(event_id: int):
+async def get_event(event_id: int, request: Request):
     """Get specific event by ID"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, name, description, date, time, venue, location, price, 
-                   capacity, sold, image_url, features, artists, created_at
-            FROM events WHERE id = ?
-        """, (event_id,))
-        event = cursor.fetchone()
-    
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    event_dict = dict(event)
-    event_dict["features"] = json.loads(event_dict["features"]) if event_dict["features"] else []
-    event_dict["artists"] = json.loads(event_dict["artists"]) if event_dict["artists"] else []
+    entry = catalog_cache.get_event(event_id)
+    if entry is None:
+        generation = catalog_cache.generation
+        event = await repository.fetch_event(event_id)
+        
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        
+        entry = catalog_cache.store_event(event_id, _encode_event(dict(event)), generation)
     
-    return event_dict
+    return _cached_response(request, entry)
+
+# Live availability (Server-Sent Events)
+class AvailabilityStream:
+    """Sold and available seats of one event, or of every event, pushed as they change
+
+    A plain ASGI route rather than a FastAPI one: streams stay open for
+    minutes, and FastAPI's per-request state would add about 40% to what
+    every idle subscriber holds (scripts/bench_availability.py).
+    """
+
+    async def __call__(self, scope, receive, send):
+        event_id = scope["path_params"].get("event_id")
+        await availability_feed.load()
+        if event_id is not None and not availability_feed.has_event(event_id):
+            await JSONResponse({"detail": "Event not found"}, status_code=404)(scope, receive, send)
+            return
+        await availability_feed.serve(event_id, receive, send)
+
+app.router.routes.append(Route("/events/availability/stream", AvailabilityStream(), methods=["GET"]))
+app.router.routes.append(Route("/events/{event_id:int}/availability/stream", AvailabilityStream(), methods=["GET"]))
 
 # Purchase endpoints
 @app.post("/purchase")
@@ -373,223 +534,331 @@ async def create_purchase(
     current_user: str = Depends(get_current_user)
 ):
     """Create a purchase order"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Get event details
-        cursor.execute("SELECT price, capacity, sold FROM events WHERE id = ?", (request.event_id,))
-        event = cursor.fetchone()
-        
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        
-        # Check availability
-        if event["sold"] + request.quantity > event["capacity"]:
-            raise HTTPException(status_code=400, detail="Not enough tickets available")
-        
-        # Calculate total price
-        price_per_ticket = float(event["price"].replace(" ETH", ""))
-        total_price = f"{price_per_ticket * request.quantity:.3f} ETH"
-        
-        # Create order
-        cursor.execute("""
-            INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, tx_hash)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (current_user, request.event_id, request.quantity, request.seat_type, total_price, request.tx_hash))
-        
-        order_id = cursor.lastrowid
-        
-        # Update sold count
-        cursor.execute("""
-            UPDATE events SET sold = sold + ? WHERE id = ?
-        """, (request.quantity, request.event_id))
-        
-        conn.commit()
+    try:
+        order_id, total_gwei = await repository.create_order(
+            current_user, request.event_id, request.quantity, request.seat_type, request.tx_hash.lower()
+        )
+    except inventory.EventNotFound:
+        raise HTTPException(status_code=404, detail="Event not found")
+    except inventory.NotEnoughTickets as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    catalog_cache.invalidate(request.event_id)
+    availability_feed.mark(request.event_id)
     
     return {
         "order_id": order_id,
         "status": "pending",
-        "total_price": total_price,
+        **format_prices({"total_price": total_gwei, "total_price_wei": total_gwei}),
         "message": "Order created successfully. Waiting for blockchain confirmation."
     }
 
 @app.get("/orders")
-async def get_user_orders(current_user: str = Depends(get_current_user)):
-    """Get user's purchase orders"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT o.*, e.name as event_name, e.date, e.venue
-            FROM orders o
-            JOIN events e ON o.event_id = e.id
-            WHERE o.user_address = ?
-            ORDER BY o.created_at DESC
-        """, (current_user,))
-        orders = cursor.fetchall()
+async def get_user_orders(
+    current_user: str = Depends(get_current_user),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get user's purchase orders, newest first (paginated)"""
+    columns = select_fields(fields, ORDER_COLUMNS)
+    orders, next_cursor = await repository.fetch_user_orders(current_user, columns, cursor, limit)
     
-    return {"orders": [dict(order) for order in orders]}
+    return JSONBody({"orders": [format_prices(order) for order in orders], "next_cursor": next_cursor})
 
 # Verification endpoints
-@app.get("/verify/{token_id}")
+async def sync_verification_index():
+    """Reload every pinned event (at startup, after imports, or when changes cannot be pulled)"""
+    verification_index.begin_reload()
+    indexes = []
+    for event_id in await asyncio.to_thread(verification_index.pinned):
+        index = await repository.load_ticket_index(event_id)
+        if index is not None:
+            indexes.append(index)
+    verification_index.replace(indexes)
+    # Changes published during the reload
+    await pull_verification_index()
+
+index_reload: Optional[asyncio.Task] = None
+index_reload_again = False
+index_pull: Optional[asyncio.Future] = None
+
+async def reload_verification_index_until_current():
+    global index_reload_again
+    try:
+        while True:
+            index_reload_again = False
+            await sync_verification_index()
+            if not index_reload_again:
+                break
+    except Exception:
+        logger.exception("Failed to reload the verification index")
+
+def reload_verification_index():
+    """Reload every pinned event in the background; scans keep using the old copies meanwhile"""
+    global index_reload, index_reload_again
+    if index_reload is not None and not index_reload.done():
+        # The running reload may have read the tickets before this change
+        index_reload_again = True
+        return
+    index_reload = asyncio.create_task(reload_verification_index_until_current())
+
+async def pull_verification_index():
+    """Apply ticket changes other workers published, sharing one pull between concurrent scans"""
+    global index_pull
+    if index_pull is None or index_pull.done():
+        index_pull = asyncio.ensure_future(asyncio.to_thread(verification_index.pull))
+    if await asyncio.shield(index_pull):
+        reload_verification_index()
+
+async def find_ticket(token_id: int):
+    """Ticket with its event details, from the scan index or the database"""
+    if verification_index.changed():
+        await pull_verification_index()
+    ticket = verification_index.lookup(token_id)
+    if ticket is None:
+        ticket = await repository.lookup_ticket(token_id)
+    return ticket
+
+@app.get("/verify/{token_id}", response_model=VerifyTicketResponse)
 async def verify_ticket(token_id: int):
     """Verify ticket by token ID"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT t.*, e.name as event_name, e.date, e.venue
-            FROM tickets t
-            JOIN events e ON t.event_id = e.id
-            WHERE t.token_id = ?
-        """, (token_id,))
-        ticket = cursor.fetchone()
-        
-        if not ticket:
-            # Log failed verification
-            cursor.execute("""
-                INSERT INTO verification_logs (token_id, status)
-                VALUES (?, 'invalid')
-            """, (token_id,))
-            conn.commit()
-            
-            return VerifyTicketResponse(
-                is_valid=False,
-                error="Ticket not found or invalid"
-            )
-        
-        # Log successful verification
-        cursor.execute("""
-            INSERT INTO verification_logs (token_id, status)
-            VALUES (?, 'valid')
-        """, (token_id,))
-        
-        # Update ticket verification timestamp
-        cursor.execute("""
-            UPDATE tickets SET verified_at = CURRENT_TIMESTAMP WHERE token_id = ?
-        """, (token_id,))
-        
-        conn.commit()
+    ticket = await find_ticket(token_id)
+    
+    # Log the verification (and bump tickets.verified_at) via the write-behind queue
+    await verification_log.log(token_id, "valid" if ticket else "invalid")
     
-    ticket_dict = dict(ticket)
+    if not ticket:
+        return JSONBody({"is_valid": False, "ticket": None, "error": "Ticket not found or invalid"})
     
-    return VerifyTicketResponse(
-        is_valid=True,
-        ticket={
-            "tokenId": ticket_dict["token_id"],
-            "eventName": ticket_dict["event_name"],
-            "date": ticket_dict["date"],
-            "venue": ticket_dict["venue"],
-            "seat": ticket_dict["seat"],
-            "owner": ticket_dict["owner_address"],
-            "status": ticket_dict["status"],
+    # Read straight from the index dict or database row, sent without validation
+    return JSONBody({
+        "is_valid": True,
+        "ticket": {
+            "tokenId": ticket["token_id"],
+            "eventName": ticket["event_name"],
+            "date": ticket["date"],
+            "venue": ticket["venue"],
+            "seat": ticket["seat"],
+            "owner": ticket["owner_address"],
+            "status": ticket["status"],
             "verifiedAt": datetime.utcnow().isoformat()
-        }
+        },
+        "error": None
+    })
+
+@app.post("/verify/batch", dependencies=[Depends(require_admin)])
+async def verify_ticket_batch(request: BatchVerifyRequest):
+    """Validate and redeem (active -> used) many tickets in one transaction"""
+    results = await repository.redeem_tickets(request.token_ids, request.event_id, request.all_or_nothing)
+    
+    redeemed = [(result["token_id"], None, None, None, "used") for result in results if result["result"] == "redeemed"]
+    verification_index.apply(redeemed)
+    if redeemed:
+        publish_ticket_changes(redeemed)
+    for result in results:
+        verification_log.submit(result["token_id"], "valid" if result["result"] == "redeemed" else "invalid")
+    
+    return {"results": results, "redeemed": len(redeemed), "rejected": len(results) - len(redeemed)}
+
+# Admin: gate-scanning index
+@app.post("/admin/verification-index/{event_id}", dependencies=[Depends(require_admin)])
+async def preload_verification_index(event_id: int):
+    """Preload all tickets for an event into the in-memory scan index"""
+    index = await repository.load_ticket_index(event_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    count = verification_index.install(index)
+    verification_index.pin(event_id)
+    return {"event_id": event_id, "tickets": count}
+
+@app.delete("/admin/verification-index/{event_id}", dependencies=[Depends(require_admin)])
+async def unload_verification_index(event_id: int):
+    """Drop an event from the in-memory scan index"""
+    if not verification_index.unload(event_id):
+        raise HTTPException(status_code=404, detail="Event not indexed")
+    verification_index.unpin(event_id)
+    return {"event_id": event_id, "unloaded": True}
+
+@app.get("/admin/verification-index", dependencies=[Depends(require_admin)])
+async def verification_index_stats():
+    """Indexed events and hit/miss counters"""
+    return verification_index.stats()
+
+# Offline scanning
+@app.get("/events/{event_id}/scan-snapshot", dependencies=[Depends(require_admin)])
+async def get_scan_snapshot(event_id: int, request: Request, since: Optional[int] = Query(None, ge=0)):
+    """Signed snapshot of an event's ticket statuses, or the delta since a version"""
+    download = await scan_snapshots.download(repository, event_id, since)
+    if download is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    kind, version, payload = download
+    base = f"{since}-" if kind == DELTA else ""
+    headers = {
+        "ETag": f'"{event_id}-{base}{version}"',
+        "Cache-Control": "no-cache",
+        "X-Snapshot-Kind": "delta" if kind == DELTA else "full",
+        "X-Snapshot-Version": str(version),
+        "X-Snapshot-Signer": scan_snapshots.signer,
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/octet-stream", headers=headers)
+
+# Admin: sales reports
+async def _sales_report(group: str, status: str, event_id: Optional[int], since: Optional[str], until: Optional[str]):
+    try:
+        since, until = export.parse_timestamp(since), export.parse_timestamp(until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be ISO dates or datetimes")
+    rows = await repository.sales_report(group, status, event_id, since, until)
+    return [format_prices(dict(row)) for row in rows]
+
+@app.get("/admin/sales/events", dependencies=[Depends(require_admin)])
+async def sales_by_event(
+    status: str = Query("confirmed", pattern="^(pending|confirmed|failed)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Orders, tickets and revenue per event"""
+    return {"events": await _sales_report("event", status, None, since, until)}
+
+@app.get("/admin/sales/daily", dependencies=[Depends(require_admin)])
+async def sales_by_day(
+    status: str = Query("confirmed", pattern="^(pending|confirmed|failed)$"),
+    event_id: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Orders, tickets and revenue per UTC day, optionally for one event"""
+    return {"days": await _sales_report("day", status, event_id, since, until)}
+
+# Admin: organizer analytics, read from the rollup tables
+def _format_stats(stats: dict) -> dict:
+    for seat in stats["seat_types"]:
+        format_prices(seat)
+    return format_prices(stats)
+
+@app.get("/admin/analytics/events", dependencies=[Depends(require_admin)])
+async def analytics_dashboard():
+    """Sales and scan figures of every event"""
+    sales_rows, scan_rows = await repository.analytics_totals()
+    return {"events": [_format_stats(stats) for stats in analytics.dashboard(sales_rows, scan_rows)]}
+
+@app.get("/admin/analytics/events/{event_id}", dependencies=[Depends(require_admin)])
+async def analytics_event(event_id: int):
+    """Sales per seat type and scan figures of one event"""
+    if await repository.fetch_event(event_id) is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    sales_rows, scan_rows = await repository.analytics_totals(event_id)
+    return _format_stats(analytics.event_stats(event_id, sales_rows, scan_rows[0] if scan_rows else None))
+
+@app.get("/admin/analytics/events/{event_id}/hourly", dependencies=[Depends(require_admin)])
+async def analytics_event_hourly(event_id: int, since: Optional[str] = None, until: Optional[str] = None):
+    """Sales per hour, seat type and order status, and scans per hour, of one event"""
+    try:
+        since, until = export.parse_timestamp(since), export.parse_timestamp(until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be ISO dates or datetimes")
+    sales_rows, scan_rows = await repository.analytics_hourly(event_id, since, until)
+    return {
+        "event_id": event_id,
+        "sales": [format_prices(dict(row)) for row in sales_rows],
+        "scans": [dict(row) for row in scan_rows],
+    }
+
+@app.post("/admin/analytics/check", dependencies=[Depends(require_admin)])
+async def analytics_check(repair: bool = False):
+    """Compare the rollups with the raw tables; ``repair`` rebuilds them"""
+    return await repository.check_analytics(repair=repair)
+
+# Admin: data exports
+@app.get("/admin/export/{table}", dependencies=[Depends(require_admin)])
+async def export_table(
+    table: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    event_id: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Stream a full table dump as NDJSON or CSV"""
+    if table not in export.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {table}")
+    try:
+        since, until = export.parse_timestamp(since), export.parse_timestamp(until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be ISO dates or datetimes")
+    
+    filename = f"{table}.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        export.stream_export(table, format, event_id, since, until),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
+# Admin: bulk imports
+@app.post("/admin/import/{table}", dependencies=[Depends(require_admin)])
+async def import_table(
+    table: str,
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    """Load a CSV or NDJSON body into events, tickets or orders, all or nothing"""
+    if table not in bulk_import.IMPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown import: {table}")
+    # Spooled to disk, so a large upload never sits in memory; the writes
+    # block, so they run on a thread like the parsing does
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            await asyncio.to_thread(spool.write, chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        try:
+            rows = await repository.import_rows(
+                table, bulk_import.import_columns(table), bulk_import.read_chunks(table, lines, format)
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    bulk_import.publish(table)
+    if table == "tickets":
+        # Cached "not found" pages and preloaded events predate the new tickets
+        verification_pages.clear()
+        await sync_verification_index()
+    return {"table": table, "rows": rows}
+
 @app.get("/verify/{token_id}/page", response_class=HTMLResponse)
-async def verify_ticket_page(token_id: int):
-    """Human-friendly verification page"""
-    verification = await verify_ticket(token_id)
+async def verify_ticket_page(token_id: int, request: Request):
+    """Human-friendly verification page (pre-rendered and compressed per ticket)"""
+    entry = verification_pages.get(token_id)
+    if entry is None:
+        generation = verification_pages.generation
+        ticket = await find_ticket(token_id)
+        entry = verification_pages.store(token_id, dict(ticket) if ticket else None, generation)
     
-    if verification.is_valid and verification.ticket:
-        ticket = verification.ticket
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Ticket Verification - NFT Tickets</title>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <style>
-                body {{ font-family: Arial, sans-serif; background: #0f172a; color: white; margin: 0; padding: 20px; }}
-                .container {{ max-width: 600px; margin: 0 auto; }}
-                .valid {{ background: linear-gradient(135deg, #10b981, #059669); padding: 20px; border-radius: 10px; }}
-                .ticket-info {{ background: #1e293b; padding: 20px; border-radius: 10px; margin-top: 20px; }}
-                .status {{ font-size: 24px; font-weight: bold; margin-bottom: 10px; }}
-                .detail {{ margin: 10px 0; }}
-                .label {{ color: #94a3b8; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="valid">
-                    <div class="status">✅ Valid Ticket</div>
-                    <p>This NFT ticket has been verified on the blockchain.</p>
-                </div>
-                <div class="ticket-info">
-                    <h2>Ticket Details</h2>
-                    <div class="detail"><span class="label">Token ID:</span> #{ticket['tokenId']}</div>
-                    <div class="detail"><span class="label">Event:</span> {ticket['eventName']}</div>
-                    <div class="detail"><span class="label">Date:</span> {ticket['date']}</div>
-                    <div class="detail"><span class="label">Venue:</span> {ticket['venue']}</div>
-                    <div class="detail"><span class="label">Seat:</span> {ticket['seat']}</div>
-                    <div class="detail"><span class="label">Status:</span> {ticket['status'].title()}</div>
-                    <div class="detail"><span class="label">Verified:</span> {ticket['verifiedAt']}</div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-    else:
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Ticket Verification - NFT Tickets</title>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <style>
-                body {{ font-family: Arial, sans-serif; background: #0f172a; color: white; margin: 0; padding: 20px; }}
-                .container {{ max-width: 600px; margin: 0 auto; }}
-                .invalid {{ background: linear-gradient(135deg, #ef4444, #dc2626); padding: 20px; border-radius: 10px; }}
-                .status {{ font-size: 24px; font-weight: bold; margin-bottom: 10px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="invalid">
-                    <div class="status">❌ Invalid Ticket</div>
-                    <p>Token ID #{token_id} was not found or is invalid.</p>
-                    <p>Please check the token ID and try again.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+    # Still logged, but the page never waits for the write
+    verification_log.submit(token_id, entry.status)
     
-    return html_content
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), entry.bodies)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.bodies[encoding], media_type="text/html; charset=utf-8", headers=headers)
 
 # User tickets endpoint
 @app.get("/tickets")
-async def get_user_tickets(current_user: str = Depends(get_current_user)):
-    """Get user's tickets"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT t.*, e.name as event_name, e.date, e.venue, e.image_url, e.price
-            FROM tickets t
-            JOIN events e ON t.event_id = e.id
-            WHERE t.owner_address = ?
-            ORDER BY e.date ASC
-        """, (current_user,))
-        tickets = cursor.fetchall()
-    
-    result = []
-    for ticket in tickets:
-        ticket_dict = dict(ticket)
-        result.append({
-            "id": ticket_dict["token_id"],
-            "tokenId": ticket_dict["token_id"],
-            "eventName": ticket_dict["event_name"],
-            "date": ticket_dict["date"],
-            "venue": ticket_dict["venue"],
-            "seat": ticket_dict["seat"],
-            "price": ticket_dict["price"],
-            "image": ticket_dict["image_url"],
-            "status": ticket_dict["status"],
-            "purchaseDate": ticket_dict["created_at"]
-        })
+async def get_user_tickets(
+    current_user: str = Depends(get_current_user),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get user's tickets, ordered by event date (paginated)"""
+    columns = select_fields(fields, TICKET_COLUMNS)
+    tickets, next_cursor = await repository.fetch_user_tickets(current_user, columns, cursor, limit)
     
-    return {"tickets": result}
+    return JSONBody({"tickets": [format_prices(ticket) for ticket in tickets], "next_cursor": next_cursor})
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,385 @@
+"""
+Request and database metrics in the Prometheus text format
+
+Everything is recorded in-process with no locks on the hot path: each
+thread (the event loop, every DB executor thread) writes to its own
+shard of each metric, and ``/metrics`` adds the shards up when it is
+scraped. Histogram buckets are preallocated per label set, so an
+observation is a bisect and two additions.
+
+- ``MetricsMiddleware`` times every HTTP request per method and route
+  template, counts responses per status code and tracks in-flight
+  requests
+- ``InstrumentedConnection`` (used by db.connect) times every SQLite
+  statement from execute until its rows are fetched, counts the rows and
+  logs statements slower than DB_SLOW_QUERY_MS; ``log_pg_query`` does the
+  same for asyncpg (without row counts)
+- ``render`` produces the exposition text, including any registered
+  collectors (cache hit/miss counters)
+
+Each worker process keeps its own metrics; METRICS_ENABLED=0 turns the
+middleware and statement timing off.
+"""
+
+import bisect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))  # recent slow statements kept
+
+# Seconds; HTTP requests and SQL statements alike
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("nft_tickets.metrics")
+
+
+class _Shards:
+    """One dict per thread; only its own thread writes to it"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all: List[dict] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = {}
+            # Once per thread
+            with self._lock:
+                self._all.append(values)
+            self._local.values = values
+            return values
+
+    def items(self) -> Iterable[Tuple[tuple, list]]:
+        with self._lock:
+            shards = list(self._all)
+        for shard in shards:
+            # list() copies under the GIL, so a concurrent insert cannot break the loop
+            yield from list(shard.items())
+
+
+class Counter:
+    """Monotonic counter (or, with negative amounts, a gauge) per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._shards = _Shards()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        shard = self._shards.mine()
+        value = shard.get(labels)
+        if value is None:
+            value = shard[labels] = [0]
+        value[0] += amount
+
+    def values(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for labels, value in self._shards.items():
+            totals[labels] = totals.get(labels, 0) + value[0]
+        return totals
+
+    def samples(self):
+        for labels, value in sorted(self.values().items()):
+            yield self.name, _labels(self.labels, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        self._shards = _Shards()
+
+    def observe(self, labels: tuple, value: float):
+        shard = self._shards.mine()
+        series = shard.get(labels)
+        if series is None:
+            # One slot per bucket, one for +Inf, then the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def values(self) -> Dict[tuple, list]:
+        totals: Dict[tuple, list] = {}
+        for labels, series in self._shards.items():
+            total = totals.get(labels)
+            if total is None:
+                totals[labels] = list(series)
+            else:
+                for i, value in enumerate(series):
+                    total[i] += value
+        return totals
+
+    def samples(self):
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, series in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labels + ("le",), labels + (bound,)), cumulative
+            yield f"{self.name}_sum", _labels(self.labels, labels), series[-1]
+            yield f"{self.name}_count", _labels(self.labels, labels), cumulative
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}.0"
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in zip(names, values)
+    ) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # Callables returning (name, kind, help, [(labels dict, value)]) at scrape time
+        self.collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.add(Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is sent", ("method", "route")))
+http_responses = registry.add(Counter(
+    "http_responses_total", "HTTP responses by status code", ("method", "route", "status")))
+http_in_flight = registry.add(Gauge("http_requests_in_flight", "HTTP requests being handled"))
+db_query_duration = registry.add(Histogram(
+    "db_query_duration_seconds", "SQL statement time from execute until its rows are fetched", ("statement",)))
+db_rows = registry.add(Counter("db_rows_total", "Rows returned or changed by SQL statements", ("statement",)))
+db_slow_queries = registry.add(Counter(
+    "db_slow_queries_total", "SQL statements slower than DB_SLOW_QUERY_MS", ("statement",)))
+
+# (finished at, milliseconds, rows, sql) of the latest slow statements
+slow_queries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def render() -> str:
+    return registry.render()
+
+
+# HTTP
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status codes and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: Dict[object, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            http_in_flight.inc(amount=-1)
+            # The router has stored the matched route in the scope by now
+            labels = (scope["method"], self._route(scope))
+            http_request_duration.observe(labels, time.perf_counter() - start)
+            http_responses.inc(labels + (status,))
+
+    def _route(self, scope) -> str:
+        """Route template ("/verify/{token_id}"), so labels stay few"""
+        route = scope.get("route")
+        if route is not None:
+            return getattr(route, "path", "unmatched")
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._paths.get(endpoint)
+        if path is None:
+            for candidate in getattr(scope.get("app"), "routes", ()):
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    path = self._paths[endpoint] = candidate.path
+                    break
+        return path or "unmatched"
+
+
+# SQL
+VERB = re.compile(r"\s*(\w+)")
+# Where the table a statement is about comes after its verb
+TABLE = {
+    "SELECT": re.compile(r"\bFROM\s+(\w+)", re.IGNORECASE),
+    "DELETE": re.compile(r"\bFROM\s+(\w+)", re.IGNORECASE),
+    "INSERT": re.compile(r"\bINTO\s+(\w+)", re.IGNORECASE),
+    "UPDATE": re.compile(r"^\s*UPDATE\s+(?:OR\s+\w+\s+)?(\w+)", re.IGNORECASE),
+}
+_statement_labels: Dict[str, str] = {}
+
+
+def statement_label(sql: str) -> str:
+    """``SELECT tickets``: the verb and its table, a label with few values"""
+    label = _statement_labels.get(sql)
+    if label is None:
+        verb = VERB.match(sql)
+        label = verb.group(1).upper() if verb else "OTHER"
+        table = TABLE[label].search(sql) if label in TABLE else None
+        if table is not None:
+            label = f"{label} {table.group(1)}"
+        # SQL built per call (IN lists) would grow the cache without bound
+        if len(_statement_labels) < 4096:
+            _statement_labels[sql] = label
+    return label
+
+
+def record_query(sql: str, seconds: float, rows: Optional[int]):
+    label = (statement_label(sql),)
+    db_query_duration.observe(label, seconds)
+    if rows:
+        db_rows.inc(label, rows)
+    if seconds * 1000 >= DB_SLOW_QUERY_MS:
+        db_slow_queries.inc(label)
+        text = " ".join(sql.split())
+        slow_queries.append((time.time(), round(seconds * 1000, 3), rows, text))
+        logger.warning("Slow query (%.1f ms, %s rows): %s", seconds * 1000, rows, text[:500])
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to record_query
+
+    A statement with result rows is recorded once they have all been
+    fetched (or the cursor is reused, closed or dropped), so its time
+    includes the fetches. Rows read by iterating the cursor directly are
+    not counted; use the fetch methods.
+    """
+
+    _sql = None
+    _seconds = 0.0
+    _rows = 0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._begin(sql, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._begin(sql, time.perf_counter() - start)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._seconds += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _begin(self, sql, seconds):
+        self._sql, self._seconds, self._rows = sql, seconds, 0
+        if self.description is None:
+            # No result rows: done, and rowcount is what it changed
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            record_query(sql, self._seconds, self._rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements all run on InstrumentedCursors"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def log_pg_query(record):
+    """asyncpg query logger (Connection.add_query_logger)"""
+    record_query(record.query, record.elapsed, None)
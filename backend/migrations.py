@@ -0,0 +1,218 @@
+"""
+Versioned schema migrations
+
+repository.create_schema creates the base tables; everything after that is
+a numbered migration applied in order and recorded in SQLite's ``PRAGMA
+user_version``, so each database is upgraded exactly once per step. Append
+new migrations to MIGRATIONS and never edit one that has shipped; add the
+PostgreSQL equivalent to POSTGRES_MIGRATIONS in repository_postgres.py.
+
+Run ``python migrations.py`` to upgrade DATABASE_PATH by hand.
+"""
+
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger("nft_tickets.migrations")
+
+# (version, description, statements)
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "secondary indexes for hot queries", [
+        # get_events: ORDER BY date
+        "CREATE INDEX IF NOT EXISTS idx_events_date ON events (date)",
+        # get_user_orders: WHERE user_address = ? ORDER BY created_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_address, created_at DESC)",
+        # get_user_tickets: WHERE owner_address = ?
+        "CREATE INDEX IF NOT EXISTS idx_tickets_owner ON tickets (owner_address)",
+        # verification index preload: WHERE event_id = ? ORDER BY token_id (rowid)
+        "CREATE INDEX IF NOT EXISTS idx_tickets_event ON tickets (event_id)",
+        # audit lookups of a ticket's scan history
+        "CREATE INDEX IF NOT EXISTS idx_verification_logs_token ON verification_logs (token_id, verified_at)",
+        # expired hold sweeper: WHERE expires_at <= ?
+        "CREATE INDEX IF NOT EXISTS idx_seat_holds_expires_at ON seat_holds (expires_at)",
+    ]),
+    (2, "keyset pagination index for orders", [
+        # get_user_orders pages on (created_at, id) DESC; scanning this index
+        # backwards yields both columns descending without a sort step
+        "DROP INDEX IF EXISTS idx_orders_user_created",
+        "CREATE INDEX IF NOT EXISTS idx_orders_user_keyset ON orders (user_address, created_at, id)",
+    ]),
+    (3, "blockchain indexer checkpoint and order lookup by tx hash", [
+        """
+        CREATE TABLE IF NOT EXISTS indexer_state (
+            name TEXT PRIMARY KEY,
+            last_block INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_orders_tx_hash ON orders (tx_hash)",
+    ]),
+    (4, "login nonce store", [
+        # Nonces moved out of users into the in-memory store; this table only
+        # backs it up across restarts (expires_at is a unix timestamp)
+        """
+        CREATE TABLE IF NOT EXISTS auth_nonces (
+            address TEXT PRIMARY KEY,
+            nonce TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_auth_nonces_expires_at ON auth_nonces (expires_at)",
+    ]),
+    (5, "JWT revocation list", [
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )
+        """,
+    ]),
+    (6, "ticket status change log for scanner snapshots", [
+        # One row per ticket whose status may have changed (mint, redemption);
+        # seq is the snapshot version scanners pull deltas from
+        """
+        CREATE TABLE IF NOT EXISTS ticket_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            token_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_changes_event ON ticket_changes (event_id, seq)",
+    ]),
+    (7, "integer gwei prices and sales aggregation index", [
+        # Filled from the old text columns by ``python convert_prices.py``
+        # (also run at startup); the text columns stay for older readers
+        "ALTER TABLE events ADD COLUMN price_gwei INTEGER",
+        "ALTER TABLE orders ADD COLUMN total_price_gwei INTEGER",
+        # Sales reports: WHERE status = ? [AND event_id = ?] GROUP BY event or
+        # day, answered from the index alone
+        """
+        CREATE INDEX IF NOT EXISTS idx_orders_sales
+        ON orders (status, event_id, created_at, quantity, total_price_gwei)
+        """,
+        # Orders still to convert; empty once convert_prices has run
+        "CREATE INDEX IF NOT EXISTS idx_orders_unpriced ON orders (id) WHERE total_price_gwei IS NULL",
+    ]),
+    (8, "organizer analytics rollups", [
+        # Maintained in the writing transaction (analytics.py); keyed for
+        # point and per-event range reads
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup (
+            event_id INTEGER NOT NULL,
+            seat_type TEXT NOT NULL,
+            hour TEXT NOT NULL, -- YYYY-MM-DD HH:00:00 UTC, from orders.created_at
+            status TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue_gwei INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, seat_type, hour, status)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_totals (
+            event_id INTEGER NOT NULL,
+            seat_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue_gwei INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, seat_type, status)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_rollup (
+            event_id INTEGER NOT NULL, -- 0: token id without a ticket
+            hour TEXT NOT NULL,
+            valid INTEGER NOT NULL DEFAULT 0,
+            invalid INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, hour)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_totals (
+            event_id INTEGER PRIMARY KEY,
+            valid INTEGER NOT NULL DEFAULT 0,
+            invalid INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        # Backfill from the rows written so far
+        """
+        INSERT INTO sales_rollup (event_id, seat_type, hour, status, orders, tickets, revenue_gwei)
+        SELECT event_id, seat_type, substr(created_at, 1, 13) || ':00:00', status,
+               COUNT(*), SUM(quantity), COALESCE(SUM(total_price_gwei), 0)
+        FROM orders
+        GROUP BY event_id, seat_type, substr(created_at, 1, 13), status
+        """,
+        """
+        INSERT INTO sales_totals (event_id, seat_type, status, orders, tickets, revenue_gwei)
+        SELECT event_id, seat_type, status, SUM(orders), SUM(tickets), SUM(revenue_gwei)
+        FROM sales_rollup
+        GROUP BY event_id, seat_type, status
+        """,
+        """
+        INSERT INTO scan_rollup (event_id, hour, valid, invalid)
+        SELECT COALESCE(t.event_id, 0), substr(l.verified_at, 1, 13) || ':00:00',
+               SUM(CASE WHEN l.status = 'valid' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN l.status = 'valid' THEN 0 ELSE 1 END)
+        FROM verification_logs l LEFT JOIN tickets t ON t.token_id = l.token_id
+        GROUP BY COALESCE(t.event_id, 0), substr(l.verified_at, 1, 13)
+        """,
+        """
+        INSERT INTO scan_totals (event_id, valid, invalid)
+        SELECT event_id, SUM(valid), SUM(invalid) FROM scan_rollup GROUP BY event_id
+        """,
+    ]),
+    (9, "event features and artists as compact JSON arrays", [
+        # Spliced into responses as they are (json_body.encode_row), so they
+        # must be valid JSON; json() also minifies and fails on anything else
+        "UPDATE events SET features = json(COALESCE(NULLIF(features, ''), '[]'))",
+        "UPDATE events SET artists = json(COALESCE(NULLIF(artists, ''), '[]'))",
+    ]),
+    (10, "event of each scan, as attributed when it was logged", [
+        # The scan rollups count a scan under its token's event at the time
+        # (0 if no ticket had it yet); the consistency check must too
+        "ALTER TABLE verification_logs ADD COLUMN event_id INTEGER",
+        """
+        UPDATE verification_logs
+        SET event_id = COALESCE((SELECT t.event_id FROM tickets t WHERE t.token_id = verification_logs.token_id), 0)
+        """,
+    ]),
+]
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Apply every pending migration; returns the resulting schema version"""
+    current = schema_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info("Applying migration %d: %s", version, description)
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA does not accept bound parameters
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
+
+
+if __name__ == "__main__":
+    from db import DATABASE_PATH, connect
+
+    logging.basicConfig(level=logging.INFO)
+    conn = connect()
+    before = schema_version(conn)
+    after = migrate(conn)
+    conn.close()
+    print(f"{DATABASE_PATH}: schema version {before} -> {after}")
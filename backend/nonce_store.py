@@ -0,0 +1,340 @@
+"""
+Login nonce store: in-memory primary with periodic persistence
+
+``/auth/nonce`` used to ``INSERT OR REPLACE`` into users on every call,
+taking SQLite's write lock for each bot request during an on-sale. Nonces
+now live in a sharded in-memory map, so issuing one is a dict write under
+a per-shard lock:
+
+- every nonce expires after NONCE_TTL seconds and ``take`` consumes it,
+  so a signed login message can be redeemed once. The login endpoint
+  takes it only after the signature checks out, and asking for a nonce
+  while one is outstanding returns that one, so requests made for someone
+  else's address cannot burn the nonce their wallet is signing
+- each client IP may request NONCE_RATE_LIMIT nonces per address per
+  NONCE_RATE_WINDOW, and the store holds at most NONCE_MAX_ENTRIES,
+  bounding memory under abuse. A full store turns everyone away
+  (``StoreFull``) rather than one address
+- a background task sweeps expired entries and copies changed ones to the
+  ``auth_nonces`` table every NONCE_PERSIST_INTERVAL seconds, so a restart
+  does not invalidate nonces users are about to sign
+
+Worker processes cannot see each other's memory, so with a shared state
+backend (SHARED_STATE_BACKEND=local) ``SharedNonceStore`` keeps nonces and
+rate-limit windows in the shared key/value store instead. A nonce issued by
+one worker can then be redeemed on any other, exactly once. Its writes are
+not fsync'd (synchronous=OFF) but may wait on another worker's lock, so
+the endpoints use ``issue_async``/``take_async``, which run them on a
+thread.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from repository import get_repository
+from shared_state import SHARED_STATE_BACKEND, get_state
+
+NONCE_TTL = float(os.getenv("NONCE_TTL", "300"))  # seconds
+NONCE_SHARDS = int(os.getenv("NONCE_SHARDS", "16"))
+NONCE_RATE_LIMIT = int(os.getenv("NONCE_RATE_LIMIT", "10"))  # nonces per client IP and address per window
+NONCE_RATE_WINDOW = float(os.getenv("NONCE_RATE_WINDOW", "60"))  # seconds
+NONCE_MAX_ENTRIES = int(os.getenv("NONCE_MAX_ENTRIES", "100000"))
+NONCE_PERSIST_INTERVAL = float(os.getenv("NONCE_PERSIST_INTERVAL", "5"))  # seconds, 0 = memory only
+
+logger = logging.getLogger("nft_tickets.nonce_store")
+
+
+class RateLimited(Exception):
+    """Too many nonces requested; retry after ``retry_after`` seconds"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class StoreFull(RateLimited):
+    """The store holds NONCE_MAX_ENTRIES nonces; nobody gets a new one for now"""
+
+
+class _Shard:
+    __slots__ = ("lock", "nonces", "windows", "dirty")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # address -> (nonce, expires_at)
+        self.nonces: Dict[str, Tuple[str, float]] = {}
+        # (client, address) -> (window_start, issued in window)
+        self.windows: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        # addresses changed since the last persist
+        self.dirty: Set[str] = set()
+
+
+class NonceStore:
+    """Sharded, expiring, single-use nonces keyed by lower-case address"""
+
+    def __init__(self, ttl: float = None, shards: int = None, rate_limit: int = None,
+                 rate_window: float = None, max_entries: int = None, persist_interval: float = None):
+        self.ttl = ttl or NONCE_TTL
+        self.rate_limit = rate_limit or NONCE_RATE_LIMIT
+        self.rate_window = rate_window or NONCE_RATE_WINDOW
+        self.persist_interval = NONCE_PERSIST_INTERVAL if persist_interval is None else persist_interval
+        self._shards = [_Shard() for _ in range(shards or NONCE_SHARDS)]
+        self._shard_capacity = math.ceil((max_entries or NONCE_MAX_ENTRIES) / len(self._shards))
+        self._task: Optional[asyncio.Task] = None
+        self.issued = 0
+        self.consumed = 0
+        self.rejected = 0
+
+    def _shard(self, address: str) -> _Shard:
+        return self._shards[hash(address) % len(self._shards)]
+
+    def issue(self, address: str, client: str = "", now: float = None) -> str:
+        """The address's outstanding nonce, or a new one; raises RateLimited or StoreFull"""
+        now = time.time() if now is None else now
+        shard = self._shard(address)
+        with shard.lock:
+            window = (client, address)
+            window_start, count = shard.windows.get(window, (now, 0))
+            if now - window_start >= self.rate_window:
+                window_start, count = now, 0
+            if count >= self.rate_limit:
+                self.rejected += 1
+                raise RateLimited(window_start + self.rate_window - now)
+            shard.windows[window] = (window_start, count + 1)
+
+            entry = shard.nonces.get(address)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+            if entry is None and len(shard.nonces) >= self._shard_capacity:
+                self._sweep_shard(shard, now)
+                if len(shard.nonces) >= self._shard_capacity:
+                    self.rejected += 1
+                    raise StoreFull(min(expires_at for _, expires_at in shard.nonces.values()) - now)
+
+            nonce = secrets.token_hex(16)
+            shard.nonces[address] = (nonce, now + self.ttl)
+            shard.dirty.add(address)
+            self.issued += 1
+        return nonce
+
+    def peek(self, address: str, now: float = None) -> Optional[str]:
+        """The address's unexpired nonce, left in place"""
+        now = time.time() if now is None else now
+        shard = self._shard(address)
+        with shard.lock:
+            entry = shard.nonces.get(address)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def take(self, address: str, nonce: str = None, now: float = None) -> Optional[str]:
+        """Consume the address's nonce (only if it is ``nonce``, when given); None if there is none or it expired"""
+        now = time.time() if now is None else now
+        shard = self._shard(address)
+        with shard.lock:
+            entry = shard.nonces.get(address)
+            if entry is None or (nonce is not None and entry[0] != nonce):
+                return None
+            del shard.nonces[address]
+            shard.dirty.add(address)
+        if entry[1] <= now:
+            return None
+        self.consumed += 1
+        return entry[0]
+
+    async def issue_async(self, address: str, client: str = "") -> str:
+        """``issue`` for the request path; in memory, so it runs inline"""
+        return self.issue(address, client)
+
+    async def peek_async(self, address: str) -> Optional[str]:
+        return self.peek(address)
+
+    async def take_async(self, address: str, nonce: str = None) -> Optional[str]:
+        return self.take(address, nonce)
+
+    def _sweep_shard(self, shard: _Shard, now: float) -> int:
+        expired = [address for address, (_, expires_at) in shard.nonces.items() if expires_at <= now]
+        for address in expired:
+            del shard.nonces[address]
+        stale = [address for address, (start, _) in shard.windows.items() if now - start >= self.rate_window]
+        for address in stale:
+            del shard.windows[address]
+        return len(expired)
+
+    def sweep(self, now: float = None) -> int:
+        """Drop expired nonces and finished rate-limit windows; returns nonces removed"""
+        now = time.time() if now is None else now
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += self._sweep_shard(shard, now)
+        return removed
+
+    async def load(self, now: float = None) -> int:
+        """Restore unexpired nonces persisted by a previous process"""
+        now = time.time() if now is None else now
+        rows = await get_repository().load_nonces(now)
+        for address, nonce, expires_at in rows:
+            shard = self._shard(address)
+            with shard.lock:
+                shard.nonces.setdefault(address, (nonce, expires_at))
+        return len(rows)
+
+    def _collect_changes(self):
+        upserts, deletes = [], []
+        for shard in self._shards:
+            with shard.lock:
+                for address in shard.dirty:
+                    entry = shard.nonces.get(address)
+                    if entry is None:
+                        deletes.append((address,))
+                    else:
+                        upserts.append((address, entry[0], entry[1]))
+                shard.dirty.clear()
+        return upserts, deletes
+
+    def _mark_dirty(self, addresses):
+        for address in addresses:
+            shard = self._shard(address)
+            with shard.lock:
+                shard.dirty.add(address)
+
+    async def persist(self):
+        """Copy nonces changed since the last call to auth_nonces"""
+        now = time.time()
+        self.sweep(now)
+        upserts, deletes = self._collect_changes()
+        try:
+            await get_repository().save_nonces(upserts, deletes, now)
+        except Exception:
+            # Retry these addresses on the next pass
+            self._mark_dirty([row[0] for row in upserts + deletes])
+            raise
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.persist_interval if self.persist_interval > 0 else self.rate_window)
+            try:
+                if self.persist_interval > 0:
+                    await self.persist()
+                else:
+                    self.sweep()
+            except Exception:
+                logger.exception("Failed to persist login nonces")
+
+    def start(self):
+        """Start the background sweeper/persister on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and persist outstanding changes"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.persist_interval > 0:
+            await self.persist()
+
+    def stats(self) -> dict:
+        return {
+            "entries": sum(len(shard.nonces) for shard in self._shards),
+            "shards": len(self._shards),
+            "issued": self.issued,
+            "consumed": self.consumed,
+            "rejected": self.rejected,
+        }
+
+
+class SharedNonceStore:
+    """NonceStore semantics on the cross-process shared state backend"""
+
+    def __init__(self, state=None, ttl: float = None, rate_limit: int = None, rate_window: float = None,
+                 sweep_interval: float = None):
+        self.state = state or get_state()
+        self.ttl = ttl or NONCE_TTL
+        self.rate_limit = rate_limit or NONCE_RATE_LIMIT
+        self.rate_window = rate_window or NONCE_RATE_WINDOW
+        self.sweep_interval = sweep_interval or NONCE_PERSIST_INTERVAL or self.rate_window
+        self._task: Optional[asyncio.Task] = None
+        self.issued = 0
+        self.consumed = 0
+        self.rejected = 0
+
+    def issue(self, address: str, client: str = "") -> str:
+        count, window_end = self.state.incr(f"nonce-rate:{client}:{address}", self.rate_window)
+        if count > self.rate_limit:
+            self.rejected += 1
+            raise RateLimited(window_end - time.time())
+        candidate = secrets.token_hex(16)
+        nonce = self.state.setdefault(f"nonce:{address}", candidate, self.ttl)
+        if nonce == candidate:
+            self.issued += 1
+        return nonce
+
+    def peek(self, address: str) -> Optional[str]:
+        return self.state.get(f"nonce:{address}")
+
+    def take(self, address: str, nonce: str = None) -> Optional[str]:
+        nonce = self.state.pop(f"nonce:{address}", nonce)
+        if nonce is not None:
+            self.consumed += 1
+        return nonce
+
+    # Shared state operations are SQLite statements that may wait on another
+    # worker's write lock, so the request path runs them off the event loop
+    async def issue_async(self, address: str, client: str = "") -> str:
+        return await asyncio.to_thread(self.issue, address, client)
+
+    async def peek_async(self, address: str) -> Optional[str]:
+        return await asyncio.to_thread(self.peek, address)
+
+    async def take_async(self, address: str, nonce: str = None) -> Optional[str]:
+        return await asyncio.to_thread(self.take, address, nonce)
+
+    async def load(self) -> int:
+        """Nothing to restore: the shared store outlives worker restarts"""
+        return 0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(self.state.sweep)
+            except Exception:
+                logger.exception("Failed to sweep shared login nonces")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "entries": self.state.count("nonce:"),
+            "backend": self.state.name,
+            "issued": self.issued,
+            "consumed": self.consumed,
+            "rejected": self.rejected,
+        }
+
+
+nonce_store = SharedNonceStore() if SHARED_STATE_BACKEND != "memory" else NonceStore()
@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination and field projection for list endpoints
+
+Pages are fetched with ``WHERE (k1, k2) > (?, ?) ORDER BY k1, k2 LIMIT n``
+rather than OFFSET, so every page costs the same no matter how deep the
+client has scrolled. The cursor is an opaque URL-safe token holding the
+sort key of the last row returned. ``fields=`` limits both the SQL
+projection and the JSON payload to the columns a client actually renders.
+"""
+
+import base64
+import json
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+
+# Sort keys are text or numbers the databases can bind (64-bit integers)
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _cursor_value(value) -> bool:
+    # type() rather than isinstance: JSON true/false are not sort keys
+    if type(value) is str:
+        return True
+    if type(value) is int:
+        return INT64_MIN <= value <= INT64_MAX
+    return type(value) is float and math.isfinite(value)
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    """Decode a cursor holding ``size`` sort-key values; 400 if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size or not all(map(_cursor_value, values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def select_fields(fields: Optional[str], columns: Dict[str, str]) -> List[str]:
+    """Resolve a ``fields=a,b`` parameter against the endpoint's columns"""
+    if not fields:
+        return list(columns)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in columns]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(columns)}"
+        )
+    # Preserve the endpoint's column order and drop duplicates
+    return [name for name in columns if name in requested]
+
+
+def page_query(
+    *,
+    columns: Dict[str, str],
+    fields: List[str],
+    source: str,
+    where: str,
+    params: Sequence,
+    order_by: Sequence[str],
+    descending: bool,
+    cursor: Optional[str],
+    limit: int,
+) -> Tuple[str, List]:
+    """Build the SQL for one keyset page (``?`` placeholders) and its arguments
+
+    ``columns`` maps output field names to SQL expressions and ``order_by``
+    lists the SQL expressions forming a unique sort key (the last one
+    should be a primary key to break ties). One row more than ``limit`` is
+    requested to detect whether another page follows.
+    """
+    projection = [f'{columns[name]} AS "{name}"' for name in fields]
+    projection += [f"{expr} AS _k{i}" for i, expr in enumerate(order_by)]
+
+    clauses = [where] if where else []
+    args = list(params)
+    if cursor:
+        keys = ", ".join(order_by)
+        marks = ", ".join("?" for _ in order_by)
+        clauses.append(f"({keys}) {'<' if descending else '>'} ({marks})")
+        args.extend(decode_cursor(cursor, len(order_by)))
+
+    direction = "DESC" if descending else "ASC"
+    sql = f"SELECT {', '.join(projection)} FROM {source}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr in order_by)
+    sql += " LIMIT ?"
+    args.append(limit + 1)
+    return sql, args
+
+
+def page_result(rows: Sequence, fields: List[str], keys: int, limit: int) -> Tuple[List[dict], Optional[str]]:
+    """Trim the look-ahead row and build the next cursor"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[f"_k{i}"] for i in range(keys)])
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+def fetch_page(conn, **query) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one keyset page from SQLite; returns (rows, next_cursor)"""
+    sql, args = page_query(**query)
+    rows = conn.execute(sql, args).fetchall()
+    return page_result(rows, query["fields"], len(query["order_by"]), query["limit"])
@@ -0,0 +1,70 @@
+"""
+Ticket prices as integers
+
+Prices used to be display strings ("0.05 ETH") that every purchase parsed
+with float(), which rounds (3 x 0.0125 ETH was stored as "0.038 ETH") and
+leaves SQL unable to add them up. Now:
+
+- the database stores integer gwei (1e-9 ETH): ``events.price_gwei`` and
+  ``orders.total_price_gwei``. Not wei: SQLite integers are 64-bit, which
+  caps a wei amount at ~9.2 ETH, while gwei holds 9.2 billion ETH, enough
+  for the revenue of any event summed in SQL
+- parse_eth turns an input string into gwei exactly (Decimal, never float)
+- format_prices renders responses at the API edge: ``price`` and
+  ``total_price`` keep their "0.05 ETH" / "0.100 ETH" formats and every
+  ``*_wei`` field is the wei amount as a decimal string (JSON numbers lose
+  precision past 2**53; wallets need wei for msg.value)
+"""
+
+from decimal import Decimal, InvalidOperation
+
+GWEI_PER_ETH = 10 ** 9
+WEI_PER_GWEI = 10 ** 9
+
+# Response field -> decimal places always shown, as the API has always formatted it
+DISPLAY_PLACES = {
+    "price": 0,
+    "total_price": 3,
+    "revenue": 3,
+    "avg_ticket_price": 3,
+}
+
+
+def parse_eth(value: str) -> int:
+    """Gwei for an amount like ``0.05 ETH`` or ``0.05``; raises ValueError"""
+    text = value.strip()
+    if text[-3:].upper() == "ETH":
+        text = text[:-3].strip()
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"not an ETH amount: {value!r}")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"not an ETH amount: {value!r}")
+    gwei = amount * GWEI_PER_ETH
+    if gwei != gwei.to_integral_value():
+        raise ValueError(f"more precise than 1 gwei: {value!r}")
+    return int(gwei)
+
+
+def format_eth(gwei: int, places: int = 0) -> str:
+    """``0.05 ETH``, exact, with at least ``places`` decimals"""
+    whole, fraction = divmod(gwei, GWEI_PER_ETH)
+    digits = f"{fraction:09d}".rstrip("0").ljust(places, "0")
+    return f"{whole}.{digits} ETH" if digits else f"{whole} ETH"
+
+
+def to_wei(gwei: int) -> str:
+    return str(gwei * WEI_PER_GWEI)
+
+
+def format_prices(row: dict) -> dict:
+    """Render the gwei amounts of a response row in place"""
+    for name, value in row.items():
+        if value is None:
+            continue
+        if name in DISPLAY_PLACES:
+            row[name] = format_eth(value, DISPLAY_PLACES[name])
+        elif name.endswith("_wei"):
+            row[name] = to_wei(value)
+    return row
@@ -0,0 +1,104 @@
+"""
+Sampling profiler that can be switched on in a running worker
+
+A background thread wakes every ``interval`` seconds, reads the current
+stack of every other thread (``sys._current_frames``) and counts each
+distinct stack. Nothing is traced between samples, so the app runs at
+full speed while it is on and pays nothing while it is off. The result is
+in the "folded" format (``frame;frame;frame count`` per line) that
+flamegraph.pl and speedscope read.
+
+Started and stopped through the admin endpoints under /admin/profiler.
+It stops by itself after PROFILER_MAX_SECONDS.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "300"))
+MAX_DEPTH = 128
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = PROFILER_INTERVAL_MS / 1000
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = None, max_seconds: float = None) -> bool:
+        """Start sampling from scratch; False if it is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = (interval_ms or PROFILER_INTERVAL_MS) / 1000
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(max_seconds or PROFILER_MAX_SECONDS,), name="profiler", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def stop(self) -> bool:
+        """Stop sampling, keeping the samples; False if it was not running"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return False
+            self._stop.set()
+            thread.join()
+            self._thread = None
+        return True
+
+    def _run(self, max_seconds: float):
+        me = threading.get_ident()
+        deadline = time.monotonic() + max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                names = []
+                while frame is not None and len(names) < MAX_DEPTH:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+        self.stopped_at = time.time()
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+    def folded(self, limit: int = None) -> str:
+        """``frame;frame;frame count`` lines, most frequent first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common(limit))
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,743 @@
+"""
+PostgreSQL repository (asyncpg)
+
+Selected when DATABASE_URL is a ``postgresql://`` URL. Queries run on an
+asyncpg pool of DB_POOL_SIZE connections directly on the event loop, so
+there is no thread hop per query, and PostgreSQL's row-level locking lets
+purchases for different events, scans and indexer batches commit
+concurrently instead of queueing behind SQLite's single writer.
+
+The schema mirrors the SQLite one column for column. Timestamps are stored
+as ``YYYY-MM-DD HH:MM:SS`` UTC text, exactly what SQLite's
+CURRENT_TIMESTAMP produces, so API responses, keyset cursors and export
+filters are identical on both backends. Versions in POSTGRES_MIGRATIONS
+follow migrations.MIGRATIONS; the first entry is the schema as of SQLite
+version 5.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import List, Tuple
+
+import asyncpg
+
+from analytics import (
+    ROLLUP_COLUMNS, SALES_FROM_ORDERS, SCANS_FROM_LOGS, Rollup, compare, expected_rollups, hourly_queries,
+    insert_rows, totals_queries,
+)
+import inventory
+from metrics import METRICS_ENABLED, log_pg_query
+from pagination import page_query, page_result
+from prices import format_eth
+from repository import (
+    EVENT_INSERT_COLUMNS, EVENTS_PAGE, ORDER_TOTAL_PLACES, ORDERS_PAGE, PRICE_COLUMNS, RECORD_TICKET_CHANGE,
+    TICKETS_PAGE, ImportTally, Repository, changed_statuses, event_rows, priced_rows, redemption_results,
+    sales_query, scanned, unknown_events, unpriced_query, with_events,
+)
+from scan_snapshot import TicketStatuses, collapse
+from verification_index import EventTicketIndex
+
+logger = logging.getLogger("nft_tickets.repository")
+
+# SQL expression matching SQLite's CURRENT_TIMESTAMP
+NOW = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+
+# Any constant key: serialises schema changes between starting workers
+SCHEMA_LOCK_ID = 72_411_903
+# Held from a transaction's first ticket_changes insert to its commit, so
+# seq order is commit order and a scanner never skips a change
+TICKET_CHANGES_LOCK_ID = 72_411_904
+
+# (version, description, statements)
+POSTGRES_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (5, "base schema (SQLite migrations 1-5)", [
+        f"""
+        CREATE TABLE IF NOT EXISTS users (
+            address TEXT PRIMARY KEY,
+            nonce TEXT NOT NULL,
+            created_at TEXT DEFAULT {NOW},
+            last_login TEXT
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS events (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            venue TEXT NOT NULL,
+            location TEXT NOT NULL,
+            price TEXT NOT NULL,
+            capacity INTEGER NOT NULL,
+            sold INTEGER DEFAULT 0,
+            image_url TEXT,
+            features TEXT,
+            artists TEXT,
+            created_at TEXT DEFAULT {NOW}
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS orders (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            user_address TEXT NOT NULL,
+            event_id BIGINT NOT NULL REFERENCES events (id),
+            quantity INTEGER NOT NULL,
+            seat_type TEXT NOT NULL,
+            total_price TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            tx_hash TEXT,
+            token_ids TEXT,
+            created_at TEXT DEFAULT {NOW}
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS tickets (
+            token_id BIGINT PRIMARY KEY,
+            event_id BIGINT NOT NULL REFERENCES events (id),
+            owner_address TEXT NOT NULL,
+            seat TEXT NOT NULL,
+            status TEXT DEFAULT 'active',
+            metadata_uri TEXT,
+            created_at TEXT DEFAULT {NOW},
+            verified_at TEXT
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS verification_logs (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            token_id BIGINT NOT NULL,
+            verifier_address TEXT,
+            status TEXT NOT NULL,
+            verified_at TEXT DEFAULT {NOW}
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seat_holds (
+            order_id BIGINT PRIMARY KEY REFERENCES orders (id),
+            event_id BIGINT NOT NULL REFERENCES events (id),
+            quantity INTEGER NOT NULL,
+            expires_at DOUBLE PRECISION
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS indexer_state (
+            name TEXT PRIMARY KEY,
+            last_block BIGINT NOT NULL,
+            updated_at TEXT DEFAULT {NOW}
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS auth_nonces (
+            address TEXT PRIMARY KEY,
+            nonce TEXT NOT NULL,
+            expires_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            expires_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_events_date ON events (date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_user_keyset ON orders (user_address, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_tx_hash ON orders (tx_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_owner ON tickets (owner_address)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_event ON tickets (event_id, token_id)",
+        "CREATE INDEX IF NOT EXISTS idx_verification_logs_token ON verification_logs (token_id, verified_at)",
+        "CREATE INDEX IF NOT EXISTS idx_seat_holds_expires_at ON seat_holds (expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_auth_nonces_expires_at ON auth_nonces (expires_at)",
+    ]),
+    (6, "ticket status change log for scanner snapshots", [
+        f"""
+        CREATE TABLE IF NOT EXISTS ticket_changes (
+            seq BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            event_id BIGINT NOT NULL,
+            token_id BIGINT NOT NULL,
+            status TEXT NOT NULL,
+            changed_at TEXT DEFAULT {NOW}
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_changes_event ON ticket_changes (event_id, seq)",
+    ]),
+    (7, "integer gwei prices and sales aggregation index", [
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS price_gwei BIGINT",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS total_price_gwei BIGINT",
+        """
+        CREATE INDEX IF NOT EXISTS idx_orders_sales
+        ON orders (status, event_id, created_at) INCLUDE (quantity, total_price_gwei)
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_orders_unpriced ON orders (id) WHERE total_price_gwei IS NULL",
+    ]),
+    (8, "organizer analytics rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup (
+            event_id BIGINT NOT NULL,
+            seat_type TEXT NOT NULL,
+            hour TEXT NOT NULL,
+            status TEXT NOT NULL,
+            orders BIGINT NOT NULL DEFAULT 0,
+            tickets BIGINT NOT NULL DEFAULT 0,
+            revenue_gwei BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, seat_type, hour, status)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sales_totals (
+            event_id BIGINT NOT NULL,
+            seat_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            orders BIGINT NOT NULL DEFAULT 0,
+            tickets BIGINT NOT NULL DEFAULT 0,
+            revenue_gwei BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, seat_type, status)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_rollup (
+            event_id BIGINT NOT NULL,
+            hour TEXT NOT NULL,
+            valid BIGINT NOT NULL DEFAULT 0,
+            invalid BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (event_id, hour)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_totals (
+            event_id BIGINT PRIMARY KEY,
+            valid BIGINT NOT NULL DEFAULT 0,
+            invalid BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT INTO sales_rollup (event_id, seat_type, hour, status, orders, tickets, revenue_gwei)
+        SELECT event_id, seat_type, substr(created_at, 1, 13) || ':00:00', status,
+               COUNT(*), SUM(quantity), COALESCE(SUM(total_price_gwei), 0)
+        FROM orders
+        GROUP BY event_id, seat_type, substr(created_at, 1, 13), status
+        """,
+        """
+        INSERT INTO sales_totals (event_id, seat_type, status, orders, tickets, revenue_gwei)
+        SELECT event_id, seat_type, status, SUM(orders), SUM(tickets), SUM(revenue_gwei)
+        FROM sales_rollup
+        GROUP BY event_id, seat_type, status
+        """,
+        """
+        INSERT INTO scan_rollup (event_id, hour, valid, invalid)
+        SELECT COALESCE(t.event_id, 0), substr(l.verified_at, 1, 13) || ':00:00',
+               SUM(CASE WHEN l.status = 'valid' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN l.status = 'valid' THEN 0 ELSE 1 END)
+        FROM verification_logs l LEFT JOIN tickets t ON t.token_id = l.token_id
+        GROUP BY COALESCE(t.event_id, 0), substr(l.verified_at, 1, 13)
+        """,
+        """
+        INSERT INTO scan_totals (event_id, valid, invalid)
+        SELECT event_id, SUM(valid), SUM(invalid) FROM scan_rollup GROUP BY event_id
+        """,
+    ]),
+    (9, "event features and artists as compact JSON arrays", [
+        # jsonb validates; its text form is valid, if not minified, JSON
+        "UPDATE events SET features = COALESCE(NULLIF(features, ''), '[]')::jsonb::text",
+        "UPDATE events SET artists = COALESCE(NULLIF(artists, ''), '[]')::jsonb::text",
+    ]),
+    (10, "event of each scan, as attributed when it was logged", [
+        "ALTER TABLE verification_logs ADD COLUMN IF NOT EXISTS event_id BIGINT",
+        """
+        UPDATE verification_logs l
+        SET event_id = COALESCE((SELECT t.event_id FROM tickets t WHERE t.token_id = l.token_id), 0)
+        WHERE event_id IS NULL
+        """,
+    ]),
+]
+
+
+def numbered(sql: str) -> str:
+    """Rewrite ``?`` placeholders (SQLite, shared query builders) as ``$1, $2, ...``"""
+    counter = iter(range(1, sql.count("?") + 1))
+    return re.sub(r"\?", lambda _: f"${next(counter)}", sql)
+
+
+async def write_rollup(conn, rollup: Rollup):
+    """Apply a Rollup inside the caller's transaction"""
+    for sql, rows in rollup.statements():
+        await conn.executemany(numbered(sql), rows)
+
+
+async def _instrument(conn):
+    # Times every query for /metrics (asyncpg does not report row counts)
+    conn.add_query_logger(log_pg_query)
+
+
+class PostgresRepository(Repository):
+    """Repository on an asyncpg connection pool"""
+
+    name = "postgresql"
+
+    def __init__(self, dsn: str, pool_size: int):
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn, min_size=1, max_size=self.pool_size,
+                        # Hot statements are prepared once per connection
+                        statement_cache_size=256,
+                        init=_instrument if METRICS_ENABLED else None,
+                    )
+        return self._pool
+
+    async def init_schema(self):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                await conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+                current = await conn.fetchval("SELECT max(version) FROM schema_version") or 0
+                for version, description, statements in POSTGRES_MIGRATIONS:
+                    if version <= current:
+                        continue
+                    logger.info("Applying PostgreSQL migration %d: %s", version, description)
+                    for statement in statements:
+                        await conn.execute(statement)
+                    await conn.execute("INSERT INTO schema_version (version) VALUES ($1)", version)
+
+    async def seed_events(self, events):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Two workers seeding at once must not both see an empty table
+                await conn.execute("LOCK TABLE events IN EXCLUSIVE MODE")
+                if await conn.fetchval("SELECT EXISTS (SELECT 1 FROM events)"):
+                    return False
+                marks = ", ".join(f"${n}" for n in range(1, len(EVENT_INSERT_COLUMNS) + 1))
+                await conn.executemany(
+                    f"INSERT INTO events ({', '.join(EVENT_INSERT_COLUMNS)}) VALUES ({marks})",
+                    event_rows(events),
+                )
+        return True
+
+    async def _page(self, page: dict, params: tuple, fields, cursor, limit):
+        sql, args = page_query(fields=fields, params=params, cursor=cursor, limit=limit, **page)
+        pool = await self.pool()
+        rows = await pool.fetch(numbered(sql), *args)
+        return page_result(rows, fields, len(page["order_by"]), limit)
+
+    async def fetch_events(self, fields, cursor, limit):
+        return await self._page(EVENTS_PAGE, (), fields, cursor, limit)
+
+    async def fetch_event(self, event_id):
+        pool = await self.pool()
+        return await pool.fetchrow("""
+            SELECT id, name, description, date, time, venue, location,
+                   price_gwei AS price, price_gwei AS price_wei,
+                   capacity, sold, image_url, features, artists, created_at
+            FROM events WHERE id = $1
+        """, event_id)
+
+    async def fetch_availability(self, event_ids=None):
+        pool = await self.pool()
+        if event_ids is None:
+            return await pool.fetch("SELECT id, capacity, sold FROM events")
+        return await pool.fetch("SELECT id, capacity, sold FROM events WHERE id = ANY($1::bigint[])", event_ids)
+
+    async def record_login(self, address, nonce):
+        pool = await self.pool()
+        await pool.execute(f"""
+            INSERT INTO users (address, nonce, last_login) VALUES ($1, $2, {NOW})
+            ON CONFLICT (address) DO UPDATE SET nonce = excluded.nonce, last_login = excluded.last_login
+        """, address, nonce)
+
+    async def create_order(self, user_address, event_id, quantity, seat_type, tx_hash):
+        if quantity <= 0:
+            raise inventory.NotEnoughTickets("Quantity must be positive")
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Check and increment in one statement; the row lock orders
+                # concurrent buyers of the same event
+                event = await conn.fetchrow("""
+                    UPDATE events SET sold = sold + $1
+                    WHERE id = $2 AND sold + $1 <= capacity
+                    RETURNING price_gwei
+                """, quantity, event_id)
+                if event is None:
+                    if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM events WHERE id = $1)", event_id):
+                        raise inventory.EventNotFound("Event not found")
+                    raise inventory.NotEnoughTickets("Not enough tickets available")
+
+                total_gwei = event["price_gwei"] * quantity
+                order = await conn.fetchrow("""
+                    INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, total_price_gwei, tx_hash)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    RETURNING id, event_id, seat_type, created_at, quantity, total_price_gwei
+                """, user_address, event_id, quantity, seat_type,
+                    format_eth(total_gwei, ORDER_TOTAL_PLACES), total_gwei, tx_hash)
+                await conn.execute("""
+                    INSERT INTO seat_holds (order_id, event_id, quantity, expires_at)
+                    VALUES ($1, $2, $3, $4)
+                """, order["id"], event_id, quantity, inventory.hold_expiry())
+                rollup = Rollup()
+                rollup.order(order, "pending")
+                await write_rollup(conn, rollup)
+        return order["id"], total_gwei
+
+    async def fetch_user_orders(self, user_address, fields, cursor, limit):
+        return await self._page(ORDERS_PAGE, (user_address,), fields, cursor, limit)
+
+    async def fetch_user_tickets(self, owner_address, fields, cursor, limit):
+        return await self._page(TICKETS_PAGE, (owner_address,), fields, cursor, limit)
+
+    async def sales_report(self, group, status, event_id=None, since=None, until=None):
+        sql, params = sales_query(group, status, event_id, since, until)
+        pool = await self.pool()
+        return await pool.fetch(numbered(sql), *params)
+
+    async def convert_prices(self, chunk_rows=20000):
+        converted = {}
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            for table, (_, gwei_column) in PRICE_COLUMNS.items():
+                converted[table] = 0
+                last_id = 0
+                while True:
+                    rows = await conn.fetch(numbered(unpriced_query(table)), last_id, chunk_rows)
+                    if not rows:
+                        break
+                    updates, rollup = priced_rows(table, rows)
+                    async with conn.transaction():
+                        await conn.executemany(f"UPDATE {table} SET {gwei_column} = $1 WHERE id = $2", updates)
+                        await write_rollup(conn, rollup)
+                    converted[table] += len(updates)
+                    last_id = rows[-1][0]
+        return converted
+
+    async def analytics_totals(self, event_id=None):
+        return await self._analytics(totals_queries(event_id))
+
+    async def analytics_hourly(self, event_id, since=None, until=None):
+        return await self._analytics(hourly_queries(event_id, since, until))
+
+    async def _analytics(self, queries):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                return tuple([await conn.fetch(numbered(sql), *params) for sql, params in queries])
+
+    async def check_analytics(self, repair=False):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read"):
+                if repair:
+                    # Writers of the raw tables wait until the rollups are rebuilt
+                    await conn.execute("LOCK TABLE orders, verification_logs, tickets IN SHARE MODE")
+                expected = expected_rollups(await conn.fetch(SALES_FROM_ORDERS), await conn.fetch(SCANS_FROM_LOGS))
+                mismatches = []
+                for table, columns in ROLLUP_COLUMNS.items():
+                    mismatches += compare(table, expected[table], await conn.fetch(f"SELECT {columns} FROM {table}"))
+                if repair and mismatches:
+                    for table, rows in expected.items():
+                        await conn.execute(f"DELETE FROM {table}")
+                        await conn.executemany(numbered(insert_rows(table)), rows)
+        return {"consistent": not mismatches, "mismatches": mismatches, "repaired": bool(repair and mismatches)}
+
+    async def lookup_ticket(self, token_id):
+        pool = await self.pool()
+        return await pool.fetchrow("""
+            SELECT t.*, e.name as event_name, e.date, e.venue
+            FROM tickets t
+            JOIN events e ON t.event_id = e.id
+            WHERE t.token_id = $1
+        """, token_id)
+
+    async def release_expired_holds(self):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                expired = await conn.fetch("""
+                    DELETE FROM seat_holds
+                    WHERE expires_at IS NOT NULL AND expires_at <= $1
+                    RETURNING order_id, event_id, quantity
+                """, time.time())
+                if not expired:
+                    return []
+                await conn.executemany(
+                    "UPDATE events SET sold = GREATEST(sold - $1, 0) WHERE id = $2",
+                    [(hold["quantity"], hold["event_id"]) for hold in expired],
+                )
+                failed = await conn.fetch("""
+                    UPDATE orders SET status = 'failed'
+                    WHERE id = ANY($1::bigint[]) AND status = 'pending'
+                    RETURNING event_id, seat_type, created_at, quantity, total_price_gwei
+                """, [hold["order_id"] for hold in expired])
+                rollup = Rollup()
+                for order in failed:
+                    rollup.move(order, "pending", "failed")
+                await write_rollup(conn, rollup)
+        return sorted({hold["event_id"] for hold in expired})
+
+    async def load_ticket_index(self, event_id):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                event = await conn.fetchrow("SELECT name, date, venue FROM events WHERE id = $1", event_id)
+                if event is None:
+                    return None
+                index = EventTicketIndex(event_id, event["name"], event["date"], event["venue"])
+                cursor = await conn.cursor("""
+                    SELECT token_id, owner_address, seat, status FROM tickets
+                    WHERE event_id = $1
+                    ORDER BY token_id
+                """, event_id)
+                while True:
+                    rows = await cursor.fetch(10000)
+                    if not rows:
+                        break
+                    index.extend(rows)
+        return index
+
+    async def redeem_tickets(self, token_ids, event_id=None, all_or_nothing=False):
+        unique = sorted(set(token_ids))
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                # Row locks order overlapping batches: a blocked UPDATE re-checks
+                # status = 'active' once the other batch commits and skips its
+                # tickets. Sorted ids keep the lock order the same across batches.
+                redeemed = {row["token_id"] for row in await conn.fetch("""
+                    UPDATE tickets SET status = 'used'
+                    WHERE token_id = ANY($1::bigint[]) AND status = 'active'
+                      AND ($2::bigint IS NULL OR event_id = $2)
+                    RETURNING token_id
+                """, unique, event_id)}
+                rows = await conn.fetch("""
+                    SELECT token_id, event_id, seat, status FROM tickets WHERE token_id = ANY($1::bigint[])
+                """, unique)
+            except BaseException:
+                await transaction.rollback()
+                raise
+            committed = not all_or_nothing or len(redeemed) == len(token_ids)
+            if committed:
+                try:
+                    await self._record_ticket_changes(conn, sorted(redeemed))
+                except BaseException:
+                    await transaction.rollback()
+                    raise
+                await transaction.commit()
+            else:
+                await transaction.rollback()
+        return redemption_results(token_ids, redeemed, rows, event_id, committed)
+
+    async def _record_ticket_changes(self, conn, token_ids):
+        if token_ids:
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", TICKET_CHANGES_LOCK_ID)
+            await conn.executemany(numbered(RECORD_TICKET_CHANGE), [(token_id,) for token_id in token_ids])
+
+    async def load_ticket_statuses(self, event_id):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM events WHERE id = $1)", event_id):
+                    return None
+                version = await conn.fetchval(
+                    "SELECT COALESCE(MAX(seq), 0) FROM ticket_changes WHERE event_id = $1", event_id
+                )
+                state = TicketStatuses(event_id, version)
+                cursor = await conn.cursor(
+                    "SELECT token_id, status FROM tickets WHERE event_id = $1 ORDER BY token_id", event_id
+                )
+                while True:
+                    rows = await cursor.fetch(10000)
+                    if not rows:
+                        break
+                    state.extend(rows)
+        return state
+
+    async def load_ticket_changes(self, event_id, since):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            return collapse(await conn.fetch(
+                "SELECT seq, token_id, status FROM ticket_changes WHERE event_id = $1 AND seq > $2 ORDER BY seq",
+                event_id, since,
+            ))
+
+    async def write_verification_logs(self, entries):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                ticket_events = dict(await conn.fetch(
+                    "SELECT token_id, event_id FROM tickets WHERE token_id = ANY($1::bigint[])",
+                    sorted({entry[0] for entry in entries}),
+                ))
+                rows = with_events(entries, ticket_events)
+                await conn.executemany("""
+                    INSERT INTO verification_logs (token_id, verifier_address, status, verified_at, event_id)
+                    VALUES ($1, $2, $3, $4, $5)
+                """, rows)
+                await conn.executemany(
+                    "UPDATE tickets SET verified_at = $1 WHERE token_id = $2",
+                    [(verified_at, token_id) for token_id, _, status, verified_at in entries if status == "valid"],
+                )
+                await write_rollup(conn, scanned(rows))
+
+    async def load_nonces(self, now):
+        pool = await self.pool()
+        return await pool.fetch("SELECT address, nonce, expires_at FROM auth_nonces WHERE expires_at > $1", now)
+
+    async def save_nonces(self, upserts, deletes, now):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany("""
+                    INSERT INTO auth_nonces (address, nonce, expires_at) VALUES ($1, $2, $3)
+                    ON CONFLICT (address) DO UPDATE SET nonce = excluded.nonce, expires_at = excluded.expires_at
+                """, upserts)
+                await conn.executemany("DELETE FROM auth_nonces WHERE address = $1", deletes)
+                await conn.execute("DELETE FROM auth_nonces WHERE expires_at <= $1", now)
+
+    async def revoke_token(self, jti, expires_at):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    INSERT INTO revoked_tokens (jti, expires_at) VALUES ($1, $2)
+                    ON CONFLICT (jti) DO NOTHING
+                """, jti, expires_at)
+                await conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= $1", time.time())
+
+    async def load_revocations(self):
+        pool = await self.pool()
+        return await pool.fetch("SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > $1", time.time())
+
+    async def load_checkpoint(self, name, default):
+        pool = await self.pool()
+        value = await pool.fetchval("SELECT last_block FROM indexer_state WHERE name = $1", name)
+        return default if value is None else value
+
+    async def apply_chain_changes(self, changes, checkpoint_name, block):
+        confirmed_orders, restored_events = [], set()
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany("""
+                    INSERT INTO tickets (token_id, event_id, owner_address, seat)
+                    VALUES ($1, $2, $3, $4)
+                    ON CONFLICT (token_id) DO UPDATE SET
+                        event_id = excluded.event_id,
+                        owner_address = excluded.owner_address,
+                        seat = excluded.seat
+                """, changes["mints"])
+                await conn.executemany(
+                    "UPDATE tickets SET owner_address = $1 WHERE token_id = $2", changes["transfers"]
+                )
+                await conn.executemany(
+                    "UPDATE tickets SET status = 'used' WHERE token_id = $1", [(t,) for t in changes["used"]]
+                )
+                await conn.executemany(
+                    f"UPDATE tickets SET verified_at = COALESCE(verified_at, {NOW}) WHERE token_id = $1",
+                    [(t,) for t in changes["verified"]],
+                )
+                await self._record_ticket_changes(conn, changed_statuses(changes))
+
+                rollup = Rollup()
+                for tx_hash, token_ids in changes["minted_by_tx"].items():
+                    orders = await conn.fetch("""
+                        SELECT id, event_id, seat_type, created_at, quantity, total_price_gwei, status
+                        FROM orders WHERE tx_hash = $1 FOR UPDATE
+                    """, tx_hash)
+                    for order in orders:
+                        if order["status"] == "failed":
+                            # The hold expired before the mint confirmed; the seats are taken on-chain
+                            await conn.execute(
+                                "UPDATE events SET sold = sold + $1 WHERE id = $2", order["quantity"], order["event_id"]
+                            )
+                            restored_events.add(order["event_id"])
+                        if order["status"] != "confirmed":
+                            await conn.execute("DELETE FROM seat_holds WHERE order_id = $1", order["id"])
+                            confirmed_orders.append(order["id"])
+                            rollup.move(order, order["status"], "confirmed")
+                        await conn.execute(
+                            "UPDATE orders SET status = 'confirmed', token_ids = $1 WHERE id = $2",
+                            json.dumps(token_ids), order["id"],
+                        )
+                await write_rollup(conn, rollup)
+
+                if checkpoint_name is not None:
+                    await conn.execute(f"""
+                        INSERT INTO indexer_state (name, last_block, updated_at) VALUES ($1, $2, {NOW})
+                        ON CONFLICT (name) DO UPDATE SET last_block = excluded.last_block, updated_at = excluded.updated_at
+                    """, checkpoint_name, block)
+        return {"confirmed_orders": confirmed_orders, "restored_events": sorted(restored_events)}
+
+    async def import_rows(self, table, columns, chunks):
+        loop = asyncio.get_running_loop()
+        tally = ImportTally(table, columns)
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # COPY into a constraint-free staging table, then one INSERT ... SELECT.
+                # Indexes stay: dropping them would lock out readers for the load
+                await conn.execute(f"""
+                    CREATE TEMP TABLE import_rows ON COMMIT DROP AS
+                    SELECT {', '.join(columns)} FROM {table} WITH NO DATA
+                """)
+                while True:
+                    # Reading and validating the input blocks, so it runs off the event loop
+                    rows = await loop.run_in_executor(None, next, chunks, None)
+                    if rows is None:
+                        break
+                    await conn.copy_records_to_table("import_rows", records=rows, columns=columns)
+                    tally.add(rows)
+
+                known = await conn.fetch("SELECT id FROM events WHERE id = ANY($1::bigint[])", list(tally.event_ids))
+                error = unknown_events(tally.event_ids, [row["id"] for row in known])
+                if error is not None:
+                    raise error
+                values = ", ".join(
+                    f"COALESCE(id, nextval(pg_get_serial_sequence('{table}', 'id')))" if column == "id" else column
+                    for column in columns
+                )
+                try:
+                    await conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {values} FROM import_rows")
+                except asyncpg.IntegrityConstraintViolationError as exc:
+                    raise ValueError(f"Rejected by {table}: {exc}") from exc
+                if "id" in columns:
+                    # Never hand out an imported id again
+                    await conn.execute(f"""
+                        SELECT setval(seq, GREATEST((SELECT max(id) FROM {table}), pg_sequence_last_value(seq::regclass)))
+                        FROM pg_get_serial_sequence('{table}', 'id') AS seq
+                    """)
+                if table == "tickets":
+                    await conn.execute("SELECT pg_advisory_xact_lock($1)", TICKET_CHANGES_LOCK_ID)
+                    await conn.execute("""
+                        INSERT INTO ticket_changes (event_id, token_id, status)
+                        SELECT event_id, token_id, status FROM import_rows
+                    """)
+                await write_rollup(conn, tally.rollup)
+        return tally.rows
+
+    async def export_chunks(self, sql, params, chunk_rows):
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                cursor = await conn.cursor(numbered(sql), *params)
+                while True:
+                    rows = await cursor.fetch(chunk_rows)
+                    if not rows:
+                        break
+                    yield [tuple(row) for row in rows]
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
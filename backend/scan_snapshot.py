@@ -0,0 +1,260 @@
+"""
+Signed, versioned ticket snapshots for offline gate scanning
+
+Venues with poor connectivity cannot afford a round trip per scan, so a
+scanner downloads every ticket of its event once and then pulls small
+deltas whenever it has a connection:
+
+- the **version** is the ``ticket_changes.seq`` of the last status change
+  the snapshot includes. Mints and redemptions append to that log in the
+  transaction that changes the ticket (see repository.py)
+- a **full** snapshot holds the sorted token ids and a status code per
+  ticket; a **delta** since version N holds only the tickets changed after
+  N, with their current status. Both are idempotent: applying a delta
+  twice, or to a snapshot that already includes some of it, is harmless
+- ids are an exact packed array (first id, then 32-bit gaps) rather than a
+  Bloom filter: a filter cannot carry the used/active status and its false
+  positives would admit forged token ids. Gaps between consecutive ids
+  are mostly 1, so zlib shrinks 100k tickets to a few KiB. A snapshot with
+  a gap of 2**32 or more is written in format 2, with 64-bit gaps
+- every payload is signed with a secp256k1 key (keccak256 digest, 65-byte
+  recoverable signature, like an Ethereum transaction), so a scanner that
+  knows the signer address can trust a snapshot relayed by any device
+
+The server keeps the last full snapshot of each requested event in memory
+and moves it forward with the change log instead of re-reading the whole
+event on every download.
+
+Wire format (little-endian)::
+
+    header    magic "NTSS", format (u8), kind (u8: 0 full, 1 delta),
+              event_id (u64), version (u64), base_version (u64), count (u32)
+    body      zlib(first token id (u64), count - 1 gaps (u32; u64 in format 2),
+                   count status codes (u8, see verification_index.STATUSES))
+    signature 65 bytes over keccak256(header + body)
+"""
+
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+from coincurve import PrivateKey, PublicKey
+
+from signatures import keccak256
+from verification_index import STATUS_CODES, STATUSES
+
+MAGIC = b"NTSS"
+FORMAT_VERSION = 1
+# format -> typecode of the gaps between token ids
+GAP_TYPES = {1: "I", 2: "Q"}
+WIDE_GAP = 2 ** 32
+FULL, DELTA = 0, 1
+HEADER = struct.Struct("<4sBBQQQI")
+SIGNATURE_SIZE = 65
+
+# (token_id, status) after the last change of each ticket
+TicketChange = Tuple[int, str]
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _native(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def signer_key(secret: str) -> PrivateKey:
+    """Deterministic signing key, so every worker signs with the same one"""
+    return PrivateKey(keccak256(b"nft-tickets scan snapshot:" + secret.encode("utf-8")))
+
+
+def key_address(public_key: PublicKey) -> str:
+    return "0x" + keccak256(public_key.format(compressed=False)[1:])[-20:].hex()
+
+
+def encode(key: PrivateKey, kind: int, event_id: int, version: int, base_version: int,
+           token_ids: array, statuses: bytearray) -> bytes:
+    """Signed payload for sorted ``token_ids`` and their status codes"""
+    count = len(token_ids)
+    fmt = FORMAT_VERSION
+    body = b""
+    if count:
+        gaps = [b - a for a, b in zip(token_ids, token_ids[1:])]
+        if gaps and max(gaps) >= WIDE_GAP:
+            fmt = 2
+        body = struct.pack("<Q", token_ids[0]) + _little_endian(array(GAP_TYPES[fmt], gaps)) + bytes(statuses)
+    payload = HEADER.pack(MAGIC, fmt, kind, event_id, version, base_version, count) + zlib.compress(body, 6)
+    return payload + key.sign_recoverable(keccak256(payload), hasher=None)
+
+
+def decode(data: bytes, signer: Optional[str] = None) -> dict:
+    """Parse (and with ``signer``, authenticate) a snapshot; raises ValueError"""
+    if len(data) < HEADER.size + SIGNATURE_SIZE:
+        raise ValueError("snapshot too short")
+    payload, signature = data[:-SIGNATURE_SIZE], data[-SIGNATURE_SIZE:]
+    if signer is not None:
+        try:
+            public_key = PublicKey.from_signature_and_message(signature, keccak256(payload), hasher=None)
+        except Exception:
+            raise ValueError("malformed snapshot signature")
+        if key_address(public_key) != signer.lower():
+            raise ValueError("snapshot not signed by the expected key")
+    magic, fmt, kind, event_id, version, base_version, count = HEADER.unpack_from(payload)
+    if magic != MAGIC or fmt not in GAP_TYPES:
+        raise ValueError("not a version 1 or 2 ticket snapshot")
+    body = zlib.decompress(payload[HEADER.size:])
+    token_ids = array("q")
+    statuses = b""
+    if count:
+        gap_type = GAP_TYPES[fmt]
+        gap_bytes = array(gap_type).itemsize * (count - 1)
+        first = struct.unpack_from("<Q", body)[0]
+        token_ids = array("q", accumulate(_native(gap_type, body[8:8 + gap_bytes]), initial=first))
+        statuses = body[8 + gap_bytes:]
+    return {
+        "kind": "full" if kind == FULL else "delta",
+        "event_id": event_id,
+        "version": version,
+        "base_version": base_version,
+        "tickets": {token_id: STATUSES[code] for token_id, code in zip(token_ids, statuses)},
+    }
+
+
+def collapse(rows) -> Tuple[int, List[TicketChange]]:
+    """(highest seq, last status of each ticket sorted by id) from (seq, token_id, status) rows"""
+    version = 0
+    latest: Dict[int, str] = {}
+    for seq, token_id, status in rows:
+        version = max(version, seq)
+        latest[token_id] = status
+    return version, sorted(latest.items())
+
+
+class TicketStatuses:
+    """Sorted token ids and status codes of one event, as of a change-log version"""
+
+    __slots__ = ("event_id", "version", "token_ids", "statuses")
+
+    def __init__(self, event_id: int, version: int):
+        self.event_id = event_id
+        self.version = version
+        self.token_ids = array("q")
+        self.statuses = bytearray()
+
+    def extend(self, rows):
+        """Append (token_id, status) rows, sorted by token id"""
+        for token_id, status in rows:
+            self.token_ids.append(token_id)
+            self.statuses.append(STATUS_CODES.get(status, STATUS_CODES["expired"]))
+
+    def apply(self, version: int, changes: List[TicketChange]):
+        """Move forward to ``version``; ``changes`` are sorted by token id"""
+        if version <= self.version:
+            return
+        added = []
+        for token_id, status in changes:
+            code = STATUS_CODES.get(status, STATUS_CODES["expired"])
+            pos = bisect_left(self.token_ids, token_id)
+            if pos < len(self.token_ids) and self.token_ids[pos] == token_id:
+                self.statuses[pos] = code
+            else:
+                added.append((token_id, code))
+        if added and (not self.token_ids or added[0][0] > self.token_ids[-1]):
+            # New mints usually come after every existing token id
+            self.token_ids.extend(token_id for token_id, _ in added)
+            self.statuses.extend(code for _, code in added)
+        elif added:
+            merged = sorted(list(zip(self.token_ids, self.statuses)) + added)
+            self.token_ids = array("q", (token_id for token_id, _ in merged))
+            self.statuses = bytearray(code for _, code in merged)
+        self.version = version
+
+    def __len__(self):
+        return len(self.token_ids)
+
+
+class ScanSnapshotCache:
+    """Per-event snapshots kept current from the change log"""
+
+    def __init__(self, secret: str):
+        self._key = signer_key(secret)
+        self.signer = key_address(self._key.public_key)
+        self._events: Dict[int, TicketStatuses] = {}
+        # event_id -> (version, encoded full snapshot)
+        self._encoded: Dict[int, Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.refreshes = 0
+        self.deltas = 0
+
+    async def current(self, repository, event_id: int) -> Optional[TicketStatuses]:
+        """The event's statuses brought up to date, or None if the event is unknown"""
+        state = self._events.get(event_id)
+        if state is None:
+            state = await repository.load_ticket_statuses(event_id)
+            if state is None:
+                return None
+            with self._lock:
+                # A concurrent build may have won; keep whichever is newer
+                existing = self._events.get(event_id)
+                if existing is None or existing.version < state.version:
+                    self._events[event_id] = state
+                state = self._events[event_id]
+            self.builds += 1
+            return state
+        version, changes = await repository.load_ticket_changes(event_id, state.version)
+        if changes:
+            with self._lock:
+                state.apply(version, changes)
+            self.refreshes += 1
+        return state
+
+    async def download(self, repository, event_id: int,
+                       since: Optional[int] = None) -> Optional[Tuple[int, int, bytes]]:
+        """(kind, version, signed payload) for a scanner at version ``since``
+
+        A delta when ``since`` is a version this server can have issued and
+        the delta is smaller than the event; otherwise the full snapshot.
+        None if the event is unknown.
+        """
+        state = await self.current(repository, event_id)
+        if state is None:
+            return None
+        if since is not None and since <= state.version:
+            version, changes = await repository.load_ticket_changes(event_id, since)
+            if len(changes) < len(state) // 2:
+                self.deltas += 1
+                token_ids = array("q", (token_id for token_id, _ in changes))
+                statuses = bytearray(STATUS_CODES.get(status, STATUS_CODES["expired"]) for _, status in changes)
+                version = max(version, since)
+                return DELTA, version, encode(self._key, DELTA, event_id, version, since, token_ids, statuses)
+
+        cached = self._encoded.get(event_id)
+        if cached is None or cached[0] != state.version:
+            version = state.version
+            cached = (version, encode(self._key, FULL, event_id, version, 0, state.token_ids, state.statuses))
+            self._encoded[event_id] = cached
+        return (FULL,) + cached
+
+    def stats(self) -> dict:
+        return {
+            "events": {event_id: {"tickets": len(state), "version": state.version}
+                       for event_id, state in self._events.items()},
+            "builds": self.builds,
+            "refreshes": self.refreshes,
+            "deltas": self.deltas,
+            "signer": self.signer,
+        }
@@ -0,0 +1,328 @@
+"""
+State shared between API worker processes
+
+Everything the API keeps in memory (catalog cache, JWT revocations, login
+nonces and rate limits, the gate-scanning index) was written for a single
+process. Under ``gunicorn -w N`` each worker would hold its own copy, so a
+nonce issued by one worker could not be redeemed on another and a purchase
+would only invalidate the cache of the worker that served it.
+
+Two backends implement the same small interface, selected with
+SHARED_STATE_BACKEND:
+
+- ``memory`` (default): plain dicts, for a single process
+- ``local``: processes on one host share a SQLite key/value file
+  (SHARED_STATE_PATH), a memory-mapped array of generation counters, and
+  ``flock`` locks. gunicorn.conf.py selects it when running more than one
+  worker.
+
+Generation counters are how in-process caches stay coherent: a worker that
+changes something bumps the counter, and the others compare it with the
+value they last saw (one read from shared memory, no syscall) and refresh.
+"""
+
+import fcntl
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from db import DATABASE_PATH
+
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory")  # memory or local
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", f"{DATABASE_PATH}.state")
+
+# Generation counter slots in the shared memory map
+GENERATIONS = {
+    "catalog": 0,
+    "revocations": 1,
+    "tickets": 2,
+    "availability": 3,
+}
+_SLOT = struct.Struct("<q")
+
+
+class MemoryState:
+    """Single-process backend"""
+
+    name = "memory"
+
+    def __init__(self):
+        # key -> (value, expires_at or None)
+        self._data: Dict[str, Tuple[object, Optional[float]]] = {}
+        self._generations = dict.fromkeys(GENERATIONS, 0)
+        self._lock = threading.RLock()
+
+    def _live(self, key: str, now: float):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._live(key, time.time())
+        return None if entry is None else entry[0]
+
+    def set(self, key: str, value: str, ttl: float = None):
+        with self._lock:
+            self._data[key] = (value, None if ttl is None else time.time() + ttl)
+
+    def setdefault(self, key: str, value: str, ttl: float = None) -> str:
+        """Set ``key`` unless it holds a live value; returns the value it holds"""
+        with self._lock:
+            entry = self._live(key, time.time())
+            if entry is not None:
+                return entry[0]
+            self._data[key] = (value, None if ttl is None else time.time() + ttl)
+        return value
+
+    def pop(self, key: str, value: str = None) -> Optional[str]:
+        """Atomically read and delete ``key`` (only if it holds ``value``, when given)"""
+        with self._lock:
+            entry = self._live(key, time.time())
+            if entry is None or (value is not None and entry[0] != value):
+                return None
+            del self._data[key]
+        return entry[0]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, ttl: float) -> Tuple[int, float]:
+        """Fixed-window counter: returns (count, window expiry)"""
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            count, expires_at = (entry[0] + 1, entry[1]) if entry else (1, now + ttl)
+            self._data[key] = (count, expires_at)
+        return count, expires_at
+
+    def keys(self, prefix: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [key for key in list(self._data) if key.startswith(prefix) and self._live(key, now)]
+
+    def count(self, prefix: str) -> int:
+        return len(self.keys(prefix))
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def generation(self, name: str) -> int:
+        return self._generations[name]
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            self._generations[name] += 1
+            return self._generations[name]
+
+    def leader(self, name: str) -> bool:
+        return True
+
+    @contextmanager
+    def exclusive(self, name: str):
+        with self._lock:
+            yield
+
+
+class LocalSharedState:
+    """Multi-process backend for workers on one host"""
+
+    name = "local"
+
+    def __init__(self, path: str = None):
+        self.path = path or SHARED_STATE_PATH
+        self._local = threading.local()
+        self._leases: Dict[str, int] = {}
+        self._lease_lock = threading.Lock()
+        # flock does not exclude threads sharing one file descriptor
+        self._gen_lock = threading.Lock()
+
+        with self._file_lock("init"):
+            conn = self._conn()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS kv (
+                    key TEXT PRIMARY KEY,
+                    value,
+                    expires_at REAL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_kv_expires_at ON kv (expires_at)")
+
+            fd = os.open(self.path + ".gen", os.O_RDWR | os.O_CREAT, 0o600)
+            size = _SLOT.size * 64
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._gen_fd = fd
+            self._generations = mmap.mmap(fd, size)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit: every operation is a single statement
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # Ephemeral state: an OS crash may lose the last writes, which is fine
+            conn.execute("PRAGMA synchronous = OFF")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _file_lock(self, name: str):
+        fd = os.open(f"{self.path}.{name}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: str, ttl: float = None):
+        self._conn().execute("""
+            INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+        """, (key, value, None if ttl is None else time.time() + ttl))
+
+    def setdefault(self, key: str, value: str, ttl: float = None) -> str:
+        """Set ``key`` unless it holds a live value; returns the value it holds"""
+        now = time.time()
+        return self._conn().execute("""
+            INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value END,
+                expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+            RETURNING value
+        """, (key, value, None if ttl is None else now + ttl, now, now)).fetchall()[0][0]
+
+    def pop(self, key: str, value: str = None) -> Optional[str]:
+        """Atomically read and delete ``key`` (only if it holds ``value``, when given; only one process gets it)"""
+        # fetchall() so the statement finishes and releases the write lock
+        if value is None:
+            rows = self._conn().execute("DELETE FROM kv WHERE key = ? RETURNING value, expires_at", (key,)).fetchall()
+        else:
+            rows = self._conn().execute("DELETE FROM kv WHERE key = ? AND value = ? RETURNING value, expires_at",
+                                        (key, value)).fetchall()
+        row = rows[0] if rows else None
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, ttl: float) -> Tuple[int, float]:
+        """Fixed-window counter: returns (count, window expiry)"""
+        now = time.time()
+        return tuple(self._conn().execute("""
+            INSERT INTO kv (key, value, expires_at) VALUES (?, 1, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at > ? THEN value + 1 ELSE 1 END,
+                expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END
+            RETURNING value, expires_at
+        """, (key, now + ttl, now, now)).fetchall()[0])
+
+    def keys(self, prefix: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT key FROM kv WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time()),
+        ).fetchall()
+        return [key for (key,) in rows]
+
+    def count(self, prefix: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM kv WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time()),
+        ).fetchone()[0]
+
+    def sweep(self) -> int:
+        return self._conn().execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def generation(self, name: str) -> int:
+        return _SLOT.unpack_from(self._generations, GENERATIONS[name] * _SLOT.size)[0]
+
+    def bump(self, name: str) -> int:
+        offset = GENERATIONS[name] * _SLOT.size
+        with self._gen_lock:
+            fcntl.flock(self._gen_fd, fcntl.LOCK_EX)
+            try:
+                value = _SLOT.unpack_from(self._generations, offset)[0] + 1
+                _SLOT.pack_into(self._generations, offset, value)
+            finally:
+                fcntl.flock(self._gen_fd, fcntl.LOCK_UN)
+        return value
+
+    def leader(self, name: str) -> bool:
+        """True in exactly one process; the lease passes on if the holder exits"""
+        with self._lease_lock:
+            if name in self._leases:
+                return True
+            fd = os.open(f"{self.path}.{name}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._leases[name] = fd
+            return True
+
+    @contextmanager
+    def exclusive(self, name: str):
+        """Cross-process critical section (blocks until the lock is free)"""
+        with self._file_lock(name):
+            yield
+
+
+class GenerationWatch:
+    """Tracks one generation counter on behalf of an in-process cache"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seen = get_state().generation(name)
+
+    def check(self) -> bool:
+        """True (once) if another process bumped the counter since the last check"""
+        current = get_state().generation(self.name)
+        if current == self.seen:
+            return False
+        self.seen = current
+        return True
+
+    def publish(self):
+        """Tell other processes this cache's data changed"""
+        current = get_state().bump(self.name)
+        # If someone else bumped in between, leave ``seen`` behind so the
+        # next check() still reports their change
+        if current == self.seen + 1:
+            self.seen = current
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """The process-wide shared state backend"""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = LocalSharedState() if SHARED_STATE_BACKEND == "local" else MemoryState()
+    return _state
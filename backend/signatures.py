@@ -0,0 +1,136 @@
+"""
+EIP-191 (``personal_sign``) signature verification for wallet login
+
+Recovering the signer's public key from a secp256k1 signature is the most
+CPU-heavy thing the API does, and login storms during ticket drops arrive
+in bursts. Recovery therefore never runs on the event loop:
+
+- ``coincurve`` (libsecp256k1) and pycryptodome's Keccak do the maths in C
+  and release the GIL, so a thread pool of SIGNATURE_WORKERS threads scales
+  across cores without pickling overhead
+- handing the pool one task per signature costs about as much as the
+  recovery itself, so ``verify`` calls that arrive in the same event loop
+  iteration are queued and recovered together, one pool task per chunk of
+  SIGNATURE_BATCH_CHUNK
+
+There is no result cache: ``/auth/verify`` consumes the nonce before
+checking the signature, so the same (address, message, signature) is
+never verified twice.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from coincurve import PublicKey
+from Crypto.Hash import keccak
+
+SIGNATURE_WORKERS = int(os.getenv("SIGNATURE_WORKERS", str(os.cpu_count() or 1)))
+SIGNATURE_BATCH_CHUNK = int(os.getenv("SIGNATURE_BATCH_CHUNK", "64"))
+
+# (address, message, signature)
+VerifyItem = Tuple[str, str, str]
+
+
+def keccak256(data: bytes) -> bytes:
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def personal_message_hash(message: str) -> bytes:
+    """Hash of ``"\\x19Ethereum Signed Message:\\n" + len(message) + message``"""
+    raw = message.encode("utf-8")
+    return keccak256(b"\x19Ethereum Signed Message:\n" + str(len(raw)).encode() + raw)
+
+
+def recover_address(message: str, signature: str) -> Optional[str]:
+    """Lower-case address that produced ``signature`` over ``message``, or None if malformed"""
+    try:
+        raw = bytes.fromhex(signature[2:] if signature.startswith("0x") else signature)
+    except ValueError:
+        return None
+    if len(raw) != 65:
+        return None
+    v = raw[64]
+    if v >= 27:
+        v -= 27
+    if v not in (0, 1):
+        return None
+    try:
+        public_key = PublicKey.from_signature_and_message(
+            raw[:64] + bytes([v]), personal_message_hash(message), hasher=None
+        )
+    except ValueError:
+        return None
+    return "0x" + keccak256(public_key.format(compressed=False)[1:])[-20:].hex()
+
+
+def verify_signature(address: str, message: str, signature: str) -> bool:
+    """True if ``address`` signed ``message`` (synchronous, CPU-bound)"""
+    return recover_address(message, signature) == address.lower()
+
+
+def _verify_chunk(items: Sequence[VerifyItem]) -> List[bool]:
+    return [verify_signature(*item) for item in items]
+
+
+class SignatureVerifier:
+    """Pooled, micro-batched signature verification for async handlers"""
+
+    def __init__(self, workers: int = None, chunk_size: int = None):
+        self.workers = workers or SIGNATURE_WORKERS
+        self.chunk_size = chunk_size or SIGNATURE_BATCH_CHUNK
+        self._pending: List[Tuple[VerifyItem, asyncio.Future]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.verified = 0
+        self.batches = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ecrecover")
+        return self._executor
+
+    async def verify(self, address: str, message: str, signature: str) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._flush, loop)
+        self._pending.append(((address, message, signature), future))
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        """Send the signatures queued during this loop iteration to the pool"""
+        pending, self._pending = self._pending, []
+        executor = self._get_executor()
+        for i in range(0, len(pending), self.chunk_size):
+            chunk = pending[i:i + self.chunk_size]
+            task = loop.run_in_executor(executor, _verify_chunk, [item for item, _ in chunk])
+            task.add_done_callback(lambda task, chunk=chunk: self._resolve(chunk, task))
+            self.batches += 1
+        self.verified += len(pending)
+
+    @staticmethod
+    def _resolve(chunk: Sequence[Tuple[VerifyItem, asyncio.Future]], task: asyncio.Future):
+        error = task.exception()
+        for index, (_, future) in enumerate(chunk):
+            if future.done():  # the request was cancelled
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result()[index])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "verified": self.verified,
+            "batches": self.batches,
+        }
+
+
+signature_verifier = SignatureVerifier()
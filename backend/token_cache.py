@@ -0,0 +1,170 @@
+"""
+Authenticated-principal cache and token revocation for get_current_user
+
+Every authenticated request used to run a full ``jwt.decode`` (base64,
+JSON, HMAC, claim checks). Tokens are now verified once and the decoded
+payload is cached under the token's SHA-256 digest until the token's own
+``exp``, so repeat requests cost a hash and a dict lookup. The cache is
+dropped whenever the signing secret changes, so a rotated JWT_SECRET never
+honours a token that the new secret would reject.
+
+Tokens carry a ``jti``; revoking one (logout) puts it in an in-memory set,
+checked in O(1) on every request including cache hits, and in the
+``revoked_tokens`` table so revocations survive restarts. Entries are
+pruned once the token would have expired anyway. Other worker processes
+see a revocation through a shared generation counter and reload the set.
+A token issued without a ``jti`` is revoked under its digest instead.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import jwt
+
+from repository import get_repository
+from shared_state import GenerationWatch
+
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))  # 0 disables caching
+
+PRUNE_EVERY = 1024
+
+DIGEST_PREFIX = "sha256:"
+
+
+def revocation_id(token: str, payload: dict) -> str:
+    """The token's ``jti``, or ``sha256:<digest>`` for a token issued without one"""
+    return payload.get("jti") or DIGEST_PREFIX + hashlib.sha256(token.encode()).hexdigest()
+
+
+class RevocationList:
+    """Revoked token ids, kept until the token's own expiry"""
+
+    def __init__(self):
+        # jti -> expires_at (unix seconds)
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._watch = GenerationWatch("revocations")
+        self._added = 0
+
+    def __contains__(self, jti) -> bool:
+        return jti in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._added += 1
+            if self._added % PRUNE_EVERY == 0:
+                self._prune(time.time())
+
+    def _prune(self, now: float):
+        for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[jti]
+
+    async def revoke(self, jti: str, expires_at: float):
+        """Persist a revocation, apply it in memory and tell other workers"""
+        await get_repository().revoke_token(jti, float(expires_at))
+        self.add(jti, expires_at)
+        self._watch.publish()
+
+    def changed(self) -> bool:
+        """True if another worker revoked a token since the last load"""
+        return self._watch.check()
+
+    async def load(self) -> int:
+        """Load every unexpired revocation"""
+        rows = await get_repository().load_revocations()
+        with self._lock:
+            self._revoked.update((jti, expires_at) for jti, expires_at in rows)
+        return len(rows)
+
+
+class TokenCache:
+    """LRU of verified JWT payloads keyed by token digest"""
+
+    def __init__(self, algorithm: str, revoked: RevocationList, max_entries: int = None):
+        self.algorithm = algorithm
+        self.revoked = revoked
+        self.max_entries = JWT_CACHE_SIZE if max_entries is None else max_entries
+        # digest -> (payload, expires_at)
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._secret: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.revoked_hits = 0
+        self.secret_rotations = 0
+        self.decode_seconds = 0.0
+
+    def verify(self, token: str, secret: str) -> Optional[dict]:
+        """Decoded payload of a valid, unexpired, unrevoked token, else None"""
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        payload = None
+        with self._lock:
+            if secret != self._secret:
+                if self._secret is not None:
+                    self.secret_rotations += 1
+                self._entries.clear()
+                self._secret = secret
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    payload = entry[0]
+                else:
+                    del self._entries[key]
+
+        if payload is None:
+            start = time.perf_counter()
+            try:
+                payload = jwt.decode(token, secret, algorithms=[self.algorithm])
+            except jwt.InvalidTokenError:
+                payload = None
+            self.decode_seconds += time.perf_counter() - start
+            self.misses += 1
+            if payload is None:
+                self.rejected += 1
+                return None
+            self._store(key, payload, secret)
+
+        if (payload.get("jti") or DIGEST_PREFIX + key.hex()) in self.revoked:
+            self.revoked_hits += 1
+            return None
+        return payload
+
+    def _store(self, key: bytes, payload: dict, secret: str):
+        if not self.max_entries or "exp" not in payload:
+            return
+        with self._lock:
+            if secret != self._secret:
+                return
+            self._entries[key] = (payload, float(payload["exp"]))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        decode_avg = self.decode_seconds / self.misses if self.misses else 0.0
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "revoked_rejections": self.revoked_hits,
+            "revoked_tokens": len(self.revoked),
+            "secret_rotations": self.secret_rotations,
+            "decode_avg_us": round(decode_avg * 1e6, 2),
+            # Decodes the cache answered, priced at the measured average
+            "decode_saved_ms": round(self.hits * decode_avg * 1000, 3),
+        }
+
+
+revoked_tokens = RevocationList()
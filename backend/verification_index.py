@@ -0,0 +1,335 @@
+"""
+Event-scoped in-memory index for gate scanning
+
+On event day every scan is for one known event, so its tickets can be
+preloaded once and answered from memory instead of running the
+tickets/events JOIN per scan. Tickets are stored column-wise: a sorted
+``array('q')`` of token ids searched with ``bisect``, parallel lists of
+interned owner and seat strings, and a ``bytearray`` of status codes.
+With unique seat labels and ~33k distinct owners that is about 16 MiB
+per 100k tickets, against ~70 MiB for a dict of sqlite3.Row objects, and
+lookups take a few microseconds (see scripts/bench_verification_index.py).
+
+Writers that change a ticket's status or owner must call ``update`` (or
+``add`` for newly minted tickets) so the index never serves stale data.
+Anything not in the index falls through to the database.
+
+With several worker processes, the set of preloaded events lives in
+shared state. Writers ``publish`` the ticket records they changed: each
+publish bumps the "tickets" generation and stores its records under that
+generation for VERIFICATION_DELTA_TTL seconds. The other workers notice
+through ``changed`` (one read of shared memory) and ``pull`` the records,
+patching their copies in place. Only what cannot be patched (pins
+changed, a bulk import, or records that expired before a worker read
+them) makes ``pull`` ask for a full reload, which the app runs in the
+background while the old copies keep answering.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from shared_state import SHARED_STATE_BACKEND, get_state
+
+# Comma-separated event ids to preload at startup
+VERIFICATION_PRELOAD_EVENTS = os.getenv("VERIFICATION_PRELOAD_EVENTS", "")
+# Seconds other workers have to read a published change before they reload instead
+VERIFICATION_DELTA_TTL = float(os.getenv("VERIFICATION_DELTA_TTL", "300"))
+# Seconds between checks for other workers' changes while no scans arrive
+VERIFICATION_SYNC_INTERVAL = float(os.getenv("VERIFICATION_SYNC_INTERVAL", "1"))
+
+STATUSES = ("active", "used", "expired")
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+
+PINNED_PREFIX = "verification_index:"
+DELTA_PREFIX = "verification_delta:"
+
+
+def preload_event_ids() -> List[int]:
+    """Event ids configured for preloading at startup"""
+    return [int(part) for part in VERIFICATION_PRELOAD_EVENTS.split(",") if part.strip()]
+
+
+class EventTicketIndex:
+    """Column-oriented ticket table for a single event"""
+
+    __slots__ = ("event_id", "event_name", "date", "venue", "token_ids", "owners", "seats", "statuses", "extra")
+
+    def __init__(self, event_id: int, event_name: str, date: str, venue: str):
+        self.event_id = event_id
+        self.event_name = event_name
+        self.date = date
+        self.venue = venue
+        self.token_ids = array("q")
+        self.owners: List[str] = []
+        self.seats: List[str] = []
+        self.statuses = bytearray()
+        # Tickets added after the bulk load: token_id -> [owner, seat, status code]
+        self.extra: Dict[int, list] = {}
+
+    def _position(self, token_id: int) -> int:
+        pos = bisect_left(self.token_ids, token_id)
+        if pos < len(self.token_ids) and self.token_ids[pos] == token_id:
+            return pos
+        return -1
+
+    def get(self, token_id: int) -> Optional[dict]:
+        pos = self._position(token_id)
+        if pos >= 0:
+            owner, seat, code = self.owners[pos], self.seats[pos], self.statuses[pos]
+        elif token_id in self.extra:
+            owner, seat, code = self.extra[token_id]
+        else:
+            return None
+        return {
+            "token_id": token_id,
+            "event_id": self.event_id,
+            "event_name": self.event_name,
+            "date": self.date,
+            "venue": self.venue,
+            "seat": seat,
+            "owner_address": owner,
+            "status": STATUSES[code],
+        }
+
+    def update(self, token_id: int, status: str = None, owner: str = None) -> bool:
+        pos = self._position(token_id)
+        if pos >= 0:
+            if status is not None:
+                self.statuses[pos] = STATUS_CODES[status]
+            if owner is not None:
+                self.owners[pos] = sys.intern(owner)
+            return True
+        if token_id in self.extra:
+            record = self.extra[token_id]
+            if owner is not None:
+                record[0] = sys.intern(owner)
+            if status is not None:
+                record[2] = STATUS_CODES[status]
+            return True
+        return False
+
+    def extend(self, rows):
+        """Append (token_id, owner, seat, status) rows, sorted by token id"""
+        intern = sys.intern
+        for token_id, owner, seat, status in rows:
+            self.token_ids.append(token_id)
+            self.owners.append(intern(owner))
+            self.seats.append(intern(seat))
+            self.statuses.append(STATUS_CODES.get(status, STATUS_CODES["expired"]))
+
+    def __len__(self):
+        return len(self.token_ids) + len(self.extra)
+
+
+def load_event(conn, event_id: int) -> Optional[EventTicketIndex]:
+    """Build an event's index from SQLite, or None if the event does not exist"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, date, venue FROM events WHERE id = ?", (event_id,))
+    event = cursor.fetchone()
+    if event is None:
+        return None
+
+    index = EventTicketIndex(event_id, event["name"], event["date"], event["venue"])
+    cursor.execute("""
+        SELECT token_id, owner_address, seat, status FROM tickets
+        WHERE event_id = ?
+        ORDER BY token_id
+    """, (event_id,))
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        index.extend(rows)
+    return index
+
+
+class VerificationIndex:
+    """Preloaded ticket indexes for the events currently being scanned"""
+
+    def __init__(self):
+        self._events: Dict[int, EventTicketIndex] = {}
+        self._lock = threading.Lock()
+        # "tickets" generation applied so far, and the records this worker
+        # published itself, by generation (it applied them when it wrote them)
+        self.seen = get_state().generation("tickets")
+        self._own: Dict[int, Optional[list]] = {}
+        self._reload_from: Optional[int] = None
+        self._pull_lock = threading.Lock()
+        # One thread, so changes reach shared state in the order they were made
+        self._publisher: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        self.pulled = 0
+        self.reloads = 0
+
+    def install(self, index: EventTicketIndex) -> int:
+        """Serve ``index`` for its event, replacing any older copy"""
+        with self._lock:
+            self._events[index.event_id] = index
+        return len(index)
+
+    def load(self, conn, event_id: int) -> Optional[int]:
+        """(Re)load every ticket for ``event_id`` from SQLite; returns the ticket count"""
+        index = load_event(conn, event_id)
+        return None if index is None else self.install(index)
+
+    def unload(self, event_id: int) -> bool:
+        with self._lock:
+            return self._events.pop(event_id, None) is not None
+
+    def pin(self, event_id: int):
+        """Ask every worker to keep ``event_id`` loaded"""
+        get_state().set(f"{PINNED_PREFIX}{event_id}", "1")
+        self.publish()
+
+    def unpin(self, event_id: int):
+        get_state().delete(f"{PINNED_PREFIX}{event_id}")
+        self.publish()
+
+    def pinned(self) -> List[int]:
+        return sorted(int(key[len(PINNED_PREFIX):]) for key in get_state().keys(PINNED_PREFIX))
+
+    def publish(self, changes: Optional[List[tuple]] = None):
+        """Tell other workers that tickets changed
+
+        ``changes`` are the (token_id, event_id, owner, seat, status)
+        records this worker already applied, with None for what did not
+        change (event_id and seat only for new tickets). Without them the
+        other workers reload every pinned event.
+        """
+        if SHARED_STATE_BACKEND == "memory":
+            self._write(changes)
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(changes)
+            return
+        # Off the event loop: the write may wait on another worker's lock
+        if self._publisher is None:
+            self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="verification-publish")
+        self._publisher.submit(self._write, changes)
+
+    def _write(self, changes: Optional[List[tuple]]):
+        state = get_state()
+        # Records are stored before the bump makes their generation visible
+        with state.exclusive("tickets"):
+            generation = state.generation("tickets") + 1
+            self._own[generation] = changes
+            if SHARED_STATE_BACKEND != "memory":
+                state.set(f"{DELTA_PREFIX}{generation}", json.dumps(changes), ttl=VERIFICATION_DELTA_TTL)
+            state.bump("tickets")
+        with self._pull_lock:
+            if self.seen == generation - 1:
+                self.seen = generation
+                self._prune()
+
+    def shutdown(self):
+        """Finish publishing queued changes"""
+        if self._publisher is not None:
+            self._publisher.shutdown(wait=True)
+            self._publisher = None
+
+    def changed(self) -> bool:
+        """True if another worker published ticket changes not pulled yet"""
+        return get_state().generation("tickets") != self.seen
+
+    def pull(self) -> bool:
+        """Apply the changes published since the last pull; True if every pinned event must be reloaded
+
+        Reads shared state, so run it on a thread.
+        """
+        state = get_state()
+        reload = False
+        with self._pull_lock:
+            current = state.generation("tickets")
+            while self.seen < current:
+                generation = self.seen + 1
+                if generation in self._own:
+                    changes = self._own[generation]
+                else:
+                    raw = state.get(f"{DELTA_PREFIX}{generation}")
+                    # Expired before this worker read it
+                    changes = None if raw is None else json.loads(raw)
+                if changes is None:
+                    reload = True
+                elif not reload:
+                    self.apply(changes)
+                    self.pulled += len(changes)
+                self.seen = generation
+            self._prune()
+        return reload
+
+    def _prune(self):
+        # A reload in progress rewinds to where it started, so keep what follows
+        floor = self.seen if self._reload_from is None else min(self.seen, self._reload_from)
+        for generation in [g for g in self._own if g <= floor]:
+            del self._own[generation]
+
+    def apply(self, changes: List[tuple]):
+        """Apply published (token_id, event_id, owner, seat, status) records"""
+        for token_id, event_id, owner, seat, status in changes:
+            if seat is not None:
+                self.add(event_id, token_id, owner, seat, status or "active")
+            else:
+                self.update(token_id, status=status, owner=owner)
+
+    def begin_reload(self):
+        """Note where a full reload starts, before it reads any tickets"""
+        with self._pull_lock:
+            self._reload_from = get_state().generation("tickets")
+
+    def replace(self, indexes: List[EventTicketIndex]):
+        """Serve exactly ``indexes``, dropping every other event
+
+        After ``begin_reload``, changes published since it are pulled again,
+        since the new copies may have been read before them.
+        """
+        with self._lock:
+            self._events = {index.event_id: index for index in indexes}
+        with self._pull_lock:
+            if self._reload_from is not None:
+                self.seen = min(self.seen, self._reload_from)
+                self._reload_from = None
+            self.reloads += 1
+
+    def lookup(self, token_id: int) -> Optional[dict]:
+        """Return the ticket from memory, or None if it is not indexed"""
+        for index in list(self._events.values()):
+            ticket = index.get(token_id)
+            if ticket is not None:
+                self.hits += 1
+                return ticket
+        self.misses += 1
+        return None
+
+    def add(self, event_id: int, token_id: int, owner: str, seat: str, status: str = "active"):
+        """Index a ticket minted after its event was loaded"""
+        index = self._events.get(event_id)
+        if index is not None and not index.update(token_id, status=status, owner=owner):
+            index.extra[token_id] = [sys.intern(owner), sys.intern(seat), STATUS_CODES[status]]
+
+    def update(self, token_id: int, status: str = None, owner: str = None):
+        """Apply a ticket status/owner change to whichever index holds it"""
+        for index in list(self._events.values()):
+            if index.update(token_id, status=status, owner=owner):
+                return
+
+    def stats(self) -> dict:
+        return {
+            "events": {event_id: len(index) for event_id, index in self._events.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "changes_pulled": self.pulled,
+            "reloads": self.reloads,
+        }
+
+
+verification_index = VerificationIndex()
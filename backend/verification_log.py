@@ -0,0 +1,161 @@
+"""
+Write-behind pipeline for ticket verification logs
+
+Gate scans append to an in-memory buffer instead of writing to the database
+on the request path. A background task drains the buffer in one transaction
+per batch (``executemany`` into verification_logs plus the matching
+tickets.verified_at updates) whenever it reaches the batch size or the
+flush interval elapses, and once more on shutdown.
+
+Operators who cannot tolerate losing the last unflushed batch on a crash
+can set VERIFICATION_LOG_MODE=sync to write every scan before responding.
+Paths that must never wait on the database (the verification page) use
+``submit``, which always buffers and in sync mode wakes the flusher at once.
+
+A failed flush puts its batch back for the next attempt, but during a
+database outage the buffer would otherwise grow with every scan. It is
+trimmed to the newest VERIFICATION_LOG_MAX_PENDING entries whenever a
+batch is put back; the oldest are dropped, logged and counted.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from repository import get_repository
+
+VERIFICATION_LOG_MODE = os.getenv("VERIFICATION_LOG_MODE", "batched")  # batched or sync
+VERIFICATION_LOG_BATCH_SIZE = int(os.getenv("VERIFICATION_LOG_BATCH_SIZE", "500"))
+VERIFICATION_LOG_FLUSH_INTERVAL = float(os.getenv("VERIFICATION_LOG_FLUSH_INTERVAL", "0.5"))  # seconds
+VERIFICATION_LOG_MAX_PENDING = int(os.getenv("VERIFICATION_LOG_MAX_PENDING", "100000"))
+
+logger = logging.getLogger("nft_tickets.verification_log")
+
+# (token_id, verifier_address, status, verified_at)
+LogEntry = Tuple[int, Optional[str], str, str]
+
+
+def _timestamp() -> str:
+    """UTC timestamp in SQLite's CURRENT_TIMESTAMP format"""
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class VerificationLogWriter:
+    """Buffers verification events and flushes them in batches"""
+
+    def __init__(self, mode: str = None, batch_size: int = None, flush_interval: float = None,
+                 max_pending: int = None):
+        self.mode = mode or VERIFICATION_LOG_MODE
+        self.batch_size = batch_size or VERIFICATION_LOG_BATCH_SIZE
+        self.flush_interval = VERIFICATION_LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.max_pending = max_pending or VERIFICATION_LOG_MAX_PENDING
+        self._buffer: List[LogEntry] = []
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def log(self, token_id: int, status: str, verifier_address: str = None):
+        """Record one verification (buffered, or written immediately in sync mode)"""
+        entry = (token_id, verifier_address, status, _timestamp())
+        if self.mode == "sync":
+            await get_repository().write_verification_logs([entry])
+            self.flushed += 1
+            self.batches += 1
+            return
+
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if full and self._wakeup is not None:
+            self._wakeup.set()
+
+    def submit(self, token_id: int, status: str, verifier_address: str = None):
+        """Record one verification without waiting for the database, in either mode"""
+        entry = (token_id, verifier_address, status, _timestamp())
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if (full or self.mode == "sync") and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _take(self) -> List[LogEntry]:
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        return entries
+
+    async def flush(self):
+        """Write everything buffered so far"""
+        entries = self._take()
+        if not entries:
+            return
+        try:
+            await get_repository().write_verification_logs(entries)
+        except Exception:
+            # Keep the batch for the next attempt, up to max_pending scans
+            with self._lock:
+                self._buffer[:0] = entries
+                excess = len(self._buffer) - self.max_pending
+                if excess > 0:
+                    del self._buffer[:excess]
+                    self.dropped += excess
+            if excess > 0:
+                logger.error("Verification log backlog over %d entries: dropped the oldest %d",
+                             self.max_pending, excess)
+            raise
+        self.flushed += len(entries)
+        self.batches += 1
+
+    async def _run(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush %d verification log entries", self.pending)
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still buffered"""
+        if self._task is not None:
+            # Not cancel(): before Python 3.12 wait_for() can swallow a
+            # cancellation that races a wakeup, and the task never exits
+            self._running = False
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "pending": self.pending,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+verification_log = VerificationLogWriter()
@@ -0,0 +1,254 @@
+"""
+Pre-rendered, compressed verification pages for /verify/{token_id}/page
+
+Door staff keep this page open and refresh it constantly. It used to run
+the full verification (lookup plus log write) and format a large f-string
+on every hit. Now:
+
+- the HTML templates are compiled once at import: whitespace is stripped
+  and the source is split into literal chunks and ``{{ slot }}`` names, so
+  rendering is a single join of escaped values
+- each ticket's rendered page is cached together with gzip and (if the
+  ``brotli`` package is installed) brotli encodings and an ETag, so a
+  refresh costs a dict lookup and the client usually gets a 304
+- entries expire after VERIFY_PAGE_CACHE_TTL seconds, which bounds how old
+  the "Verified" time on a page can be, and are dropped as soon as the
+  ticket's status or owner changes (``invalidate``; other workers clear
+  their cache through the shared ``tickets`` generation counter)
+"""
+
+import gzip
+import hashlib
+import html
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from shared_state import GenerationWatch
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+VERIFY_PAGE_CACHE_SIZE = int(os.getenv("VERIFY_PAGE_CACHE_SIZE", "10000"))  # pages, 0 disables caching
+VERIFY_PAGE_CACHE_TTL = float(os.getenv("VERIFY_PAGE_CACHE_TTL", "10"))  # seconds
+VERIFY_PAGE_GZIP_LEVEL = int(os.getenv("VERIFY_PAGE_GZIP_LEVEL", "9"))
+VERIFY_PAGE_BROTLI_QUALITY = int(os.getenv("VERIFY_PAGE_BROTLI_QUALITY", "5"))
+
+# Preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class Template:
+    """HTML with ``{{ name }}`` slots, parsed once"""
+
+    _SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+    def __init__(self, source: str):
+        source = "\n".join(line.strip() for line in source.splitlines() if line.strip())
+        parts = self._SLOT.split(source)
+        self.literals = parts[0::2]
+        self.names = parts[1::2]
+
+    def render(self, **values) -> str:
+        """Fill every slot with its HTML-escaped value"""
+        out = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            out.append(html.escape(str(values[name])))
+            out.append(literal)
+        return "".join(out)
+
+
+_HEAD = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Ticket Verification - NFT Tickets</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: Arial, sans-serif; background: #0f172a; color: white; margin: 0; padding: 20px; }
+        .container { max-width: 600px; margin: 0 auto; }
+        .valid { background: linear-gradient(135deg, #10b981, #059669); padding: 20px; border-radius: 10px; }
+        .invalid { background: linear-gradient(135deg, #ef4444, #dc2626); padding: 20px; border-radius: 10px; }
+        .ticket-info { background: #1e293b; padding: 20px; border-radius: 10px; margin-top: 20px; }
+        .status { font-size: 24px; font-weight: bold; margin-bottom: 10px; }
+        .detail { margin: 10px 0; }
+        .label { color: #94a3b8; }
+    </style>
+</head>
+"""
+
+VALID_PAGE = Template(_HEAD + """
+<body>
+    <div class="container">
+        <div class="valid">
+            <div class="status">✅ Valid Ticket</div>
+            <p>This NFT ticket has been verified on the blockchain.</p>
+        </div>
+        <div class="ticket-info">
+            <h2>Ticket Details</h2>
+            <div class="detail"><span class="label">Token ID:</span> #{{ token_id }}</div>
+            <div class="detail"><span class="label">Event:</span> {{ event_name }}</div>
+            <div class="detail"><span class="label">Date:</span> {{ date }}</div>
+            <div class="detail"><span class="label">Venue:</span> {{ venue }}</div>
+            <div class="detail"><span class="label">Seat:</span> {{ seat }}</div>
+            <div class="detail"><span class="label">Status:</span> {{ status }}</div>
+            <div class="detail"><span class="label">Verified:</span> {{ verified_at }}</div>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+INVALID_PAGE = Template(_HEAD + """
+<body>
+    <div class="container">
+        <div class="invalid">
+            <div class="status">❌ Invalid Ticket</div>
+            <p>Token ID #{{ token_id }} was not found or is invalid.</p>
+            <p>Please check the token ID and try again.</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+
+def render_page(token_id: int, ticket: Optional[dict]) -> str:
+    """The verification page for a ticket row (None renders the invalid page)"""
+    if ticket is None:
+        return INVALID_PAGE.render(token_id=token_id)
+    return VALID_PAGE.render(
+        token_id=token_id,
+        event_name=ticket["event_name"],
+        date=ticket["date"],
+        venue=ticket["venue"],
+        seat=ticket["seat"],
+        status=ticket["status"].title(),
+        verified_at=datetime.utcnow().isoformat(timespec="seconds"),
+    )
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[Optional[str]] = ENCODINGS) -> Optional[str]:
+    """Best of the ``available`` encodings the client accepts, or None for identity"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class PageEntry:
+    """One rendered page in every encoding, with its ETag"""
+
+    __slots__ = ("status", "bodies", "etag", "expires_at")
+
+    def __init__(self, page: str, status: str, ttl: float, compress: bool = True):
+        # Verification outcome logged for each hit
+        self.status = status
+        identity = page.encode("utf-8")
+        self.bodies: Dict[Optional[str], bytes] = {None: identity}
+        if compress:
+            # Paid once per render; brotli's top qualities take milliseconds for a few bytes
+            self.bodies["gzip"] = gzip.compress(identity, VERIFY_PAGE_GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(identity, quality=VERIFY_PAGE_BROTLI_QUALITY)
+        self.etag = '"' + hashlib.sha1(identity).hexdigest()[:20] + '"'
+        self.expires_at = time.monotonic() + ttl
+
+
+class VerificationPageCache:
+    """LRU of rendered verification pages keyed by token id"""
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = VERIFY_PAGE_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = VERIFY_PAGE_CACHE_TTL if ttl is None else ttl
+        self._entries: "OrderedDict[int, PageEntry]" = OrderedDict()
+        # Bumped on every invalidation so renders that raced a change are discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._watch = GenerationWatch("tickets")
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _sync(self):
+        # Another worker changed tickets: its invalidations are not visible here
+        if self._watch.check():
+            self.clear()
+
+    def get(self, token_id: int) -> Optional[PageEntry]:
+        self._sync()
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(token_id)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[token_id]
+            self.misses += 1
+        return None
+
+    def store(self, token_id: int, ticket: Optional[dict], generation: int = None) -> PageEntry:
+        """Render and compress a page; cache it unless tickets changed since ``generation``"""
+        start = time.perf_counter()
+        # Without a cache, compressing every hit would cost more than it saves
+        entry = PageEntry(render_page(token_id, ticket), "valid" if ticket else "invalid", self.ttl,
+                          compress=self.max_entries > 0)
+        self.render_seconds += time.perf_counter() - start
+        self.renders += 1
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._entries[token_id] = entry
+                self._entries.move_to_end(token_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, token_ids: Iterable[int]):
+        """Drop pages whose ticket status or owner changed"""
+        with self._lock:
+            self._generation += 1
+            for token_id in token_ids:
+                self._entries.pop(token_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "renders": self.renders,
+            "render_avg_us": round(self.render_seconds / self.renders * 1e6, 1) if self.renders else 0.0,
+            "encodings": list(ENCODINGS),
+        }
+
+
+verification_pages = VerificationPageCache()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Benchmark: organizer analytics from rollup tables against on-demand aggregation
+
+Builds a temporary SQLite database with --orders orders, --tickets tickets
+and --scans verification log rows, builds the rollups with a repair pass
+and measures:
+
+- the all-events dashboard and one event's figures read from sales_totals /
+  scan_totals, against the same figures summed from orders and
+  verification_logs on every request
+- what keeping the rollups costs writers: purchases and scan log flushes
+  with and without the rollup upserts
+
+Then checks that the rollups agree with the raw tables, that the checker
+finds a corrupted rollup row and that --repair fixes it.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+EVENTS = 20
+SEAT_TYPES = ["general", "vip", "balcony"]
+
+
+def timed(label, seconds, extra=""):
+    print(f"   {label:<34} {seconds * 1000:9.3f} ms{extra}")
+
+
+def on_demand(conn, event_id=None):
+    """Dashboard figures summed from the raw tables, as without rollups"""
+    where, params = ("AND event_id = ?", (event_id,)) if event_id is not None else ("", ())
+    sold, revenue = defaultdict(int), defaultdict(int)
+    for row in conn.execute(f"""
+        SELECT event_id, SUM(quantity), SUM(total_price_gwei) FROM orders
+        WHERE status = 'confirmed' {where} GROUP BY event_id
+    """, params):
+        sold[row[0]], revenue[row[0]] = row[1], row[2]
+    scans = {row[0]: (row[1], row[2]) for row in conn.execute(f"""
+        SELECT COALESCE(t.event_id, 0) AS event_id,
+               SUM(CASE WHEN l.status = 'valid' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN l.status = 'valid' THEN 0 ELSE 1 END)
+        FROM verification_logs l LEFT JOIN tickets t ON t.token_id = l.token_id
+        {"WHERE t.event_id = ?" if event_id is not None else ""}
+        GROUP BY COALESCE(t.event_id, 0)
+    """, params)}
+    return sold, revenue, scans
+
+
+def from_rollups(repository, analytics, conn, event_id=None):
+    sales_rows, scan_rows = repository.analytics_rows(conn, analytics.totals_queries(event_id))
+    return analytics.dashboard(sales_rows, scan_rows)
+
+
+def average(fn, repeat):
+    """Mean seconds per call after one warm-up call, and the last result"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def seed(conn, args):
+    conn.executemany("""
+        INSERT INTO events (name, date, time, venue, location, price, price_gwei, capacity)
+        VALUES (?, '2024-05-01', '20:00', 'Hall', 'City', '0.05 ETH', 50000000, 100000000)
+    """, [(f"Event {n}",) for n in range(EVENTS)])
+    event_ids = [row[0] for row in conn.execute("SELECT id FROM events")]
+    statuses = ["confirmed"] * 8 + ["pending", "failed"]
+    conn.executemany("""
+        INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, total_price_gwei, status, created_at)
+        VALUES (?, ?, ?, ?, '', ?, ?, ?)
+    """, (
+        (f"0x{n:040x}", random.choice(event_ids), quantity, random.choice(SEAT_TYPES), quantity * 50000000,
+         random.choice(statuses), f"2024-04-{random.randint(1, 28):02d} {random.randint(0, 23):02d}:30:00")
+        for n in range(args.orders) for quantity in (random.randint(1, 6),)
+    ))
+    conn.executemany(
+        "INSERT INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, ?, ?, ?)",
+        ((token_id, random.choice(event_ids), f"0x{token_id:040x}", f"GA-{token_id}")
+         for token_id in range(100, 100 + args.tickets)),
+    )
+    conn.executemany("""
+        INSERT INTO verification_logs (token_id, verifier_address, status, verified_at) VALUES (?, NULL, ?, ?)
+    """, (
+        (random.randint(100, 100 + args.tickets * 11 // 10), random.choice(["valid", "valid", "valid", "invalid"]),
+         f"2024-05-01 {random.randint(17, 23):02d}:{random.randint(0, 59):02d}:00")
+        for _ in range(args.scans)
+    ))
+    conn.commit()
+    return event_ids
+
+
+def writes(repository, conn, event_ids, args):
+    """Seconds for --writes purchases and --writes / 500 scan flushes of 500"""
+    start = time.perf_counter()
+    for n in range(args.writes):
+        repository.insert_order(conn, f"0x{n:040x}", random.choice(event_ids), 2, random.choice(SEAT_TYPES), None)
+    purchases = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.writes // 500):
+        repository.write_verification_logs(conn, [
+            (random.randint(100, 100 + args.tickets), None, "valid", time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()))
+            for _ in range(500)
+        ])
+    return purchases, time.perf_counter() - start
+
+
+def run(args):
+    import analytics
+    import main
+    import repository
+
+    main.init_database()
+    with main.get_db() as conn:
+        event_ids = seed(conn, args)
+        start = time.perf_counter()
+        repository.check_analytics(conn, repair=True)
+        timed("rollup rebuild (repair)", time.perf_counter() - start)
+
+        print(f"\n{args.orders:,} orders, {args.tickets:,} tickets, {args.scans:,} scans over {EVENTS} events\n")
+        raw_time, raw = average(lambda: on_demand(conn), args.repeat)
+        timed("dashboard, summed on demand", raw_time)
+        rollup_time, dashboard = average(lambda: from_rollups(repository, analytics, conn), args.repeat)
+        timed("dashboard, from rollups", rollup_time, f"   x{raw_time / rollup_time:,.0f}")
+        event_raw_time, event_raw = average(lambda: on_demand(conn, event_ids[0]), args.repeat)
+        timed("one event, summed on demand", event_raw_time)
+        event_time, event_stats = average(lambda: from_rollups(repository, analytics, conn, event_ids[0]), args.repeat)
+        timed("one event, from rollups", event_time, f"   x{event_raw_time / event_time:,.0f}")
+
+        print()
+        # Alternate with and without the upserts, best of three each
+        maintain, with_rollups, without = repository.write_rollup, [], []
+        for _ in range(3):
+            with_rollups.append(writes(repository, conn, event_ids, args))
+            repository.write_rollup = lambda conn, rollup: None
+            try:
+                without.append(writes(repository, conn, event_ids, args))
+            finally:
+                repository.write_rollup = maintain
+        for n, label, count in ((0, "purchase", args.writes), (1, "scan flush of 500", args.writes // 500)):
+            rolled, plain = min(run[n] for run in with_rollups), min(run[n] for run in without)
+            timed(f"{label}, no rollups", plain / count)
+            timed(f"{label}, with rollups", rolled / count, f"   {(rolled / plain - 1) * 100:+.0f}%")
+
+        print("\nChecks")
+        # The un-rolled-up writes above are what an older worker leaves behind
+        stale = repository.check_analytics(conn)
+        repaired = repository.check_analytics(conn, repair=True)
+        consistent = repository.check_analytics(conn)
+        conn.execute("UPDATE scan_totals SET valid = valid + 1 WHERE event_id = ?", (event_ids[0],))
+        conn.commit()
+        corrupted = repository.check_analytics(conn)
+        repository.check_analytics(conn, repair=True)
+        sold, revenue, scans = raw
+        results = [
+            ("dashboard equals the on-demand sums", all(
+                stats["sold"] == sold.get(stats["event_id"], 0) and stats["revenue"] == revenue.get(stats["event_id"], 0)
+                and (stats["scans"]["valid"], stats["scans"]["invalid"]) == scans.get(stats["event_id"], (0, 0))
+                for stats in dashboard) and len(dashboard) == len(sold.keys() | scans.keys())),
+            ("one event equals the on-demand sums", event_stats[0]["sold"] == event_raw[0][event_ids[0]]),
+            ("writes with rollups keep them consistent", not stale["consistent"]
+             and all(m["table"] in ("sales_rollup", "sales_totals", "scan_rollup", "scan_totals")
+                     for m in stale["mismatches"]) and consistent["consistent"] and repaired["repaired"]),
+            ("checker finds a corrupted row", [(m["table"], m["key"]) for m in corrupted["mismatches"]]
+             == [("scan_totals", [event_ids[0]])]),
+            ("repair restores consistency", repository.check_analytics(conn)["consistent"]),
+        ]
+    for name, passed in results:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics rollup benchmark")
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--scans", type=int, default=500000)
+    parser.add_argument("--writes", type=int, default=5000, help="Purchases timed, and scans in flushes of 500")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each read, averaged")
+    args = parser.parse_args()
+
+    print("📊 Organizer analytics rollups")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        sys.path.insert(0, BACKEND_DIR)
+        ok = run(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmark: live availability feed against polling, by number of subscribers
+
+Starts the app on a temporary SQLite database and opens --subscribers
+Server-Sent Events streams at a time (default 1,000, 10,000 and 20,000).
+Nine in ten watch one event and the rest watch every event. Each stream is
+driven through the ASGI interface directly, as a server would, with no
+sockets, so the numbers are the app's own cost. For each count it measures:
+
+- Python heap per idle subscriber (tracemalloc), against the same harness
+  holding an idle connection to a bare ASGI app that does nothing
+- fan-out: a purchase storm on the watched event (--purchases at
+  --purchase-rate per second), then how long after the last purchase
+  every subscriber has seen the final sold count (latency, which
+  includes waiting for the next tick) and how far apart the first and
+  last subscriber got it (spread)
+- frames per subscriber and SQL reads by the feed over the storm
+
+Then the same storm with --pollers clients fetching /events/{id} once a
+second instead, as the frontend used to. Checks that every subscriber
+converges, that updates are coalesced to the configured rate, and that
+the feed's reads do not grow with the number of subscribers.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+EVENT_ID = 1
+SOLD = re.compile(rb'"event_id":%d,"capacity":\d+,"sold":(\d+)' % EVENT_ID)
+
+REQUEST = {"type": "http.request", "body": b"", "more_body": False}
+DISCONNECT = {"type": "http.disconnect"}
+
+
+def http_scope(path, port):
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), (b"accept", b"text/event-stream")],
+        "client": ("127.0.0.1", port), "server": ("bench", 80),
+    }
+
+
+class Subscriber:
+    """One open stream, as the server side of a connection sees it"""
+
+    __slots__ = ("gone", "requested", "frames", "sold", "updated_at")
+
+    def __init__(self, gone):
+        self.gone = gone
+        self.requested = False
+        self.frames = 0
+        self.sold = None
+        self.updated_at = None
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return REQUEST
+        await self.gone.wait()
+        return DISCONNECT
+
+    async def send(self, message):
+        body = message.get("body")
+        if body and not body.startswith(b":"):
+            self.frames += 1
+            sold = SOLD.findall(body)
+            if sold:
+                self.sold = int(sold[-1])
+                self.updated_at = time.perf_counter()
+
+
+async def idle_app(scope, receive, send):
+    """The least a held-open connection can cost: no routing, no feed"""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b'"event_id":%d,"capacity":0,"sold":0' % EVENT_ID,
+                "more_body": True})
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def open_streams(app, count):
+    """Open ``count`` streams; returns (subscribers, tasks, disconnect event) once all have a snapshot"""
+    gone = asyncio.Event()
+    subscribers = [Subscriber(gone) for _ in range(count)]
+    tasks = []
+    for n, subscriber in enumerate(subscribers):
+        path = "/events/availability/stream" if n % 10 == 9 else f"/events/{EVENT_ID}/availability/stream"
+        tasks.append(asyncio.create_task(app(http_scope(path, n), subscriber.receive, subscriber.send)))
+    while any(subscriber.sold is None for subscriber in subscribers):
+        await asyncio.sleep(0.01)
+    return subscribers, tasks, gone
+
+
+async def close_streams(tasks, gone):
+    gone.set()
+    await asyncio.gather(*tasks)
+
+
+async def heap_per_stream(app, count):
+    """Bytes of Python heap each open stream holds"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    _, tasks, gone = await open_streams(app, count)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    await close_streams(tasks, gone)
+    return held / count
+
+
+async def storm(client, main, args):
+    """Buy one seat at a time at --purchase-rate; returns when the last purchase returned"""
+    headers = {"Authorization": f"Bearer {main.create_jwt_token('0x' + '5' * 40)}"}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pending = []
+    for n in range(args.purchases):
+        await asyncio.sleep(max(0.0, start + n / args.purchase_rate - loop.time()))
+        pending.append(asyncio.create_task(client.post("/purchase", headers=headers, json={
+            "event_id": EVENT_ID, "quantity": 1, "seat_type": "general", "tx_hash": f"0x{n:064x}"})))
+    responses = await asyncio.gather(*pending)
+    assert all(response.status_code == 200 for response in responses), [r.text for r in responses][:3]
+    return loop.time()
+
+
+def select_events(metrics):
+    """Statements that read the events table so far"""
+    series = metrics.db_query_duration.values().get(("SELECT events",))
+    return sum(series[:-1]) if series else 0
+
+
+async def run(args):
+    import httpx
+
+    import main
+    import metrics
+    from availability import availability_feed
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"\n{args.purchases} purchases at {args.purchase_rate:g}/s, "
+                  f"feed at {1 / availability_feed.interval:g} updates/s\n")
+            print(f"   {'subscribers':>11} {'heap/stream':>12} {'(bare)':>9} {'latency':>9} {'spread':>8} "
+                  f"{'frames/sub':>11} {'feed reads':>11}")
+            for count in args.subscribers:
+                feed_heap = await heap_per_stream(main.app, count)
+                bare_heap = await heap_per_stream(idle_app, count)
+
+                subscribers, tasks, gone = await open_streams(main.app, count)
+                reads = availability_feed.reads
+                started = time.perf_counter()
+                await storm(client, main, args)
+                last_purchase = time.perf_counter()
+                final = (await client.get(f"/events/{EVENT_ID}")).json()["sold"]
+                while any(subscriber.sold != final for subscriber in subscribers):
+                    if time.perf_counter() - last_purchase > 10:
+                        break
+                    await asyncio.sleep(0.005)
+                converged = all(subscriber.sold == final for subscriber in subscribers)
+                delivered = [subscriber.updated_at for subscriber in subscribers]
+                latency, spread = max(delivered) - last_purchase, max(delivered) - min(delivered)
+                frames = max(subscriber.frames for subscriber in subscribers) - 1  # minus the snapshot
+                feed_reads = availability_feed.reads - reads
+                ticks = (time.perf_counter() - started) / availability_feed.interval
+                await close_streams(tasks, gone)
+                print(f"   {count:>11,} {feed_heap / 1024:>8.1f} KiB {bare_heap / 1024:>5.1f} KiB "
+                      f"{latency * 1000:>6.0f} ms {spread * 1000:>5.0f} ms {frames:>11} {feed_reads:>11}")
+                results.append((count, feed_heap, converged, frames, feed_reads, ticks, latency))
+
+            # The same storm with every browser polling instead
+            remaining = args.pollers
+            stop = asyncio.Event()
+            polls = 0
+
+            async def poller(offset):
+                nonlocal polls
+                await asyncio.sleep(offset)
+                while not stop.is_set():
+                    await client.get(f"/events/{EVENT_ID}")
+                    polls += 1
+                    await asyncio.sleep(1)
+
+            queries = select_events(metrics)
+            pollers = [asyncio.create_task(poller(n / remaining)) for n in range(remaining)]
+            started = time.perf_counter()
+            await storm(client, main, args)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await asyncio.gather(*pollers)
+            poll_reads = select_events(metrics) - queries
+            print(f"\n   {args.pollers:,} pollers instead: {polls / elapsed:,.0f} requests/s, "
+                  f"{poll_reads} event reads over the storm")
+            idle = availability_feed.stats()
+    finally:
+        await main.shutdown_event()
+
+    print("\nChecks")
+    checks = [
+        ("every subscriber saw the final sold count", all(result[2] for result in results)),
+        ("updates coalesced to the feed's rate", all(frames <= ticks + 1 for _, _, _, frames, _, ticks, _ in results)),
+        ("feed reads do not grow with subscribers", all(reads <= ticks + 2 for _, _, _, _, reads, ticks, _ in results)),
+        ("every subscriber updated within a second of the last purchase", all(result[6] < 1 for result in results)),
+        (f"idle stream holds under {args.max_heap_kib} KiB of heap",
+         all(heap < args.max_heap_kib * 1024 for _, heap, *_ in results)),
+        ("closed streams leave nothing behind", idle["subscribers"] == 0 and idle["channels"] == 0),
+    ]
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in checks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live availability feed benchmark")
+    parser.add_argument("--subscribers", type=lambda text: [int(part) for part in text.split(",")],
+                        default=[1000, 10000, 20000], help="Comma-separated subscriber counts")
+    parser.add_argument("--purchases", type=int, default=200)
+    parser.add_argument("--purchase-rate", type=float, default=100, help="Purchases per second")
+    parser.add_argument("--pollers", type=int, default=1000, help="Clients polling once a second instead")
+    parser.add_argument("--max-heap-kib", type=float, default=16, help="Heap budget per idle stream")
+    args = parser.parse_args()
+
+    print("📡 Live availability feed")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        # No hold expiry during the run
+        os.environ.setdefault("INVENTORY_HOLD_TTL", "0")
+        sys.path.insert(0, BACKEND_DIR)
+        ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
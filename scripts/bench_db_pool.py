@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pooled WAL connections vs. a fresh sqlite3.connect per request
+
+Replays the /verify/{token_id} data access pattern (JOIN lookup, log insert,
+verified_at update, commit) and a read-only /events pattern against a
+temporary database, once with the legacy per-request connection and once
+with the backend's connection pool.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import db  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE events (id INTEGER PRIMARY KEY, name TEXT, date TEXT, venue TEXT, features TEXT, artists TEXT);
+CREATE TABLE tickets (token_id INTEGER PRIMARY KEY, event_id INTEGER, owner_address TEXT, seat TEXT,
+                      status TEXT DEFAULT 'active', verified_at TIMESTAMP);
+CREATE TABLE verification_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, token_id INTEGER, status TEXT,
+                                verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+"""
+
+VERIFY_SELECT = """
+    SELECT t.*, e.name as event_name, e.date, e.venue
+    FROM tickets t JOIN events e ON t.event_id = e.id
+    WHERE t.token_id = ?
+"""
+
+
+def seed(path, tickets):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO events (id, name, date, venue) VALUES (?, ?, ?, ?)",
+        [(i, f"Event {i}", "2024-03-15", "Cyber Arena") for i in range(1, 11)],
+    )
+    conn.executemany(
+        "INSERT INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, ?, ?, ?)",
+        [(i, i % 10 + 1, f"0x{i:040x}", f"GA-{i}") for i in range(1, tickets + 1)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_connection(path):
+    """The original get_db(): new connection, default journal, closed afterwards"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def verify_op(conn, token_id):
+    cursor = conn.cursor()
+    cursor.execute(VERIFY_SELECT, (token_id,))
+    cursor.fetchone()
+    cursor.execute("INSERT INTO verification_logs (token_id, status) VALUES (?, 'valid')", (token_id,))
+    cursor.execute("UPDATE tickets SET verified_at = CURRENT_TIMESTAMP WHERE token_id = ?", (token_id,))
+    conn.commit()
+
+
+def read_op(conn, token_id):
+    cursor = conn.cursor()
+    cursor.execute(VERIFY_SELECT, (token_id,))
+    cursor.fetchone()
+
+
+def run(mode, op, path, ops, threads, tickets):
+    pool = db.ConnectionPool(path, size=threads) if mode == "pooled" else None
+    per_thread = ops // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            token_id = (offset * per_thread + i) % tickets + 1
+            if pool is None:
+                conn = legacy_connection(path)
+                try:
+                    op(conn, token_id)
+                finally:
+                    conn.close()
+            else:
+                with pool.connection() as conn:
+                    op(conn, token_id)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    if pool is not None:
+        pool.close()
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--tickets", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("📊 SQLite connection benchmark")
+    print("=" * 50)
+    print(f"ops={args.ops} threads={args.threads} tickets={args.tickets}")
+
+    for label, op in (("verify (read + write)", verify_op), ("lookup (read only)", read_op)):
+        results = {}
+        for mode in ("legacy", "pooled"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.db")
+                seed(path, args.tickets)
+                results[mode] = run(mode, op, path, args.ops, args.threads, args.tickets)
+        speedup = results["pooled"] / results["legacy"]
+        print(f"\n{label}")
+        print(f"   legacy per-request connect: {results['legacy']:>10,.0f} ops/s")
+        print(f"   pooled WAL connections:     {results['pooled']:>10,.0f} ops/s  ({speedup:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
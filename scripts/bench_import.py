@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk import of tickets and orders
+
+Writes --tickets tickets as CSV and NDJSON and --orders orders as NDJSON
+into a temporary directory, then loads them into a fresh SQLite database:
+
+- row by row (the same validated rows, but one cursor.execute per ticket
+  and per ticket_changes row into indexed tables, in a single
+  transaction), on --baseline-rows
+- bulk_import from CSV and NDJSON into an empty tickets table, where the
+  indexes are dropped and rebuilt once
+- the same CSV into a table that already has a row, so the indexes are
+  maintained per row
+- orders, which also update the analytics rollups
+
+Then checks row and ticket_changes counts, that every index is back, that
+a bad last row leaves nothing behind, that the rollups match the imported
+orders, and that the parser's peak heap (tracemalloc) does not grow with
+the file.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+FIRST_TOKEN = 1000
+SEAT_TYPES = ["general", "vip", "balcony"]
+
+
+def timed(label, rows, seconds, extra=""):
+    print(f"   {label:<40} {seconds:8.2f} s {rows / seconds:>12,.0f} rows/s{extra}")
+
+
+def write_files(tmp, args):
+    paths = {name: os.path.join(tmp, name) for name in ("tickets.csv", "tickets.ndjson", "orders.ndjson")}
+    tickets = [
+        (token_id, 1 + token_id % 3, f"0x{token_id % 40000:040x}", f"S{token_id % 200}-{token_id}")
+        for token_id in range(FIRST_TOKEN, FIRST_TOKEN + args.tickets)
+    ]
+    with open(paths["tickets.csv"], "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(["token_id", "event_id", "owner_address", "seat"])
+        writer.writerows(tickets)
+    with open(paths["tickets.ndjson"], "w") as out:
+        keys = ("token_id", "event_id", "owner_address", "seat")
+        out.writelines(json.dumps(dict(zip(keys, ticket))) + "\n" for ticket in tickets)
+    del tickets
+    with open(paths["orders.ndjson"], "w") as out:
+        out.writelines(json.dumps({
+            "user_address": f"0x{n % 40000:040x}", "event_id": 1 + n % 3, "quantity": 1 + n % 4,
+            "seat_type": SEAT_TYPES[n % 3], "total_price_gwei": (1 + n % 4) * 50000000,
+            "status": "failed" if n % 10 == 0 else "confirmed",
+            "created_at": f"2024-03-{1 + n % 28:02d} {n % 24:02d}:{n % 60:02d}:00",
+        }) + "\n" for n in range(args.orders))
+    return paths
+
+
+def row_by_row(bulk_import, conn, path, limit):
+    """The old way: the same validated rows, one ticket and one change execute per row"""
+    columns = bulk_import.import_columns("tickets")
+    insert = f"INSERT INTO tickets ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    with open(path, newline="") as lines:
+        for rows in bulk_import.read_chunks("tickets", itertools.islice(lines, limit + 1), "csv", 1):
+            cursor.execute(insert, rows[0])
+            cursor.execute("INSERT INTO ticket_changes (event_id, token_id, status) VALUES (?, ?, ?)",
+                           (rows[0][1], rows[0][0], rows[0][4]))
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def clear(conn):
+    conn.execute("DELETE FROM tickets")
+    conn.execute("DELETE FROM ticket_changes")
+    conn.commit()
+
+
+def peak_heap(bulk_import, path, rows):
+    """Peak Python heap while parsing the first ``rows`` lines of a CSV"""
+    with open(path, newline="") as lines:
+        tracemalloc.start()
+        for _ in bulk_import.read_chunks("tickets", itertools.islice(lines, rows + 1), "csv"):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+def run(args, tmp):
+    import bulk_import
+    import main
+    import repository
+
+    main.init_database()
+    main.seed_database()
+    paths = write_files(tmp, args)
+    columns = bulk_import.import_columns("tickets")
+
+    def load(conn, table, name, fmt):
+        with open(paths[name], newline="") as lines:
+            start = time.perf_counter()
+            rows = repository.import_rows(conn, table, bulk_import.import_columns(table),
+                                          bulk_import.read_chunks(table, lines, fmt, args.chunk_rows))
+        return rows, time.perf_counter() - start
+
+    with main.get_db() as conn:
+        indexes = sorted(row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tickets'"))
+        print(f"\n{args.tickets:,} tickets, {args.orders:,} orders\n")
+
+        baseline = row_by_row(bulk_import, conn, paths["tickets.csv"], args.baseline_rows)
+        timed(f"row by row ({args.baseline_rows:,} rows)", args.baseline_rows, baseline)
+        clear(conn)
+
+        csv_rows, csv_time = load(conn, "tickets", "tickets.csv", "csv")
+        speedup = (baseline / args.baseline_rows) / (csv_time / csv_rows)
+        timed("bulk CSV, empty table", csv_rows, csv_time, f"   x{speedup:.1f}")
+        clear(conn)
+        ndjson_rows, ndjson_time = load(conn, "tickets", "tickets.ndjson", "ndjson")
+        timed("bulk NDJSON, empty table", ndjson_rows, ndjson_time)
+        changes = conn.execute("SELECT COUNT(*) FROM ticket_changes").fetchone()[0]
+        restored = sorted(row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tickets'"))
+        clear(conn)
+        conn.execute("INSERT INTO tickets (token_id, event_id, owner_address, seat) VALUES (1, 1, ?, 'A-1')",
+                     ("0x" + "0" * 40,))
+        conn.commit()
+        kept_rows, kept_time = load(conn, "tickets", "tickets.csv", "csv")
+        timed("bulk CSV, indexes maintained", kept_rows, kept_time)
+        order_rows, order_time = load(conn, "orders", "orders.ndjson", "ndjson")
+        timed("bulk NDJSON orders, with rollups", order_rows, order_time)
+
+        tickets_before = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+        bad = os.path.join(tmp, "bad.csv")
+        with open(bad, "w") as out:
+            out.write("token_id,event_id,owner_address,seat\n")
+            out.writelines(f"{n},1,0x{n:040x},B-{n}\n" for n in range(10 ** 8, 10 ** 8 + 1000))
+            out.write("1,1,not-an-address,B\n")
+        try:
+            with open(bad, newline="") as lines:
+                repository.import_rows(conn, "tickets", columns, bulk_import.read_chunks("tickets", lines, "csv"))
+            rejected = False
+        except bulk_import.InvalidRow as exc:
+            rejected = str(exc).startswith("line 1002:")
+        untouched = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0] == tickets_before
+        rollups = repository.check_analytics(conn)
+
+    small, large = peak_heap(bulk_import, paths["tickets.csv"], args.tickets // 10), \
+        peak_heap(bulk_import, paths["tickets.csv"], args.tickets)
+    print(f"\n   parser peak heap: {small / 2 ** 20:.1f} MiB for {args.tickets // 10:,} rows, "
+          f"{large / 2 ** 20:.1f} MiB for {args.tickets:,}")
+
+    print("\nChecks")
+    results = [
+        ("every row imported, CSV and NDJSON", csv_rows == ndjson_rows == kept_rows == args.tickets
+         and order_rows == args.orders),
+        ("imported tickets recorded in ticket_changes", changes == args.tickets),
+        ("deferred indexes rebuilt", restored == indexes),
+        ("bad last row rejects the whole file", rejected and untouched),
+        ("rollups match the imported orders", rollups["consistent"]),
+        ("parser memory flat as the file grows", large < 1.5 * small),
+        ("1M-row scale: bulk CSV import in seconds", csv_time / csv_rows * 1_000_000 < 60),
+    ]
+    for name, passed in results:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import benchmark")
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--baseline-rows", type=int, default=100000, help="Rows loaded the old way")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Default: IMPORT_CHUNK_ROWS")
+    args = parser.parse_args()
+
+    print("📥 Bulk import")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        # Rebuilding an index over 1M rows is expected to be slow
+        os.environ.setdefault("DB_SLOW_QUERY_MS", "60000")
+        sys.path.insert(0, BACKEND_DIR)
+        ok = run(args, tmp)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
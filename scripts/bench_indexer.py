@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Blockchain indexer check and ingest benchmark
+
+1. Replays scripts/fixtures/event_ticket_logs.json (recorded EventTicket
+   logs) and checks the resulting tickets, orders and checkpoint.
+2. Starts a stand-in JSON-RPC node (eth_blockNumber / eth_getLogs) serving
+   synthetic TicketMinted/Transfer/TicketUsed logs and measures end-to-end
+   ingest throughput in logs/second.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "..", "backend"))
+
+FIXTURE = os.path.join(SCRIPTS_DIR, "fixtures", "event_ticket_logs.json")
+
+
+def word(n):
+    return "0x" + format(n, "064x")
+
+
+def address_topic(address):
+    return "0x" + "0" * 24 + address[2:]
+
+
+def string_data(text):
+    raw = text.encode()
+    return "0x" + format(32, "064x") + format(len(raw), "064x") + (raw + b"\0" * (-len(raw) % 32)).hex()
+
+
+def synthetic_logs(indexer, count, blocks):
+    """TicketMinted logs with the usual mint Transfer, plus some resales and entries"""
+    logs, token_id = [], 0
+    per_block = max(count // blocks, 1)
+    while len(logs) < count:
+        token_id += 1
+        block = 1 + (token_id - 1) // per_block
+        owner = f"0x{random.getrandbits(160):040x}"
+        tx = "0x" + format(token_id, "064x")
+        base = {"blockNumber": hex(block), "transactionHash": tx, "data": "0x"}
+        logs.append({**base, "logIndex": hex(0), "topics": [
+            indexer.TRANSFER, address_topic(indexer.ZERO_ADDRESS), address_topic(owner), word(token_id)]})
+        logs.append({**base, "logIndex": hex(1), "data": string_data(f"GA-{token_id}"), "topics": [
+            indexer.TICKET_MINTED, word(token_id), address_topic(owner), word(token_id % 3 + 1)]})
+        if token_id % 10 == 0:
+            logs.append({**base, "logIndex": hex(2), "topics": [indexer.TICKET_USED, word(token_id), address_topic(owner)]})
+    return logs[:count], block
+
+
+def start_rpc_node(logs, head):
+    """Serve eth_blockNumber and eth_getLogs over HTTP from memory"""
+    by_block = {}
+    for log in logs:
+        by_block.setdefault(int(log["blockNumber"], 16), []).append(log)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if request["method"] == "eth_blockNumber":
+                result = hex(head)
+            else:
+                params = request["params"][0]
+                start, end = int(params["fromBlock"], 16), int(params["toBlock"], 16)
+                result = [log for block in range(start, end + 1) for log in by_block.get(block, ())]
+            body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check_fixture(app_main, indexer, repository):
+    with app_main.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, tx_hash) VALUES (?, ?, ?, 'general', '0.050 ETH', ?)",
+            [
+                ("0x70997970c51812dc3a010c7d01b50e0d17dc79c8", 1, 2, "0x" + "a1" * 32),
+                ("0x3c44cdddb6a900fa2b585dd299e03d12fa4293bc", 2, 1, "0x" + "b2" * 32),
+            ],
+        )
+        conn.commit()
+
+    ingested = asyncio.run(
+        indexer.Indexer(indexer.FixtureSource(FIXTURE), confirmations=2, batch_blocks=3, start_block=100).run_once()
+    )
+
+    with app_main.get_db() as conn:
+        tickets = {row["token_id"]: dict(row) for row in conn.execute("SELECT * FROM tickets")}
+        orders = [dict(row) for row in conn.execute("SELECT * FROM orders ORDER BY id")]
+        checkpoint = repository.load_checkpoint(conn, indexer.CHECKPOINT_NAME, -1)
+
+    checks = [
+        ("9 confirmed logs ingested", ingested == 9),
+        ("3 tickets minted", sorted(tickets) == [1, 2, 3]),
+        ("seat decoded", tickets.get(3, {}).get("seat") == "Gallery Pass 17"),
+        ("resale updates owner", tickets.get(2, {}).get("owner_address") == "0x3c44cdddb6a900fa2b585dd299e03d12fa4293bc"),
+        ("TicketUsed marks used", tickets.get(1, {}).get("status") == "used"),
+        ("TicketVerified stamps verified_at", tickets.get(1, {}).get("verified_at") is not None),
+        ("unconfirmed block skipped", tickets.get(3, {}).get("status") == "active"),
+        ("orders confirmed by tx_hash", [o["status"] for o in orders] == ["confirmed", "confirmed"]),
+        ("token ids recorded", json.loads(orders[0]["token_ids"] or "[]") == [1, 2]),
+        ("checkpoint at safe head", checkpoint == 108),
+    ]
+    print("Fixture replay")
+    failed = False
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+        failed |= not passed
+    return failed
+
+
+def bench_rpc(app_main, indexer, repository, count, batch_blocks):
+    logs, head = synthetic_logs(indexer, count, blocks=max(count // 50, 1))
+    server = start_rpc_node(logs, head)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with app_main.get_db() as conn:
+        conn.execute("DELETE FROM indexer_state")
+        conn.commit()
+
+    source = indexer.JsonRpcSource(url, "0x5fbdb2315678afecb367f032d93f642f64180aa3")
+    start = time.perf_counter()
+    ingested = asyncio.run(indexer.Indexer(source, confirmations=0, batch_blocks=batch_blocks, start_block=1).run_once())
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"\nStand-in JSON-RPC node, {ingested:,} logs over {head:,} blocks (batch {batch_blocks} blocks)")
+    print(f"   {ingested / elapsed:,.0f} logs/s end to end ({elapsed:.2f} s)")
+
+    apply_logs, _ = synthetic_logs(indexer, count, blocks=1)
+    with app_main.get_db() as conn:
+        start = time.perf_counter()
+        repository.apply_chain_changes(conn, indexer.decode_logs(apply_logs))
+        elapsed = time.perf_counter() - start
+    print(f"   {len(apply_logs) / elapsed:,.0f} logs/s database apply only")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexer fixture check and ingest benchmark")
+    parser.add_argument("--logs", type=int, default=100000)
+    parser.add_argument("--batch-blocks", type=int, default=500)
+    args = parser.parse_args()
+
+    print("📊 Blockchain indexer")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "indexer.db")
+        import db
+        import indexer
+        import main as app_main
+        import repository
+
+        app_main.init_database()
+        app_main.seed_database()
+
+        failed = check_fixture(app_main, indexer, repository)
+        bench_rpc(app_main, indexer, repository, args.logs, args.batch_blocks)
+        db.close_pool()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
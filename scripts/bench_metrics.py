@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the request and SQL instrumentation behind /metrics
+
+Starts the app on a temporary SQLite database and measures:
+
+- requests/s through the in-process app (ASGI, no network) with
+  MetricsMiddleware recording and switched off, alternating runs
+- microseconds per SQL statement on a plain sqlite3 connection against an
+  InstrumentedConnection, for a point read and a 100-row read
+- how long a /metrics scrape takes to render
+
+Then checks that the exposition parses, that the request and row counts
+add up and that nothing is recorded while metrics are off.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+SAMPLE = re.compile(r'^([a-zA-Z_:][\w:]*)(\{(?:[a-zA-Z_]\w*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+def timed(label, seconds, extra=""):
+    print(f"   {label:<38} {seconds * 1e6:9.2f} µs{extra}")
+
+
+async def requests_per_second(client, paths, total, concurrency):
+    remaining = iter(range(total))
+
+    async def worker():
+        for n in remaining:
+            response = await client.get(paths[n % len(paths)])
+            assert response.status_code == 200, response.status_code
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+def per_statement(connections, sql, params, fetch, repeat):
+    """Mean seconds per execute + fetch on each connection, best of three alternating runs"""
+    best = [float("inf")] * len(connections)
+    for _ in range(3):
+        for n, conn in enumerate(connections):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fetch(conn.execute(sql, params))
+            best[n] = min(best[n], (time.perf_counter() - start) / repeat)
+    return best
+
+
+def parses(text):
+    """Every sample line is well formed and every histogram is cumulative"""
+    buckets = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            continue
+        match = SAMPLE.match(line)
+        if match is None:
+            return False
+        float(match.group(3))
+        name, labels = match.group(1), match.group(2) or ""
+        if name.endswith("_bucket"):
+            series = (name[:-7], re.sub(r',?le="[^"]*"', "", labels))
+            buckets.setdefault(series, []).append(float(match.group(3)))
+        elif name.endswith("_count") and (name[:-6], labels) in buckets:
+            counts = buckets[name[:-6], labels]
+            if counts != sorted(counts) or counts[-1] != float(match.group(3)):
+                return False
+    return bool(buckets)
+
+
+async def run(args):
+    import httpx
+
+    import main
+    import metrics
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            paths = ["/events/1", "/events/2", "/events/3", "/events?limit=2"]
+            # Warm the catalog cache so the runs measure the request path
+            await requests_per_second(client, paths, 200, args.concurrency)
+            route = ("GET", "/events/{event_id}")
+            before = metrics.http_responses.values().get(route + (200,), 0)
+
+            print(f"\n{args.requests:,} requests per run, {args.concurrency} concurrent\n")
+            recorded, plain = [], []
+            for _ in range(3):
+                recorded.append(await requests_per_second(client, paths, args.requests, args.concurrency))
+                metrics.METRICS_ENABLED = False
+                try:
+                    plain.append(await requests_per_second(client, paths, args.requests, args.concurrency))
+                finally:
+                    metrics.METRICS_ENABLED = True
+            counted = metrics.http_responses.values().get(route + (200,), 0) - before
+            print(f"   {'requests/s, metrics off':<38} {max(plain):9,.0f}")
+            print(f"   {'requests/s, metrics on':<38} {max(recorded):9,.0f}"
+                  f"   {(max(recorded) / max(plain) - 1) * 100:+.1f}%")
+            timed("middleware per request", 1 / max(recorded) - 1 / max(plain))
+
+            print()
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "statements.db")
+                setup = sqlite3.connect(path)
+                setup.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+                setup.executemany("INSERT INTO items (name) VALUES (?)", ((f"item {n}",) for n in range(10000)))
+                setup.commit()
+                setup.close()
+                bare = sqlite3.connect(path)
+                instrumented = sqlite3.connect(path, factory=metrics.InstrumentedConnection)
+                cases = [
+                    ("point read", "SELECT * FROM items WHERE id = ?", (42,), lambda cursor: cursor.fetchone()),
+                    ("100-row read", "SELECT * FROM items WHERE id > ? LIMIT 100", (500,),
+                     lambda cursor: cursor.fetchall()),
+                ]
+                for label, sql, params, fetch in cases:
+                    base, cost = per_statement((bare, instrumented), sql, params, fetch, args.statements)
+                    timed(f"{label}, plain connection", base)
+                    timed(f"{label}, instrumented", cost, f"   {(cost / base - 1) * 100:+.0f}%")
+                rows_before = metrics.db_rows.values().get(("SELECT items",), 0)
+                instrumented.execute("SELECT * FROM items WHERE id > ? LIMIT 100", (500,)).fetchall()
+                rows_counted = metrics.db_rows.values().get(("SELECT items",), 0) - rows_before
+                bare.close()
+                instrumented.close()
+
+            print()
+            start = time.perf_counter()
+            exposition = (await client.get("/metrics")).text
+            scrape = time.perf_counter() - start
+            series = sum(not line.startswith("#") for line in exposition.splitlines())
+            timed(f"/metrics scrape ({series} samples)", scrape)
+    finally:
+        await main.shutdown_event()
+
+    print("\nChecks")
+    results = [
+        ("exposition parses, histograms cumulative", parses(exposition)),
+        ("every request counted while on, none while off", counted == 3 * sum(
+            paths[n % len(paths)].startswith("/events/") for n in range(args.requests))),
+        ("rows counted per statement", rows_counted == 100),
+    ]
+    for name, passed in results:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics instrumentation benchmark")
+    parser.add_argument("--requests", type=int, default=4000, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--statements", type=int, default=20000, help="Statements per run")
+    args = parser.parse_args()
+
+    print("📈 Metrics instrumentation overhead")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        sys.path.insert(0, BACKEND_DIR)
+        ok = asyncio.run(run(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: issuing login nonces, SQLite upsert vs. the in-memory store
+
+The previous /auth/nonce wrote ``INSERT OR REPLACE INTO users`` and
+committed on every call. This compares that against NonceStore.issue from
+several threads, then checks expiry, single use, rate limiting, and that
+requests from someone else cannot invalidate a wallet's nonce, on the
+in-memory store and on the shared key/value store workers use.
+"""
+
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def legacy_issue(address):
+    import main
+
+    with main.get_db() as conn:
+        conn.execute("INSERT OR REPLACE INTO users (address, nonce) VALUES (?, ?)", (address, secrets.token_hex(16)))
+        conn.commit()
+
+
+def timed(fn, addresses, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fn, addresses))
+    return time.perf_counter() - start
+
+
+def check_semantics(nonce_store, shared_state, path):
+    store = nonce_store.NonceStore(ttl=10, rate_limit=2, rate_window=60, persist_interval=0)
+    address = "0x" + "11" * 20
+    nonce = store.issue(address, "10.0.0.1", now=0)
+    checks = [("outstanding nonce returned to any client", store.issue(address, "10.0.0.2", now=0.5) == nonce)]
+    checks.append(("take with another nonce leaves it", store.take(address, "00" * 16, now=1) is None))
+    checks.append(("take returns the issued nonce", store.take(address, nonce, now=1) == nonce))
+    checks.append(("second take fails (single use)", store.take(address, now=1) is None))
+    store.issue(address, "10.0.0.1", now=2)
+    checks.append(("expired nonce rejected", store.take(address, now=13) is None))
+    try:
+        store.issue(address, "10.0.0.1", now=14)
+        limited = False
+    except nonce_store.RateLimited:
+        limited = True
+    checks.append(("third nonce in the window rate limited", limited))
+    checks.append(("other clients not limited by it", bool(store.issue(address, "10.0.0.2", now=14))))
+    checks.append(("new window allowed", bool(store.issue(address, "10.0.0.1", now=70))))
+    full = nonce_store.NonceStore(shards=1, max_entries=1, persist_interval=0)
+    full.issue(address, now=0)
+    try:
+        full.issue("0x" + "22" * 20, now=1)
+        turned_away = False
+    except nonce_store.StoreFull as exc:
+        turned_away = 0 < exc.retry_after <= full.ttl
+    checks.append(("full store turns new addresses away", turned_away))
+
+    shared = nonce_store.SharedNonceStore(state=shared_state.LocalSharedState(path), rate_limit=2)
+    nonce = shared.issue(address, "10.0.0.1")
+    checks.append(("shared: outstanding nonce returned", shared.issue(address, "10.0.0.2") == nonce))
+    checks.append(("shared: take with another nonce leaves it", shared.take(address, "00" * 16) is None
+                   and shared.peek(address) == nonce))
+    checks.append(("shared: take returns the issued nonce once", shared.take(address, nonce) == nonce
+                   and shared.take(address, nonce) is None))
+
+    print("Semantics")
+    failed = False
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+        failed |= not passed
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nonce store benchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    print("📊 Login nonce issuing")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        import db
+        import main as app_main
+        import nonce_store
+        import repository
+        import shared_state
+
+        app_main.init_database()
+        failed = check_semantics(nonce_store, shared_state, os.path.join(tmp, "bench.state"))
+
+        addresses = [f"0x{n:040x}" for n in range(args.requests)]
+        print(f"\n{args.requests:,} nonce requests, {args.threads} threads")
+        elapsed = timed(legacy_issue, addresses, args.threads)
+        print(f"   {'INSERT OR REPLACE + commit (previous)':<40} {args.requests / elapsed:>10,.0f} req/s")
+
+        store = nonce_store.NonceStore(max_entries=args.requests * 2)
+        elapsed = timed(store.issue, addresses, args.threads)
+        print(f"   {'in-memory NonceStore.issue':<40} {args.requests / elapsed:>10,.0f} req/s")
+
+        start = time.perf_counter()
+        upserts, deletes = store._collect_changes()
+        with app_main.get_db() as conn:
+            repository.write_nonces(conn, upserts, deletes, time.time())
+        print(f"   {'one batched persist of all of them':<40} {(time.perf_counter() - start) * 1000:>10,.1f} ms")
+        db.close_pool()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
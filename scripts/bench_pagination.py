@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: paginated/projected list endpoints vs. the old unbounded lists
+
+Seeds one whale wallet with N orders and N tickets, then compares response
+size and latency of the previous behaviour (every row, every column,
+encoded in one response) against the first keyset page, a projected page
+(fields=...), and walking every page with the cursor.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+WALLET = "0x742d35cc6634c0532925a3b8d4c9db96590b5b8c"
+
+LEGACY_ORDERS_SQL = """
+    SELECT o.*, e.name as event_name, e.date, e.venue
+    FROM orders o JOIN events e ON o.event_id = e.id
+    WHERE o.user_address = ?
+    ORDER BY o.created_at DESC
+"""
+LEGACY_TICKETS_SQL = """
+    SELECT t.*, e.name as event_name, e.date, e.venue, e.image_url, e.price
+    FROM tickets t JOIN events e ON t.event_id = e.id
+    WHERE t.owner_address = ?
+    ORDER BY e.date ASC
+"""
+
+
+def legacy_ticket(row):
+    """The old get_user_tickets re-keyed every row like this"""
+    return {
+        "id": row["token_id"], "tokenId": row["token_id"], "eventName": row["event_name"],
+        "date": row["date"], "venue": row["venue"], "seat": row["seat"], "price": row["price"],
+        "image": row["image_url"], "status": row["status"], "purchaseDate": row["created_at"],
+    }
+
+
+def report(label, elapsed, size, pages=1):
+    print(f"   {label:<48} {elapsed * 1000:9.2f} ms   {size / 1024:10.1f} KiB   {pages:>4} request(s)")
+
+
+async def bench(args):
+    import httpx
+
+    import db
+    import main
+
+    main.init_database()
+    main.seed_database()
+    with main.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, tx_hash, created_at) "
+            "VALUES (?, ?, 1, 'general', '0.050 ETH', ?, datetime('2024-01-01', ?))",
+            ((WALLET, n % 3 + 1, f"0x{n:064x}", f"+{n} minutes") for n in range(args.rows)),
+        )
+        conn.executemany(
+            "INSERT INTO tickets (token_id, event_id, owner_address, seat, metadata_uri) VALUES (?, ?, ?, ?, ?)",
+            ((n, n % 3 + 1, WALLET, f"Section {n // 500} Seat {n % 500}", f"ipfs://Qm{n:044d}")
+             for n in range(1, args.rows + 1)),
+        )
+        conn.commit()
+
+    headers = {"Authorization": f"Bearer {main.create_jwt_token(WALLET)}"}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for path, key, legacy_sql, legacy_row, projection in (
+            ("/orders", "orders", LEGACY_ORDERS_SQL, dict, "id,status,event_name,date"),
+            ("/tickets", "tickets", LEGACY_TICKETS_SQL, legacy_ticket, "tokenId,eventName,date,seat"),
+        ):
+            print(f"\n{path} ({args.rows:,} rows for one wallet)")
+
+            start = time.perf_counter()
+            with main.get_db() as conn:
+                rows = conn.execute(legacy_sql, (WALLET,)).fetchall()
+            body = json.dumps({key: [legacy_row(row) for row in rows]}).encode()
+            report("unbounded list (previous)", time.perf_counter() - start, len(body))
+
+            start = time.perf_counter()
+            response = await client.get(path, params={"limit": args.limit})
+            report(f"first page (limit={args.limit})", time.perf_counter() - start, len(response.content))
+
+            start = time.perf_counter()
+            response = await client.get(path, params={"limit": args.limit, "fields": projection})
+            report(f"first page, fields={projection}", time.perf_counter() - start, len(response.content))
+
+            start = time.perf_counter()
+            total, pages, cursor = 0, 0, None
+            while True:
+                params = {"limit": 500, "fields": projection}
+                if cursor:
+                    params["cursor"] = cursor
+                page = (await client.get(path, params=params)).json()
+                total += len(json.dumps(page))
+                pages += 1
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            report("walk all pages (limit=500, projected)", time.perf_counter() - start, total, pages)
+
+    db.shutdown_executor()
+    db.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pagination benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    print("📊 Pagination and projection benchmark")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
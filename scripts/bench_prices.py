@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: integer gwei prices, the bulk conversion and SQL sales reports
+
+Builds a temporary SQLite database with --orders orders priced only in
+the old text column (as before migration 7) and measures:
+
+- convert_prices, the bulk conversion convert_prices.py runs
+- revenue per event and per day the old way (read every order, float()
+  its "0.100 ETH" string, add up in Python) against the SQL GROUP BY on
+  idx_orders_sales
+
+Then checks that the conversion is exact, that the SQL sums match a
+Decimal recomputation of the text prices, and that order totals no longer
+round the way float formatting did.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+# Event prices in ETH, including ones float formatting to 3 decimals got wrong
+PRICES = ["0.05", "0.03", "0.08", "0.0125", "0.2", "1.5", "0.015"]
+
+
+def timed(label, seconds, extra=""):
+    print(f"   {label:<34} {seconds * 1000:9.1f} ms{extra}")
+
+
+def python_report(conn):
+    """What a sales endpoint had to do with text prices"""
+    revenue = defaultdict(float)
+    daily = defaultdict(float)
+    for event_id, created_at, total_price in conn.execute(
+        "SELECT event_id, created_at, total_price FROM orders WHERE status = 'confirmed'"
+    ):
+        amount = float(total_price.replace(" ETH", ""))
+        revenue[event_id] += amount
+        daily[created_at[:10]] += amount
+    return revenue, daily
+
+
+def run(args):
+    import main
+    import repository
+    from prices import format_eth, parse_eth
+
+    main.init_database()
+    main.seed_database()
+    events = len(PRICES)
+    with main.get_db() as conn:
+        for n, price in enumerate(PRICES[3:], start=4):
+            conn.execute("""
+                INSERT INTO events (name, date, time, venue, location, price, price_gwei, capacity)
+                VALUES (?, '2024-05-01', '20:00', 'Hall', 'City', ?, ?, 1000000)
+            """, (f"Event {n}", f"{price} ETH", parse_eth(price)))
+        rows = []
+        for n in range(args.orders):
+            event_id = random.randint(1, events)
+            quantity = random.randint(1, 6)
+            # Written the way order_total used to: float, 3 decimals
+            total = f"{float(PRICES[event_id - 1]) * quantity:.3f} ETH"
+            status = "confirmed" if random.random() < 0.8 else "pending"
+            day = f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} 12:00:00"
+            rows.append((f"0x{n:040x}", event_id, quantity, "general", total, status, day))
+        conn.executemany("""
+            INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        # As if written before the gwei columns existed
+        conn.execute("UPDATE events SET price_gwei = NULL")
+        conn.commit()
+
+    print(f"{args.orders:,} orders over {events} events, priced only as text\n")
+    with main.get_db() as conn:
+        start = time.perf_counter()
+        converted = repository.convert_prices(conn, args.chunk_rows)
+        elapsed = time.perf_counter() - start
+        timed("bulk conversion", elapsed, f"   {converted['orders'] / elapsed:,.0f} orders/s")
+        start = time.perf_counter()
+        again = repository.convert_prices(conn, args.chunk_rows)
+        timed("re-run (nothing left)", time.perf_counter() - start)
+
+        print()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            revenue, daily = python_report(conn)
+        python_time = (time.perf_counter() - start) / args.repeat
+        timed("Python loop over text prices", python_time)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            by_event = repository.sales_report(conn, "event", "confirmed", None, None, None)
+            by_day = repository.sales_report(conn, "day", "confirmed", None, None, None)
+        sql_time = (time.perf_counter() - start) / args.repeat
+        timed("SQL GROUP BY on gwei", sql_time, f"   x{python_time / sql_time:.1f}")
+
+        print("\nChecks")
+        texts = conn.execute("SELECT event_id, created_at, total_price FROM orders WHERE status = 'confirmed'").fetchall()
+        exact = defaultdict(int)
+        for event_id, _, total_price in texts:
+            exact[event_id] += int(Decimal(total_price.split()[0]) * 10 ** 9)
+        unconverted = conn.execute("SELECT COUNT(*) FROM orders WHERE total_price_gwei IS NULL").fetchone()[0]
+        results = [
+            ("every row converted, re-run is a no-op", unconverted == 0 and converted["orders"] == args.orders
+             and converted["events"] == events and again == {"events": 0, "orders": 0}),
+            ("SQL revenue equals the Decimal sum", {row["event_id"]: row["revenue"] for row in by_event} == dict(exact)),
+            ("daily revenue adds up to the total", sum(row["revenue"] for row in by_day) == sum(exact.values())
+             and len(by_day) == len(daily)),
+            ("order totals are exact (float made 3 x 0.0125 \"0.038\")",
+             format_eth(parse_eth("0.0125 ETH") * 3, 3) == "0.0375 ETH"),
+        ]
+    for name, passed in results:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integer price and sales report benchmark")
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--chunk-rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each report, averaged")
+    args = parser.parse_args()
+
+    print("📊 Integer prices and sales reports")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        sys.path.insert(0, BACKEND_DIR)
+        ok = run(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
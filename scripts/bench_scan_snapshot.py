@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: offline scanner snapshot build time and size
+
+Seeds one event with --tickets tickets (a share of them already used) on a
+temporary SQLite database and measures:
+
+- a cold build: reading every ticket status plus encoding and signing
+- the snapshot size, against gzip'd JSON of the same statuses
+- decoding and verifying the signature, as a scanner does after download
+- --changes mints and redemptions later: moving the cached snapshot forward
+  from the change log versus rebuilding it, and the size of the delta
+
+Then checks that the decoded snapshot matches the database and that the
+old snapshot plus the delta equals the new full snapshot.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def timed(label, seconds, extra=""):
+    print(f"   {label:<34} {seconds * 1000:9.1f} ms{extra}")
+
+
+async def main_async(args):
+    import main
+    import scan_snapshot
+
+    repository = main.repository
+    main.init_database()
+    main.seed_database()
+    used = set(random.sample(range(1, args.tickets + 1), int(args.tickets * args.used)))
+    with main.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO tickets (token_id, event_id, owner_address, seat, status) VALUES (?, 1, ?, ?, ?)",
+            [(i, f"0x{i:040x}", f"GA-{i}", "used" if i in used else "active") for i in range(1, args.tickets + 1)],
+        )
+        conn.commit()
+
+    print(f"{args.tickets:,} tickets, {len(used):,} used\n")
+    cache = scan_snapshot.ScanSnapshotCache("bench-secret")
+    start = time.perf_counter()
+    state = await repository.load_ticket_statuses(1)
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    _, version, full = await cache.download(repository, 1)
+    built = time.perf_counter() - start
+    timed("read statuses", loaded)
+    timed("cold build (read + encode + sign)", built)
+    start = time.perf_counter()
+    scan_snapshot.encode(scan_snapshot.signer_key("bench-secret"), scan_snapshot.FULL, 1, version, 0, state.token_ids, state.statuses)
+    timed("encode + sign only", time.perf_counter() - start)
+    start = time.perf_counter()
+    snapshot = scan_snapshot.decode(full, signer=cache.signer)
+    timed("decode + verify (scanner)", time.perf_counter() - start)
+
+    as_json = json.dumps({str(t): s for t, s in snapshot["tickets"].items()}).encode()
+    print(f"\n   snapshot   {len(full):>10,} B   {len(full) / args.tickets:6.3f} B/ticket")
+    print(f"   JSON       {len(as_json):>10,} B   gzip'd {len(gzip.compress(as_json)):,} B")
+
+    # Later: new mints and gate redemptions, recorded in the change log
+    mints = [(args.tickets + n, 1, f"0x{n:040x}", f"LATE-{n}") for n in range(1, args.changes // 2 + 1)]
+    await repository.apply_chain_changes({"mints": mints, "transfers": [], "used": [], "verified": [],
+                                          "minted_by_tx": {}}, None, None)
+    active = [t for t in range(1, args.tickets + 1) if t not in used]
+    redeemed = random.sample(active, args.changes - len(mints))
+    for offset in range(0, len(redeemed), 500):
+        await repository.redeem_tickets(redeemed[offset:offset + 500])
+
+    print(f"\n{len(mints):,} mints and {len(redeemed):,} redemptions later")
+    start = time.perf_counter()
+    _, new_version, new_full = await cache.download(repository, 1)
+    timed("incremental refresh + encode", time.perf_counter() - start)
+    start = time.perf_counter()
+    await scan_snapshot.ScanSnapshotCache("bench-secret").download(repository, 1)
+    timed("full rebuild + encode", time.perf_counter() - start)
+    start = time.perf_counter()
+    kind, _, delta = await cache.download(repository, 1, since=version)
+    timed("delta since first snapshot", time.perf_counter() - start, f"   {len(delta):,} B")
+
+    print("\nChecks")
+    with main.get_db() as conn:
+        expected = dict(conn.execute("SELECT token_id, status FROM tickets WHERE event_id = 1").fetchall())
+    latest = scan_snapshot.decode(new_full, signer=cache.signer)
+    changes = scan_snapshot.decode(delta, signer=cache.signer)
+    merged = {**snapshot["tickets"], **changes["tickets"]}
+    results = [
+        ("snapshot matches the database", latest["tickets"] == expected and latest["version"] == new_version),
+        ("old snapshot + delta equals the new one", kind == scan_snapshot.DELTA and merged == latest["tickets"]),
+        ("delta holds only changed tickets", len(changes["tickets"]) == args.changes),
+    ]
+    for name, passed in results:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    await repository.close()
+    return all(passed for _, passed in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scanner snapshot benchmark")
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--used", type=float, default=0.3, help="Share of tickets already used")
+    parser.add_argument("--changes", type=int, default=1000, help="Ticket changes between snapshots")
+    args = parser.parse_args()
+
+    print("📊 Offline scanner snapshot")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        sys.path.insert(0, BACKEND_DIR)
+        ok = asyncio.run(main_async(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
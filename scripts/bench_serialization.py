@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON serialisation of large responses
+
+Seeds --rows events, and --rows orders and tickets for one wallet, into a
+temporary SQLite database and reads each list once as a single page. Then
+times only turning those rows into a response body, best of --repeat:
+
+- previous: what the endpoints did before, a dict copy per row
+  (``dict(event)``, the re-keyed scan result, VerifyTicketResponse),
+  json.loads of each event's features and artists, FastAPI's
+  jsonable_encoder and Starlette's JSONResponse
+- now: the endpoints' own code (main._encode_event, JSONBody), with
+  features and artists spliced in as stored, and orjson if installed
+- now, without orjson: the same with json_body's standard library fallback
+
+Verification is timed over --rows scans, one response each. Checks that
+every body decodes to the same JSON as before and that the new path is
+faster on every payload.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+WALLET = "0x742d35cc6634c0532925a3b8d4c9db96590b5b8c"
+VERIFIED_AT = datetime(2024, 3, 15, 20, 0).isoformat()
+
+
+def best(repeat, work):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = work()
+        times.append(time.perf_counter() - start)
+    return min(times), body
+
+
+def seed(main, repository, rows):
+    events = [dict(main.SEED_EVENTS[n % 3], name=f"{main.SEED_EVENTS[n % 3]['name']} #{n}",
+                   date=f"2025-{1 + n % 12:02d}-{1 + n % 28:02d}") for n in range(rows)]
+    with main.get_db() as conn:
+        conn.executemany(f"""
+            INSERT INTO events ({', '.join(repository.EVENT_INSERT_COLUMNS)})
+            VALUES ({', '.join('?' for _ in repository.EVENT_INSERT_COLUMNS)})
+        """, repository.event_rows(events))
+        conn.executemany(
+            "INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, total_price_gwei, "
+            "status, tx_hash, token_ids, created_at) "
+            "VALUES (?, ?, 2, 'general', '0.100 ETH', 100000000, 'confirmed', ?, ?, datetime('2024-01-01', ?))",
+            ((WALLET, n % 3 + 1, f"0x{n:064x}", json.dumps([2 * n, 2 * n + 1]), f"+{n} minutes")
+             for n in range(rows)),
+        )
+        conn.executemany(
+            "INSERT INTO tickets (token_id, event_id, owner_address, seat, metadata_uri) VALUES (?, ?, ?, ?, ?)",
+            ((n, n % 3 + 1, WALLET, f"Section {n // 500} Seat {n % 500}", f"ipfs://Qm{n:044d}")
+             for n in range(1, rows + 1)),
+        )
+        conn.commit()
+
+
+def run(args):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    import json_body
+    import main
+    import pagination
+    import repository
+    from prices import format_prices
+
+    main.init_database()
+    main.seed_database()
+    seed(main, repository, args.rows)
+
+    def read(page, params, fields):
+        sql, sql_args = pagination.page_query(fields=fields, params=params, cursor=None, limit=args.rows * 2,
+                                              **page)
+        with main.get_db() as conn:
+            return conn.execute(sql, sql_args).fetchall(), len(page["order_by"])
+
+    def previous(content):
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def decode_event(event):
+        """The old main._decode_event"""
+        event_dict = format_prices(dict(event))
+        for name in ("features", "artists"):
+            event_dict[name] = json.loads(event_dict[name]) if event_dict[name] else []
+        return event_dict
+
+    def verify_previous(ticket):
+        ticket_dict = dict(ticket)
+        return previous(main.VerifyTicketResponse(is_valid=True, ticket={
+            "tokenId": ticket_dict["token_id"], "eventName": ticket_dict["event_name"],
+            "date": ticket_dict["date"], "venue": ticket_dict["venue"], "seat": ticket_dict["seat"],
+            "owner": ticket_dict["owner_address"], "status": ticket_dict["status"], "verifiedAt": VERIFIED_AT,
+        }))
+
+    def verify_now(ticket):
+        return json_body.JSONBody({"is_valid": True, "ticket": {
+            "tokenId": ticket["token_id"], "eventName": ticket["event_name"], "date": ticket["date"],
+            "venue": ticket["venue"], "seat": ticket["seat"], "owner": ticket["owner_address"],
+            "status": ticket["status"], "verifiedAt": VERIFIED_AT,
+        }, "error": None}).body
+
+    event_fields = list(repository.EVENT_COLUMNS)
+    event_rows, event_keys = read(repository.EVENTS_PAGE, (), event_fields)
+    order_rows, order_keys = read(repository.ORDERS_PAGE, (WALLET,), list(repository.ORDER_COLUMNS))
+    ticket_rows, ticket_keys = read(repository.TICKETS_PAGE, (WALLET,), list(repository.TICKET_COLUMNS))
+    with main.get_db() as conn:
+        scans = [repository.lookup_ticket(conn, token_id) for token_id in range(1, args.rows + 1)]
+
+    def page(rows, keys, fields):
+        # page_result's dicts are built on both paths, so they are timed on both
+        return pagination.page_result(rows, fields, keys, len(rows))
+
+    payloads = {
+        "events": (
+            lambda: previous({"events": [decode_event(e) for e in page(event_rows, event_keys, event_fields)[0]],
+                              "next_cursor": None}),
+            lambda: json_body.encode_page("events", map(main._encode_event,
+                                                        page(event_rows, event_keys, event_fields)[0]), None),
+        ),
+        "orders": (
+            lambda: previous({"orders": [format_prices(o) for o in page(order_rows, order_keys,
+                                                                        list(repository.ORDER_COLUMNS))[0]],
+                              "next_cursor": None}),
+            lambda: json_body.JSONBody({"orders": [format_prices(o) for o in page(
+                order_rows, order_keys, list(repository.ORDER_COLUMNS))[0]], "next_cursor": None}).body,
+        ),
+        "tickets": (
+            lambda: previous({"tickets": [format_prices(t) for t in page(ticket_rows, ticket_keys,
+                                                                         list(repository.TICKET_COLUMNS))[0]],
+                              "next_cursor": None}),
+            lambda: json_body.JSONBody({"tickets": [format_prices(t) for t in page(
+                ticket_rows, ticket_keys, list(repository.TICKET_COLUMNS))[0]], "next_cursor": None}).body,
+        ),
+        "verify": (
+            lambda: b"\n".join(verify_previous(ticket) for ticket in scans),
+            lambda: b"\n".join(verify_now(ticket) for ticket in scans),
+        ),
+    }
+
+    print(f"\n{args.rows:,} rows per payload, encoder: {json_body.ENCODER}\n")
+    print(f"   {'payload':<10} {'previous':>10} {'now':>10} {'speedup':>8} {'w/o orjson':>11} {'speedup':>8} "
+          f"{'size':>10}")
+    results = []
+    for name, (old, new) in payloads.items():
+        old_time, old_body = best(args.repeat, old)
+        new_time, new_body = best(args.repeat, new)
+        encoder, json_body.orjson = json_body.orjson, None
+        try:
+            fallback_time, fallback_body = best(args.repeat, new)
+        finally:
+            json_body.orjson = encoder
+        if name == "verify":
+            same = all(json.loads(a) == json.loads(b) == json.loads(c) for a, b, c in zip(
+                old_body.split(b"\n"), new_body.split(b"\n"), fallback_body.split(b"\n")))
+        else:
+            same = json.loads(old_body) == json.loads(new_body) == json.loads(fallback_body)
+        print(f"   {name:<10} {old_time * 1000:>7.1f} ms {new_time * 1000:>7.1f} ms {old_time / new_time:>7.1f}x "
+              f"{fallback_time * 1000:>8.1f} ms {old_time / fallback_time:>7.1f}x {len(new_body) / 1024:>6.0f} KiB")
+        results.append((name, same, old_time, new_time, fallback_time))
+
+    print("\nChecks")
+    checks = [(f"{name}: same JSON as before", same) for name, same, *_ in results]
+    checks += [(f"{name}: faster than before{', with and without orjson' if json_body.orjson else ''}",
+                new_time < old_time and fallback_time < old_time)
+               for name, _, old_time, new_time, fallback_time in results]
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in checks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON serialisation benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    print("🧾 JSON serialisation")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        # Seeding inserts are expected to be slow
+        os.environ.setdefault("DB_SLOW_QUERY_MS", "60000")
+        sys.path.insert(0, BACKEND_DIR)
+        ok = run(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: EIP-191 signature verification for /auth/verify
+
+Signs login messages with random wallets, checks recovery against a known
+key, then reports verifications per second for a single core (synchronous
+recovery), and for a burst of concurrent logins sent to the pool one task
+per signature (as before) and micro-batched by SignatureVerifier.verify.
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from coincurve import PrivateKey
+
+import signatures
+
+# Well-known test key from the web3.py documentation
+KNOWN_KEY = "4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+KNOWN_ADDRESS = "0x2c7536e3605d9c16a7a3d7b1898e529396a65c23"
+
+MESSAGE = "Sign this message to authenticate with NFT Tickets: {nonce}"
+
+
+def address_of(key: PrivateKey) -> str:
+    return "0x" + signatures.keccak256(key.public_key.format(compressed=False)[1:])[-20:].hex()
+
+
+def personal_sign(key: PrivateKey, message: str) -> str:
+    raw = key.sign_recoverable(signatures.personal_message_hash(message), hasher=None)
+    return "0x" + (raw[:64] + bytes([raw[64] + 27])).hex()
+
+
+def make_logins(count):
+    logins = []
+    for _ in range(count):
+        key = PrivateKey()
+        message = MESSAGE.format(nonce=secrets.token_hex(16))
+        logins.append((address_of(key), message, personal_sign(key, message)))
+    return logins
+
+
+def check_correctness():
+    key = PrivateKey(bytes.fromhex(KNOWN_KEY))
+    address, message = address_of(key), MESSAGE.format(nonce="00" * 16)
+    signature = personal_sign(key, message)
+    other = make_logins(1)[0]
+    checks = [
+        ("known key derives its documented address", address == KNOWN_ADDRESS),
+        ("valid signature accepted", signatures.verify_signature(address, message, signature)),
+        ("checksummed address accepted", signatures.verify_signature(address.upper().replace("0X", "0x"), message, signature)),
+        ("tampered message rejected", not signatures.verify_signature(address, message + " ", signature)),
+        ("other wallet's signature rejected", not signatures.verify_signature(address, message, other[2])),
+        ("malformed signature rejected", not signatures.verify_signature(address, message, "0x1234")),
+    ]
+    print("Correctness")
+    failed = False
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+        failed |= not passed
+    return failed
+
+
+def report(label, count, elapsed):
+    print(f"   {label:<40} {count / elapsed:>10,.0f} verifications/s   ({elapsed:.2f} s)")
+
+
+async def bench(args):
+    logins = make_logins(args.logins)
+    cores = os.cpu_count() or 1
+    print(f"\n{args.logins:,} distinct logins, {cores} core(s), {signatures.SIGNATURE_WORKERS} worker thread(s)")
+
+    start = time.perf_counter()
+    assert all(signatures.verify_signature(*login) for login in logins)
+    elapsed = time.perf_counter() - start
+    report("single core, synchronous", len(logins), elapsed)
+
+    loop = asyncio.get_running_loop()
+    executor = signatures.SignatureVerifier()._get_executor()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, signatures.verify_signature, *login) for login in logins
+    ))
+    before = time.perf_counter() - start
+    report("pooled, one task per signature", len(logins), before)
+    assert all(results)
+    executor.shutdown(wait=True)
+
+    verifier = signatures.SignatureVerifier()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verifier.verify(*login) for login in logins))
+    elapsed = time.perf_counter() - start
+    report("pooled, micro-batched verify()", len(logins), elapsed)
+    print(f"   {'   per core':<40} {len(logins) / elapsed / cores:>10,.0f} verifications/s")
+    print(f"   {'   pool tasks':<40} {verifier.batches:>10,}")
+    print(f"   {'   speedup':<40} {before / elapsed:>10.2f}x")
+    assert all(results)
+    verifier.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Signature verification benchmark")
+    parser.add_argument("--logins", type=int, default=5000)
+    args = parser.parse_args()
+
+    print("📊 EIP-191 signature verification")
+    print("=" * 50)
+    failed = check_correctness()
+    asyncio.run(bench(args))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
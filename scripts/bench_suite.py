@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+API benchmark suite: mixed workloads against the in-process app
+
+Seeds a temporary SQLite database at production-like volume (--tickets
+tickets, --logs verification log rows, --orders orders over --events
+events), smoke-tests every endpoint the workloads use, then drives the
+FastAPI app over ASGI (no network) with concurrent workloads:
+
+- browse: catalog pages and event details, a holder's tickets and orders
+- gate: single scans, batch redemptions and verification pages
+- onsale: a purchase storm on one event until it sells out, with buyers
+  polling the event and fetching login nonces
+- mixed: all three at once
+
+Each workload reports requests/s and p50/p95/p99 latency per endpoint.
+Results are written as JSON (by default bench_results/<commit>.json) so
+runs can be compared across commits; --compare BASELINE.json prints the
+change per endpoint and exits non-zero when one regresses by more than
+--threshold.
+
+    python scripts/bench_suite.py
+    python scripts/bench_suite.py --compare bench_results/<baseline>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+RESULTS_DIR = os.path.join(ROOT_DIR, "bench_results")
+ADMIN_KEY = "bench-suite-admin-key"
+# Statuses that are a normal answer rather than an error, per endpoint
+EXPECTED = {"POST /purchase": (200, 400)}
+WORKLOADS = ["browse", "gate", "onsale", "mixed"]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def git_commit():
+    """(short commit, working tree has changes), or ("unknown", False) outside git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(dirty)
+
+
+def seed(conn, args):
+    """Bulk-load the catalog, tickets, orders and scan history; returns the on-sale event id"""
+    from prices import parse_eth
+
+    conn.executemany("""
+        INSERT INTO events (name, date, time, venue, location, price, price_gwei, capacity, sold)
+        VALUES (?, ?, '20:00', 'Arena', 'City', '0.05 ETH', ?, 50000, 0)
+    """, [(f"Tour Date {n}", f"2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}", parse_eth("0.05")) for n in range(args.events)])
+    onsale = conn.execute("""
+        INSERT INTO events (name, date, time, venue, location, price, price_gwei, capacity, sold)
+        VALUES ('On Sale Now', '2025-12-31', '21:00', 'Stadium', 'City', '0.08 ETH', ?, ?, 0)
+        RETURNING id
+    """, (parse_eth("0.08"), args.onsale_capacity)).fetchone()[0]
+    event_ids = [row[0] for row in conn.execute("SELECT id FROM events WHERE id != ?", (onsale,))]
+
+    conn.executemany(
+        "INSERT INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, ?, ?, ?)",
+        ((token_id, random.choice(event_ids), holder(random.randrange(args.holders)), f"GA-{token_id}")
+         for token_id in range(1, args.tickets + 1)),
+    )
+    conn.executemany("""
+        INSERT INTO orders (user_address, event_id, quantity, seat_type, total_price, total_price_gwei, status, created_at)
+        VALUES (?, ?, ?, 'general', '', ?, ?, ?)
+    """, (
+        (holder(random.randrange(args.holders)), random.choice(event_ids), quantity, quantity * parse_eth("0.05"),
+         random.choice(["confirmed"] * 8 + ["pending", "failed"]), timestamp(random.randrange(90 * 86400)))
+        for _ in range(args.orders) for quantity in (random.randint(1, 4),)
+    ))
+    # A tenth of scans are for token ids no ticket has
+    conn.executemany("""
+        INSERT INTO verification_logs (token_id, verifier_address, status, verified_at) VALUES (?, NULL, ?, ?)
+    """, (
+        (token_id, "valid" if token_id <= args.tickets else "invalid", timestamp(random.randrange(30 * 86400)))
+        for token_id in (random.randint(1, args.tickets * 11 // 10) for _ in range(args.logs))
+    ))
+    conn.commit()
+    return onsale
+
+
+def holder(n):
+    return f"0x{n:040x}"
+
+
+def timestamp(seconds_ago):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - seconds_ago))
+
+
+def workload_mixes(main, args, onsale, cursors):
+    """Workload name -> [(weight, label, request factory)]; a factory returns (method, url, kwargs)"""
+    holders = [holder(n) for n in range(min(args.holders, 1000))]
+    buyers = [f"0xb{n:039x}" for n in range(args.buyers)]
+    tokens = {address: main.create_jwt_token(address) for address in holders + buyers}
+    admin = {"X-Admin-Key": ADMIN_KEY}
+
+    def auth(address):
+        return {"Authorization": f"Bearer {tokens[address]}"}
+
+    def batch():
+        start = random.randint(1, args.tickets - 50)
+        return "POST", "/verify/batch", {"headers": admin, "json": {"token_ids": list(range(start, start + 50))}}
+
+    def purchase():
+        return "POST", "/purchase", {"headers": auth(random.choice(buyers)), "json": {
+            "event_id": onsale, "quantity": random.randint(1, 4), "seat_type": "general",
+            "tx_hash": f"0x{random.getrandbits(256):064x}"}}
+
+    return {
+        "browse": [
+            (30, "GET /events", lambda: ("GET", "/events", {})),
+            (15, "GET /events?cursor", lambda: ("GET", "/events", {"params": {"cursor": random.choice(cursors)}})),
+            (30, "GET /events/{event_id}", lambda: ("GET", f"/events/{random.randint(1, args.events)}", {})),
+            (15, "GET /tickets", lambda: ("GET", "/tickets", {"headers": auth(random.choice(holders))})),
+            (10, "GET /orders", lambda: ("GET", "/orders", {"headers": auth(random.choice(holders))})),
+        ],
+        "gate": [
+            (80, "GET /verify/{token_id}", lambda: ("GET", f"/verify/{random.randint(1, args.tickets * 11 // 10)}", {})),
+            (5, "POST /verify/batch", batch),
+            (15, "GET /verify/{token_id}/page", lambda: ("GET", f"/verify/{random.randint(1, args.tickets)}/page", {
+                "headers": {"Accept-Encoding": "gzip"}})),
+        ],
+        "onsale": [
+            (50, "POST /purchase", purchase),
+            (40, "GET /events/{event_id}", lambda: ("GET", f"/events/{onsale}", {})),
+            (10, "GET /auth/nonce", lambda: ("GET", "/auth/nonce", {"params": {"address": random.choice(buyers)}})),
+        ],
+    }
+
+
+async def smoke(client, main, onsale):
+    """Every endpoint the workloads use answers correctly before anything is timed"""
+    admin = {"X-Admin-Key": ADMIN_KEY}
+    user = {"Authorization": f"Bearer {main.create_jwt_token(holder(0))}"}
+    checks = [
+        ("health check", (await client.get("/health")).json().get("status") == "healthy"),
+        ("catalog lists events", len((await client.get("/events")).json()["events"]) > 0),
+        ("event detail", (await client.get(f"/events/{onsale}")).json().get("name") == "On Sale Now"),
+        ("unknown event is 404", (await client.get("/events/99999999")).status_code == 404),
+        ("login nonce issued", "nonce" in (await client.get("/auth/nonce", params={"address": holder(0)})).json()),
+        ("unknown ticket is invalid", not (await client.get("/verify/99999999")).json()["is_valid"]),
+        ("verification page renders", "Invalid Ticket" in (await client.get("/verify/99999999/page")).text),
+        ("tickets need a login", (await client.get("/tickets")).status_code in (401, 403)),
+        ("holder tickets listed", (await client.get("/tickets", headers=user)).status_code == 200),
+        ("holder orders listed", (await client.get("/orders", headers=user)).status_code == 200),
+        ("batch scan needs the admin key", (await client.post("/verify/batch", json={"token_ids": [1]})).status_code == 403),
+        ("batch scan", (await client.post("/verify/batch", headers=admin, json={"token_ids": [1]})).status_code == 200),
+    ]
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in checks)
+
+
+async def drive(client, mix, total, concurrency, samples):
+    """Send ``total`` requests drawn from ``mix`` over ``concurrency`` connections"""
+    weights = [weight for weight, _, _ in mix]
+    queue = asyncio.Queue()
+    for _, label, factory in random.choices(mix, weights=weights, k=total):
+        queue.put_nowait((label, factory))
+
+    async def worker():
+        while True:
+            try:
+                label, factory = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            method, url, kwargs = factory()
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples[label].append((time.perf_counter() - start, response.status_code))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for label, results in sorted(samples.items()):
+        latencies = sorted(seconds for seconds, _ in results)
+        statuses = Counter(status for _, status in results)
+        endpoints[label] = {
+            "requests": len(results),
+            "rps": round(len(results) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "errors": sum(n for status, n in statuses.items() if status not in EXPECTED.get(label, (200,))),
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "endpoints": endpoints,
+    }
+
+
+def report(name, result):
+    print(f"\n{name}: {result['requests']:,} requests in {result['seconds']:.1f}s, "
+          f"{result['rps']:,.0f} req/s, {result['errors']} errors")
+    for label, endpoint in result["endpoints"].items():
+        print(f"   {label:<30} {endpoint['rps']:>8,.0f} req/s   p50 {endpoint['p50_ms']:7.2f}   "
+              f"p95 {endpoint['p95_ms']:7.2f}   p99 {endpoint['p99_ms']:8.2f} ms")
+
+
+async def run_workloads(args, main, onsale):
+    import httpx
+
+    from verification_log import verification_log
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print("\nSmoke test")
+            if not await smoke(client, main, onsale):
+                return None
+            cursors, cursor = [], None
+            while len(cursors) < 10:
+                cursor = (await client.get("/events", params={"cursor": cursor} if cursor else {})).json()["next_cursor"]
+                if cursor is None:
+                    break
+                cursors.append(cursor)
+            mixes = workload_mixes(main, args, onsale, cursors or [None])
+
+            for name in args.workloads:
+                parts = list(mixes.values()) if name == "mixed" else [mixes[name]]
+                # Unrecorded warm-up: fill the catalog cache and the connection pool
+                await asyncio.gather(*(drive(client, mix, args.warmup, args.concurrency, defaultdict(list))
+                                       for mix in parts))
+                await verification_log.flush()
+                samples = defaultdict(list)
+                start = time.perf_counter()
+                await asyncio.gather(*(drive(client, mix, args.requests, args.concurrency, samples) for mix in parts))
+                await verification_log.flush()
+                results[name] = summarize(samples, time.perf_counter() - start)
+                report(name, results[name])
+    finally:
+        await main.shutdown_event()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change per endpoint against a baseline run; returns the regressions"""
+    print(f"\nAgainst {baseline['commit']}{' (dirty)' if baseline.get('dirty') else ''} "
+          f"({baseline['timestamp']}), regression threshold {threshold:.0%}")
+    for name, value in results["config"].items():
+        if name not in ("workloads", "threshold") and baseline["config"].get(name, value) != value:
+            print(f"   ⚠️  baseline ran with {name}={baseline['config'][name]}, this run with {value}")
+    regressions = []
+    for name, result in results["workloads"].items():
+        before = baseline["workloads"].get(name, {}).get("endpoints", {})
+        for label, endpoint in result["endpoints"].items():
+            if label not in before:
+                continue
+            rps = endpoint["rps"] / before[label]["rps"] - 1 if before[label]["rps"] else 0.0
+            p95 = endpoint["p95_ms"] / before[label]["p95_ms"] - 1 if before[label]["p95_ms"] else 0.0
+            regressed = rps < -threshold or p95 > threshold
+            if regressed:
+                regressions.append(f"{name} {label}")
+            print(f"   {'❌' if regressed else '✅'} {name:<7} {label:<30} req/s {rps:+7.1%}   p95 {p95:+7.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process API benchmark suite")
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--logs", type=int, default=1000000, help="Verification log rows")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--holders", type=int, default=20000, help="Distinct ticket owners")
+    parser.add_argument("--buyers", type=int, default=2000, help="Distinct buyers in the on-sale storm")
+    parser.add_argument("--onsale-capacity", type=int, default=5000, help="Seats of the on-sale event")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per workload (per part of mixed)")
+    parser.add_argument("--warmup", type=int, default=1000, help="Unrecorded requests before each workload")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients per workload")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for data and request mixes")
+    parser.add_argument("--output", help="Results file (default bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative p95 increase or req/s drop that counts as a regression")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    print("🏁 NFT Ticketing API benchmark suite")
+    print("=" * 50)
+
+    commit, dirty = git_commit()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ.pop("DATABASE_URL", None)
+        os.environ["ADMIN_API_KEY"] = ADMIN_KEY
+        sys.path.insert(0, BACKEND_DIR)
+        import main as app
+        import repository
+
+        start = time.perf_counter()
+        app.init_database()
+        app.seed_database()
+        with app.get_db() as conn:
+            onsale = seed(conn, args)
+            repository.check_analytics(conn, repair=True)
+        seed_seconds = time.perf_counter() - start
+        print(f"Seeded {args.tickets:,} tickets, {args.logs:,} scans, {args.orders:,} orders and "
+              f"{args.events + 4} events in {seed_seconds:.1f}s")
+
+        workloads = asyncio.run(run_workloads(args, app, onsale))
+    if workloads is None:
+        print("\n❌ Smoke test failed; not benchmarking")
+        sys.exit(1)
+
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {name: value for name, value in vars(args).items() if name not in ("output", "compare")},
+        "seed_seconds": round(seed_seconds, 1),
+        "workloads": workloads,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    errors = sum(result["errors"] for result in workloads.values())
+    if errors:
+        print(f"❌ {errors} requests failed")
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} endpoints regressed")
+    sys.exit(1 if errors or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JWT verification with and without the principal cache
+
+Replays authenticated requests from a pool of logged-in wallets through
+verify_jwt_token, comparing a full jwt.decode per request with the cache,
+then checks revocation, expiry and JWT_SECRET rotation.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def check_semantics(main, token_cache):
+    token = main.create_jwt_token("0x" + "22" * 20)
+    checks = [("valid token accepted", main.verify_jwt_token(token) == "0x" + "22" * 20)]
+    checks.append(("second lookup served from cache", main.verify_jwt_token(token) and main.token_cache.hits > 0))
+
+    payload = main.token_cache.verify(token, main.JWT_SECRET)
+    asyncio.run(token_cache.revoked_tokens.revoke(payload["jti"], payload["exp"]))
+    checks.append(("revoked token rejected despite cache", main.verify_jwt_token(token) is None))
+
+    other = main.create_jwt_token("0x" + "33" * 20)
+    main.verify_jwt_token(other)
+    original = main.JWT_SECRET
+    main.JWT_SECRET = original + "-rotated"
+    checks.append(("cached token rejected after secret rotation", main.verify_jwt_token(other) is None))
+    main.JWT_SECRET = original
+    checks.append(("tampered token rejected", main.verify_jwt_token(other[:-2] + "AA") is None))
+
+    cache = token_cache.TokenCache(main.JWT_ALGORITHM, token_cache.RevocationList())
+    expiring = main.jwt.encode({"address": "0x1", "exp": int(time.time()) + 1}, main.JWT_SECRET, algorithm="HS256")
+    cache.verify(expiring, main.JWT_SECRET)
+    key = next(iter(cache._entries))
+    cache._entries[key] = (cache._entries[key][0], time.time() - 1)
+    cache.verify(expiring, main.JWT_SECRET)
+    checks.append(("entry past exp is re-verified, not served", cache.hits == 0 and cache.misses == 2))
+
+    print("Semantics")
+    failed = False
+    for name, passed in checks:
+        print(f"   {'✅' if passed else '❌'} {name}")
+        failed |= not passed
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JWT cache benchmark")
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--wallets", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("📊 JWT verification cache")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        import db
+        import main as app_main
+        import token_cache
+
+        app_main.init_database()
+        failed = check_semantics(app_main, token_cache)
+
+        tokens = [app_main.create_jwt_token(f"0x{n:040x}") for n in range(args.wallets)]
+        requests = [random.choice(tokens) for _ in range(args.requests)]
+        print(f"\n{args.requests:,} authenticated requests from {args.wallets:,} wallets")
+
+        start = time.perf_counter()
+        for token in requests:
+            app_main.jwt.decode(token, app_main.JWT_SECRET, algorithms=[app_main.JWT_ALGORITHM])
+        elapsed = time.perf_counter() - start
+        print(f"   {'jwt.decode every request (previous)':<40} {args.requests / elapsed:>10,.0f} req/s")
+
+        app_main.token_cache = token_cache.TokenCache(app_main.JWT_ALGORITHM, token_cache.revoked_tokens)
+        start = time.perf_counter()
+        for token in requests:
+            app_main.verify_jwt_token(token)
+        elapsed = time.perf_counter() - start
+        print(f"   {'principal cache':<40} {args.requests / elapsed:>10,.0f} req/s")
+        stats = app_main.token_cache.stats()
+        print(f"   hits {stats['hits']:,}, misses {stats['misses']:,}, "
+              f"decode avg {stats['decode_avg_us']} µs, saved {stats['decode_saved_ms']:,.0f} ms")
+        db.close_pool()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-memory verification index vs. the per-scan tickets/events JOIN
+
+Seeds one event with N tickets, preloads it into the verification index and
+reports the index's memory footprint (tracemalloc), build time, and lookup
+latency next to the SQL lookup verify_ticket falls back to. A dict of
+sqlite3.Row objects is measured as the naive in-memory alternative.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def measure(label, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {label:<28} {current / 1024 / 1024:8.1f} MiB   built in {elapsed:6.2f} s")
+    return value
+
+
+def time_lookups(label, lookup, token_ids):
+    start = time.perf_counter()
+    for token_id in token_ids:
+        lookup(token_id)
+    per_lookup = (time.perf_counter() - start) / len(token_ids)
+    print(f"   {label:<28} {per_lookup * 1e6:8.2f} µs/lookup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verification index benchmark")
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+
+        import db
+        import main as app_main
+        import repository
+        from verification_index import VerificationIndex
+
+        app_main.init_database()
+        app_main.seed_database()
+        owners = [f"0x{random.getrandbits(160):040x}" for _ in range(max(args.tickets // 3, 1))]
+        with app_main.get_db() as conn:
+            conn.executemany(
+                "INSERT INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, 1, ?, ?)",
+                (
+                    (token_id, random.choice(owners), f"Section {token_id // 2500} Row {token_id // 50 % 50} Seat {token_id % 50}")
+                    for token_id in range(1, args.tickets + 1)
+                ),
+            )
+            conn.commit()
+
+        print(f"📊 Verification index, {args.tickets:,} tickets")
+        print("=" * 50)
+
+        with app_main.get_db() as conn:
+            index = VerificationIndex()
+            measure("column index (this repo)", lambda: index.load(conn, 1))
+            rows = measure(
+                "dict of sqlite3.Row",
+                lambda: {row["token_id"]: row for row in conn.execute(
+                    "SELECT t.*, e.name as event_name, e.date, e.venue FROM tickets t "
+                    "JOIN events e ON t.event_id = e.id WHERE t.event_id = 1"
+                )},
+            )
+
+            token_ids = [random.randint(1, args.tickets) for _ in range(args.lookups)]
+            print()
+            time_lookups("index.lookup", index.lookup, token_ids)
+            time_lookups("dict of rows", rows.get, token_ids)
+            time_lookups("SQL JOIN (pooled conn)", lambda t: repository.lookup_ticket(conn, t), token_ids)
+
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: batch gate scanning vs one ticket per request
+
+Runs the FastAPI app in-process and scans a fresh set of tickets with:
+
+- GET /verify/{token_id}: today's scanner loop (read-only, nothing redeemed)
+- POST /verify/batch with 1, 50 and 500 tickets per request (redeemed)
+
+and reports tickets/s and p50/p99 request latency. Scanners run
+concurrently and half of every batch overlaps another scanner's, the way
+two lanes re-scan the same group, so batch runs send every ticket twice.
+The run then checks that every ticket was redeemed exactly once.
+
+The database is a temporary SQLite file unless --database-url points at
+an empty PostgreSQL database.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+ADMIN_KEY = "bench-admin-key"
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+async def scan(client, requests, concurrency):
+    """Send (method, path, json) requests from ``concurrency`` scanners"""
+    latencies = []
+    redeemed = []
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def scanner():
+        while True:
+            try:
+                method, path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers={"X-Admin-Key": ADMIN_KEY})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+            if body is not None:
+                redeemed.extend(r["token_id"] for r in response.json()["results"] if r["result"] == "redeemed")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(scanner() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, percentile(latencies, 50), percentile(latencies, 99), redeemed
+
+
+async def main_async(args):
+    import httpx
+
+    import main
+
+    await main.startup_event()
+    repository = main.repository
+    runs = [("GET /verify/{id}", 1)] + [(f"POST /verify/batch x{size}", size) for size in args.batch_sizes]
+    # A fresh, unredeemed range of tickets per run
+    next_token = 1
+    ranges = []
+    for _ in runs:
+        ranges.append(range(next_token, next_token + args.tickets))
+        next_token += args.tickets
+    for start in range(1, next_token, 10000):
+        mints = [(token_id, 1, f"0x{token_id:040x}", f"GA-{token_id}")
+                 for token_id in range(start, min(start + 10000, next_token))]
+        await repository.apply_chain_changes({"mints": mints, "transfers": [], "used": [], "verified": [],
+                                              "minted_by_tx": {}}, None, None)
+
+    print(f"{repository.name}: {args.tickets:,} tickets per run, {args.concurrency} scanners\n")
+    transport = httpx.ASGITransport(app=main.app)
+    failed = False
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            baseline = None
+            for (label, size), tickets in zip(runs, ranges):
+                if label.startswith("GET"):
+                    requests = [("GET", f"/verify/{token_id}", None) for token_id in tickets]
+                else:
+                    ids = list(tickets)
+                    requests = [("POST", "/verify/batch", {"token_ids": ids[i:i + size]})
+                                for i in range(0, len(ids), size)]
+                    # Half of each batch again, offset by half a batch: every ticket is scanned twice
+                    half = max(size // 2, 1)
+                    requests += [("POST", "/verify/batch", {"token_ids": ids[i:i + size]})
+                                 for i in range(half, len(ids), size)]
+                    requests += [("POST", "/verify/batch", {"token_ids": ids[:half]})]
+                elapsed, p50, p99, redeemed = await scan(client, requests, args.concurrency)
+                rate = len(tickets) / elapsed
+                baseline = baseline or rate
+                print(f"   {label:<24} {rate:>9,.0f} tickets/s  x{rate / baseline:5.1f}   "
+                      f"p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms")
+                if not label.startswith("GET"):
+                    exact = sorted(redeemed) == list(tickets)
+                    failed |= not exact
+                    if not exact:
+                        print(f"      ❌ {len(redeemed):,} redemptions for {len(tickets):,} tickets")
+    finally:
+        await main.shutdown_event()
+    print(f"\n{'❌' if failed else '✅'} every ticket redeemed exactly once despite overlapping scans")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch gate-scanning benchmark")
+    parser.add_argument("--tickets", type=int, default=5000, help="Tickets scanned per run")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent scanners")
+    parser.add_argument("--database-url", default="", help="Empty PostgreSQL database (default: temporary SQLite)")
+    args = parser.parse_args()
+
+    print("📊 Batch gate scanning")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.pop("DATABASE_PATH", None)
+        os.environ["ADMIN_API_KEY"] = ADMIN_KEY
+        os.environ["SHARED_STATE_PATH"] = os.path.join(tmp, "bench.state")
+        os.environ.setdefault("VERIFICATION_PRELOAD_EVENTS", "")
+        sys.path.insert(0, BACKEND_DIR)
+        ok = asyncio.run(main_async(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
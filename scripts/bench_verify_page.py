@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /verify/{token_id}/page latency and throughput
+
+Runs the FastAPI app in-process on a temporary database and refreshes the
+verification page for a hot set of tickets, as door staff do, with:
+
+- no page cache (VERIFY_PAGE_CACHE_SIZE=0): look up and render every hit
+- the page cache, once per Accept-Encoding (identity, gzip, br)
+- the page cache with If-None-Match, so every refresh is a 304
+
+Each run starts after one refresh of every hot ticket, so it measures the
+steady state. Reports req/s, p50/p99 latency and bytes on the wire per
+response. In-process, a request that never waits on the database runs to
+completion without yielding, so cached latencies are pure handler time.
+
+Then checks that compressed bodies decode to the page, that status changes
+invalidate cached pages, that values are HTML-escaped and that a page hit
+is logged without waiting for the database, even in sync log mode.
+"""
+
+import argparse
+import asyncio
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+async def drive(client, hot, requests_total, concurrency, headers):
+    latencies = []
+    sizes = []
+    etags = {}
+    remaining = requests_total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            token_id = random.choice(hot)
+            request_headers = dict(headers)
+            if "If-None-Match" in headers and token_id in etags:
+                request_headers["If-None-Match"] = etags[token_id]
+            start = time.perf_counter()
+            response = await client.get(f"/verify/{token_id}/page", headers=request_headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in (200, 304):
+                raise RuntimeError(f"page {token_id} returned {response.status_code}")
+            etags[token_id] = response.headers["etag"]
+            sizes.append(int(response.headers.get("content-length", 0)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 99), sum(sizes) / len(sizes)
+
+
+async def main_async(args):
+    import httpx
+
+    import main
+    from verification_pages import ENCODINGS, VerificationPageCache
+
+    main.init_database()
+    main.seed_database()
+    with main.get_db() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, ?, ?, ?)",
+            [(i, i % 3 + 1, f"0x{i:040x}", f"GA-{i}") for i in range(1, args.tickets + 1)],
+        )
+        conn.commit()
+    hot = random.sample(range(1, args.tickets + 1), min(args.hot, args.tickets))
+    served = 0
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            runs = [("no cache", 0, {"Accept-Encoding": "identity"})]
+            runs += [(f"cached, {encoding}", args.cache_size, {"Accept-Encoding": encoding})
+                     for encoding in ("identity",) + ENCODINGS]
+            runs.append(("cached, 304", args.cache_size, {"Accept-Encoding": ENCODINGS[0], "If-None-Match": ""}))
+
+            print(f"{args.requests:,} refreshes over {len(hot):,} hot tickets, concurrency {args.concurrency}\n")
+            baseline = None
+            for label, cache_size, headers in runs:
+                main.verification_pages = VerificationPageCache(max_entries=cache_size)
+                # Steady state: every hot page rendered once, as after the first refresh
+                for token_id in hot:
+                    await client.get(f"/verify/{token_id}/page")
+                served += len(hot)
+                rps, p50, p99, size = await drive(client, hot, args.requests, args.concurrency, headers)
+                served += args.requests
+                baseline = baseline or rps
+                print(f"   {label:<16} {rps:>9,.0f} req/s  x{rps / baseline:5.1f}   p50 {p50 * 1000:6.2f} ms"
+                      f"   p99 {p99 * 1000:6.2f} ms   {size:>6,.0f} B")
+            print(f"\n   render + compress: {main.verification_pages.stats()['render_avg_us']} µs per page")
+
+            print("\nChecks")
+            results = []
+            pages = main.verification_pages
+            token_id = hot[0]
+            plain = await client.get(f"/verify/{token_id}/page", headers={"Accept-Encoding": "identity"})
+            entry = pages.get(token_id)
+            decoded = [gzip.decompress(entry.bodies["gzip"]) == plain.content]
+            if "br" in entry.bodies:
+                import brotli
+                decoded.append(brotli.decompress(entry.bodies["br"]) == plain.content)
+            results.append(("compressed bodies decode to the page", all(decoded) and "Content-Encoding" not in plain.headers))
+            negotiated = await client.get(f"/verify/{token_id}/page", headers={"Accept-Encoding": "gzip;q=0.5, br;q=0"})
+            results.append(("Accept-Encoding q-values honoured", negotiated.headers.get("content-encoding") == "gzip"
+                             and "Accept-Encoding" in negotiated.headers.get("vary", "")))
+            not_modified = await client.get(f"/verify/{token_id}/page", headers={"If-None-Match": plain.headers["etag"]})
+            results.append(("matching ETag returns 304", not_modified.status_code == 304 and not not_modified.content))
+
+            with main.get_db() as conn:
+                conn.execute("UPDATE tickets SET status = 'used' WHERE token_id = ?", (token_id,))
+                conn.commit()
+            main.apply_indexed_changes({"mints": [], "transfers": [], "used": [token_id], "restored_events": []})
+            used = await client.get(f"/verify/{token_id}/page")
+            results.append(("status change invalidates the cached page", "Used" in used.text
+                            and used.headers["etag"] != plain.headers["etag"]))
+
+            with main.get_db() as conn:
+                conn.execute("INSERT INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, 1, ?, ?)",
+                             (args.tickets + 1, "0x" + "0" * 40, "<script>alert(1)</script>"))
+                conn.commit()
+            escaped = await client.get(f"/verify/{args.tickets + 1}/page")
+            results.append(("ticket values are HTML-escaped", "&lt;script&gt;" in escaped.text and "<script>" not in escaped.text))
+            invalid = await client.get(f"/verify/{args.tickets + 100}/page")
+            results.append(("unknown ticket renders the invalid page", "Invalid Ticket" in invalid.text))
+
+            log = main.verification_log
+            write = main.repository.write_verification_logs
+
+            async def slow_write(entries):
+                await asyncio.sleep(0.5)
+                await write(entries)
+
+            log.mode = "sync"
+            main.repository.write_verification_logs = slow_write
+            start = time.perf_counter()
+            await client.get(f"/verify/{token_id}/page")
+            elapsed = time.perf_counter() - start
+            del main.repository.write_verification_logs
+            results.append(("sync log mode does not block the page", elapsed < 0.25))
+            await asyncio.sleep(0.6)  # the flusher's slow write
+            await log.flush()
+            served += 7
+            with main.get_db() as conn:
+                logged = conn.execute("SELECT COUNT(*) FROM verification_logs").fetchone()[0]
+            results.append(("every page hit is logged", logged == served))
+
+            for name, passed in results:
+                print(f"   {'✅' if passed else '❌'} {name}")
+            return all(passed for _, passed in results)
+    finally:
+        await main.shutdown_event()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verification page benchmark")
+    parser.add_argument("--tickets", type=int, default=10000)
+    parser.add_argument("--hot", type=int, default=500, help="Tickets being refreshed")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("📊 Verification page")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["SHARED_STATE_PATH"] = os.path.join(tmp, "bench.state")
+        os.environ.setdefault("VERIFICATION_PRELOAD_EVENTS", "")
+        sys.path.insert(0, BACKEND_DIR)
+        ok = asyncio.run(main_async(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
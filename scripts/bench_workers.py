@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput scaling with gunicorn worker processes
+
+Starts the API under gunicorn (backend/gunicorn.conf.py) with 1, 2, ...
+workers on a temporary database and drives /events and /verify/{id} from
+separate load-generator processes for a fixed time, reporting req/s and
+the speed-up over one worker. Every run uses the ``local`` shared state
+backend so the numbers include its coordination cost.
+
+The load generators share the machine with the server; on an N-core host
+expect scaling to flatten before N workers, and no scaling at all on one
+core.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+PATHS = {
+    "/events": lambda tickets: "/events",
+    "/verify/{id}": lambda tickets: f"/verify/{random.randint(1, tickets)}",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(path, tickets):
+    os.environ["DATABASE_PATH"] = path
+    sys.path.insert(0, BACKEND_DIR)
+    import db
+    import main
+
+    main.init_database()
+    main.seed_database()
+    with main.get_db() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, ?, ?, ?)",
+            [(i, i % 3 + 1, f"0x{i:040x}", f"GA-{i}") for i in range(1, tickets + 1)],
+        )
+        conn.commit()
+    db.close_pool()
+
+
+def start_server(workers, port, env):
+    env = dict(env, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    import httpx
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"server with {workers} workers did not start")
+
+
+def run_client(url, path, duration, concurrency, tickets):
+    """One load-generator process: returns completed requests"""
+    import httpx
+
+    async def drive():
+        done = 0
+        deadline = time.perf_counter() + duration
+        async with httpx.AsyncClient(base_url=url, limits=httpx.Limits(max_connections=concurrency)) as client:
+            async def worker():
+                nonlocal done
+                while time.perf_counter() < deadline:
+                    response = await client.get(PATHS[path](tickets))
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{path} returned {response.status_code}")
+                    done += 1
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return done
+
+    return asyncio.run(drive())
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Multi-worker scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, cores}))
+    parser.add_argument("--clients", type=int, default=cores, help="Load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="Connections per client")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--tickets", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("📊 Multi-worker scaling")
+    print("=" * 50)
+    print(f"{cores} core(s), {args.clients} load-generator process(es) x {args.concurrency} connections")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_PATH=os.path.join(tmp, "bench.db"),
+            SHARED_STATE_BACKEND="local",
+            VERIFICATION_PRELOAD_EVENTS="1,2,3",
+        )
+        prepare_database(env["DATABASE_PATH"], args.tickets)
+
+        baseline = {}
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            for workers in args.workers:
+                port = free_port()
+                server = start_server(workers, port, env)
+                try:
+                    print(f"\n{workers} worker(s)")
+                    for path in PATHS:
+                        counts = pool.starmap(run_client, [
+                            (f"http://127.0.0.1:{port}", path, args.duration, args.concurrency, args.tickets)
+                        ] * args.clients)
+                        rps = sum(counts) / args.duration
+                        baseline.setdefault(path, rps)
+                        print(f"   {path:<14} {rps:>9,.0f} req/s   x{rps / baseline[path]:.2f}")
+                finally:
+                    server.terminate()
+                    server.wait()
+
+
+if __name__ == "__main__":
+    main()
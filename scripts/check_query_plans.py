@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the NFT Ticketing backend
+
+Builds a fresh database with init_database (base tables plus every
+migration), runs each hot query function from backend/ against it with a
+trace callback, and EXPLAIN QUERY PLANs every statement it issued. The
+check fails if any statement falls back to a full table scan, or if a
+query stops using the index it is expected to use.
+
+Exit status is non-zero on failure, so it can gate CI.
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+FULL_SCAN = re.compile(r"^SCAN \S+$")
+ADDRESS = "0x742d35cc6634c0532925a3b8d4c9db96590b5b8c"
+
+
+def hot_queries(repository, inventory, verification_index):
+    """(label, callable(conn), index names each plan must mention)"""
+    import analytics
+    from pagination import encode_cursor
+
+    index = verification_index.VerificationIndex()
+    return [
+        ("get_events", lambda conn: repository.fetch_events(
+            conn, list(repository.EVENT_COLUMNS), None, 50), ["idx_events_date"]),
+        ("get_events (next page)", lambda conn: repository.fetch_events(
+            conn, list(repository.EVENT_COLUMNS), encode_cursor(["2024-03-15", 1]), 50), ["idx_events_date"]),
+        ("get_event", lambda conn: repository.fetch_event(conn, 1), ["INTEGER PRIMARY KEY"]),
+        ("get_user_orders", lambda conn: repository.fetch_user_orders(
+            conn, ADDRESS, list(repository.ORDER_COLUMNS), None, 50), ["idx_orders_user_keyset"]),
+        ("get_user_orders (next page)", lambda conn: repository.fetch_user_orders(
+            conn, ADDRESS, list(repository.ORDER_COLUMNS), encode_cursor(["2024-03-15 19:00:00", 10]), 50),
+            ["idx_orders_user_keyset"]),
+        ("get_user_tickets", lambda conn: repository.fetch_user_tickets(
+            conn, ADDRESS, list(repository.TICKET_COLUMNS), None, 50), ["idx_tickets_owner"]),
+        ("verify_ticket", lambda conn: repository.lookup_ticket(conn, 1), ["INTEGER PRIMARY KEY"]),
+        ("reserve_seats", lambda conn: inventory.reserve_seats(conn, 1, 1), ["INTEGER PRIMARY KEY"]),
+        ("release_expired_holds", lambda conn: inventory.release_expired_holds(conn), ["idx_seat_holds_expires_at"]),
+        ("write_verification_logs", lambda conn: repository.write_verification_logs(
+            conn, [(1, None, "valid", "2024-03-15 19:00:00")]), ["INTEGER PRIMARY KEY"]),
+        ("verification_index.load", lambda conn: index.load(conn, 1), ["idx_tickets_event"]),
+        ("redeem_tickets", lambda conn: repository.redeem_tickets(conn, [1, 2, 3], 1), ["INTEGER PRIMARY KEY"]),
+        ("scan snapshot build", lambda conn: repository.load_ticket_statuses(conn, 1),
+            ["idx_ticket_changes_event", "idx_tickets_event"]),
+        ("scan snapshot delta", lambda conn: repository.load_ticket_changes(conn, 1, 0), ["idx_ticket_changes_event"]),
+        ("sales by event", lambda conn: repository.sales_report(
+            conn, "event", "confirmed", None, None, None), ["idx_orders_sales"]),
+        ("sales by day", lambda conn: repository.sales_report(
+            conn, "day", "confirmed", 1, "2024-03-01 00:00:00", None), ["idx_orders_sales"]),
+        ("convert_prices", lambda conn: repository.convert_prices(conn), ["idx_orders_unpriced"]),
+        # The all-events dashboard reads sales_totals/scan_totals whole: one row per event and seat type
+        ("event analytics", lambda conn: repository.analytics_rows(conn, analytics.totals_queries(1)),
+            ["sales_totals USING PRIMARY KEY", "INTEGER PRIMARY KEY"]),
+        ("event analytics hourly", lambda conn: repository.analytics_rows(
+            conn, analytics.hourly_queries(1, "2024-03-01 00:00:00", None)),
+            ["sales_rollup USING PRIMARY KEY", "scan_rollup USING PRIMARY KEY"]),
+    ]
+
+
+class NoCommit:
+    """Connection proxy that turns commit() into a no-op"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def commit(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def capture(conn, fn):
+    """Run fn(conn) and return the SQL it executed, rolling back any writes"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        fn(NoCommit(conn))
+    except Exception:
+        pass
+    finally:
+        conn.set_trace_callback(None)
+        conn.rollback()
+    return [
+        sql for sql in statements
+        if sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE")
+    ]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "plans.db")
+        import db
+        import inventory
+        import main as app_main
+        import repository
+        import verification_index
+        from migrations import MIGRATIONS, schema_version
+
+        app_main.init_database()
+        app_main.seed_database()
+
+        print("🔎 Query plan check")
+        print("=" * 50)
+
+        with app_main.get_db() as conn:
+            version = schema_version(conn)
+            latest = MIGRATIONS[-1][0]
+            if version != latest:
+                print(f"❌ schema version {version}, expected {latest}")
+                failures += 1
+
+            for label, fn, expected in hot_queries(repository, inventory, verification_index):
+                plans = []
+                for sql in capture(conn, fn):
+                    plan = [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+                    plans.append((sql, plan))
+
+                problems = []
+                for sql, plan in plans:
+                    for detail in plan:
+                        if FULL_SCAN.match(detail):
+                            problems.append(f"full scan: {detail}")
+                details = " | ".join(detail for _, plan in plans for detail in plan)
+                for name in expected:
+                    if name not in details:
+                        problems.append(f"expected {name}")
+                if not plans:
+                    problems.append("no statements captured")
+
+                if problems:
+                    failures += 1
+                    print(f"❌ {label}")
+                    for problem in problems:
+                        print(f"     {problem}")
+                    for sql, plan in plans:
+                        print(f"     {' '.join(sql.split())[:100]}")
+                        for detail in plan:
+                            print(f"       -> {detail}")
+                else:
+                    print(f"✅ {label}: {details}")
+
+        db.close_pool()
+
+    if failures:
+        print(f"\n{failures} query plan check(s) failed")
+        sys.exit(1)
+    print("\nAll hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Storage backend conformance check
+
+Runs the same API scenario against every configured repository backend
+and reports each check per backend:
+
+- sqlite: a fresh database file in a temporary directory
+- postgresql: --postgres-url, or else an embedded throwaway server from
+  the ``pgserver`` package (pip install pgserver) if it is installed
+
+Each backend runs in its own process, because DATABASE_URL is read at
+import time. The scenario drives the in-process app over ASGI: schema
+creation and seeding, catalog pagination, wallet login, purchases
+(including a concurrent sell-out), orders and tickets pages, the
+blockchain indexer fixture, gate scans, exports, the verification page,
+batch redemption, offline scanner snapshots, logout revocation, nonce
+persistence, hold expiry, organizer analytics, bulk imports, the live
+availability stream, /metrics and the profiler.
+
+Exit status is non-zero if any check fails on any backend.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "event_ticket_logs.json")
+
+ADMIN_KEY = "conformance-admin-key"
+HOLD_TTL = 2  # seconds; short so the expiry check does not take long
+BUYER = "0x70997970c51812dc3a010c7d01b50e0d17dc79c8"
+RESALE_BUYER = "0x3c44cdddb6a900fa2b585dd299e03d12fa4293bc"
+FIXTURE_TX = {BUYER: "0x" + "a1" * 32, RESALE_BUYER: "0x" + "b2" * 32}
+
+
+async def scenario(checks):
+    import httpx
+    import jwt
+    from coincurve import PrivateKey
+
+    import indexer
+    import main
+    import metrics
+    import pagination
+    import scan_snapshot
+    import signatures
+    from catalog_cache import EventCatalogCache
+    from nonce_store import NonceStore
+    from token_cache import RevocationList
+    from verification_log import VerificationLogWriter, verification_log
+
+    def check(name, passed):
+        checks.append((name, bool(passed)))
+
+    def auth(address):
+        return {"Authorization": f"Bearer {main.create_jwt_token(address)}"}
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            # Catalog
+            page = (await client.get("/events", params={"limit": 2})).json()
+            rest = (await client.get("/events", params={"limit": 2, "cursor": page["next_cursor"]})).json()
+            events = page["events"] + rest["events"]
+            check("seeded catalog paginates by date", [e["date"] for e in events] == ["2024-03-15", "2024-03-22", "2024-04-01"]
+                  and rest["next_cursor"] is None)
+            event = (await client.get("/events/1")).json()
+            check("event detail decodes JSON columns", event["name"] == "Neon Dreams Festival" and len(event["artists"]) == 4)
+            only = (await client.get("/events", params={"limit": 1, "fields": "artists"})).json()["events"]
+            check("event pages splice JSON columns", all(isinstance(e["features"], list) for e in events)
+                  and only == [{"artists": event["artists"]}])
+            pages = EventCatalogCache(ttl=60, max_pages=2)
+            pages.store_events("first", b"[]", pages.generation)
+            pages.store_events("cursor 1", b"[]", pages.generation)
+            pages.get_events("first")
+            pages.store_events("cursor 2", b"[]", pages.generation)
+            check("catalog page cache evicts the least recently used", pages.get_events("first") is not None
+                  and pages.get_events("cursor 1") is None and pages.get_events("cursor 2") is not None)
+            check("unknown event is 404", (await client.get("/events/999")).status_code == 404)
+            crafted = [(await client.get("/events", params={"cursor": pagination.encode_cursor(values)})).status_code
+                       for values in ([{"a": 1}, 2], [[1], 2], ["2024-03-15", 2 ** 64])]
+            check("crafted cursor is 400", crafted == [400, 400, 400])
+            check("prices formatted from integer gwei", event["price"] == "0.05 ETH"
+                  and event["price_wei"] == "50000000000000000"
+                  and [e["price"] for e in events] == ["0.05 ETH", "0.03 ETH", "0.08 ETH"])
+
+            # Wallet login
+            key = PrivateKey()
+            address = "0x" + signatures.keccak256(key.public_key.format(compressed=False)[1:])[-20:].hex()
+            issued = (await client.get("/auth/nonce", params={"address": address})).json()
+            raw = key.sign_recoverable(signatures.personal_message_hash(issued["message"]), hasher=None)
+            signature = "0x" + (raw[:64] + bytes([raw[64] + 27])).hex()
+            forged = await client.post("/auth/verify", json={"address": address, "signature": "0x" + "11" * 65,
+                                                              "message": issued["message"]})
+            again = (await client.get("/auth/nonce", params={"address": address})).json()
+            check("bad signature and re-request keep the nonce", forged.status_code == 401
+                  and again["nonce"] == issued["nonce"])
+            login = await client.post("/auth/verify", json={"address": address, "signature": signature,
+                                                             "message": issued["message"]})
+            check("signed login returns a JWT", login.status_code == 200 and login.json()["address"] == address)
+            replay = await client.post("/auth/verify", json={"address": address, "signature": signature,
+                                                              "message": issued["message"]})
+            check("nonce is single use", replay.status_code == 400)
+            user = {"Authorization": f"Bearer {login.json()['token']}"}
+
+            # Purchases and the orders page
+            responses = [
+                await client.post("/purchase", headers=user, json={
+                    "event_id": 1, "quantity": 2, "seat_type": "general", "tx_hash": f"0x{n:064x}"})
+                for n in range(3)
+            ]
+            check("purchase prices the order", [r.json().get("total_price") for r in responses] == ["0.100 ETH"] * 3
+                  and responses[0].json()["total_price_wei"] == "100000000000000000")
+            sold = (await client.get("/events/1")).json()["sold"]
+            check("purchase reserves seats", sold == 3247 + 6)
+            missing = await client.post("/purchase", headers=user, json={
+                "event_id": 999, "quantity": 1, "seat_type": "general", "tx_hash": "0x0"})
+            check("purchase of unknown event is 404", missing.status_code == 404)
+            too_many = await client.post("/purchase", headers=user, json={
+                "event_id": 2, "quantity": 10000, "seat_type": "general", "tx_hash": "0x0"})
+            check("purchase beyond capacity is 400", too_many.status_code == 400)
+
+            first = (await client.get("/orders", headers=user, params={"limit": 2})).json()
+            second = (await client.get("/orders", headers=user, params={"limit": 2, "cursor": first["next_cursor"]})).json()
+            ids = [o["id"] for o in first["orders"] + second["orders"]]
+            check("orders page newest first across cursors", ids == sorted(ids, reverse=True) and len(ids) == 3
+                  and second["next_cursor"] is None)
+            projected = (await client.get("/orders", headers=user, params={"fields": "id,event_name"})).json()
+            check("orders field projection joins events", set(projected["orders"][0]) == {"id", "event_name"}
+                  and projected["orders"][0]["event_name"] == "Neon Dreams Festival")
+
+            # Concurrent sell-out of the 211 seats left for event 3
+            results = await asyncio.gather(*(
+                client.post("/purchase", headers=auth(f"0x{n:040x}"), json={
+                    "event_id": 3, "quantity": 2, "seat_type": "general", "tx_hash": f"0x{n:064x}"})
+                for n in range(120)
+            ))
+            accepted = sum(r.status_code == 200 for r in results)
+            sold = (await client.get("/events/3")).json()["sold"]
+            check("concurrent purchases never oversell", accepted == 105 and sold == 2789 + 2 * accepted
+                  and all(r.status_code in (200, 400) for r in results))
+
+            # Blockchain indexer fixture: mints confirm the orders that paid for them
+            for buyer, quantity, event_id in ((BUYER, 2, 1), (RESALE_BUYER, 1, 2)):
+                await client.post("/purchase", headers=auth(buyer), json={
+                    "event_id": event_id, "quantity": quantity, "seat_type": "general", "tx_hash": FIXTURE_TX[buyer]})
+            ingested = await indexer.Indexer(indexer.FixtureSource(FIXTURE), confirmations=2, batch_blocks=3,
+                                             start_block=100, on_batch=main.apply_indexed_changes).run_once()
+            check("indexer ingests the fixture", ingested == 9)
+            check("indexer checkpoint saved", await main.repository.load_checkpoint(indexer.CHECKPOINT_NAME, -1) == 108)
+            orders = (await client.get("/orders", headers=auth(BUYER), params={"fields": "status,token_ids"})).json()
+            check("minted order confirmed with token ids", orders["orders"][0]["status"] == "confirmed"
+                  and json.loads(orders["orders"][0]["token_ids"]) == [1, 2])
+            tickets = (await client.get("/tickets", headers=auth(RESALE_BUYER))).json()["tickets"]
+            check("resold ticket listed for its new owner", 2 in [t["tokenId"] for t in tickets])
+
+            # Gate scans, from the database and from the preloaded index
+            scan = (await client.get("/verify/1")).json()
+            check("scan reads ticket status", scan["is_valid"] and scan["ticket"]["status"] == "used")
+            check("unknown ticket is invalid", not (await client.get("/verify/999999")).json()["is_valid"])
+            admin = {"X-Admin-Key": ADMIN_KEY}
+            preload = (await client.post("/admin/verification-index/1", headers=admin)).json()
+            check("verification index preloads an event", preload.get("tickets") == 2)
+            scan = (await client.get("/verify/2")).json()
+            check("indexed scan answers from memory", scan["ticket"]["owner"] == RESALE_BUYER
+                  and main.verification_index.hits > 0)
+            await verification_log.flush()
+
+            # Exports
+            export = await client.get("/admin/export/verification_logs", headers=admin)
+            rows = [json.loads(line) for line in export.text.splitlines()]
+            check("NDJSON export streams flushed scans", len(rows) == 3 and rows[0]["token_id"] == 1)
+            export = await client.get("/admin/export/tickets", headers=admin, params={"format": "csv", "event_id": 1})
+            lines = export.text.splitlines()
+            check("CSV export filters by event", lines[0].startswith("token_id,") and len(lines) == 3)
+            # An hour ago, written at +05:00: four hours ahead if the offset were dropped
+            since = (datetime.now(timezone.utc) - timedelta(hours=1)).astimezone(timezone(timedelta(hours=5)))
+            export = await client.get("/admin/export/verification_logs", headers=admin,
+                                      params={"since": since.isoformat()})
+            check("export bounds honour UTC offsets", len(export.text.splitlines()) == 3)
+
+            # A database outage: the log keeps only the newest max_pending scans
+            backlog = VerificationLogWriter(max_pending=3)
+
+            async def outage(entries):
+                raise ConnectionError("database unavailable")
+
+            main.repository.write_verification_logs = outage
+            try:
+                for token_id in range(5):
+                    backlog.submit(token_id, "valid")
+                try:
+                    await backlog.flush()
+                except ConnectionError:
+                    pass
+            finally:
+                del main.repository.write_verification_logs
+            check("log backlog capped during an outage", backlog.stats()["dropped"] == 2
+                  and [entry[0] for entry in backlog._take()] == [2, 3, 4])
+            page = await client.get("/verify/1/page", headers={"Accept-Encoding": "gzip"})
+            check("verification page renders the ticket", "Valid Ticket" in page.text and "Used" in page.text
+                  and page.headers.get("content-encoding") == "gzip")
+
+            # Batch redemption at the gate
+            minted = [(token_id, 3, BUYER, f"GA-{token_id}") for token_id in range(1000, 1200)]
+            await main.repository.apply_chain_changes({"mints": minted, "transfers": [], "used": [], "verified": [],
+                                                       "minted_by_tx": {}}, None, None)
+            batch = (await client.post("/verify/batch", headers=admin, json={
+                "token_ids": [1000, 1001, 1001, 1, 999999]})).json()
+            wrong_event = (await client.post("/verify/batch", headers=admin, json={
+                "token_ids": [1002], "event_id": 1})).json()
+            check("batch redeems and reports per ticket", [r["result"] for r in batch["results"]] == [
+                "redeemed", "redeemed", "duplicate", "already_used", "not_found"] and batch["redeemed"] == 2
+                  and wrong_event["results"][0]["result"] == "wrong_event")
+            rolled_back = (await client.post("/verify/batch", headers=admin, json={
+                "token_ids": [1002, 1000], "all_or_nothing": True})).json()
+            again = (await client.post("/verify/batch", headers=admin, json={"token_ids": [1002]})).json()
+            check("all-or-nothing batch rolls back", [r["result"] for r in rolled_back["results"]] == [
+                "not_redeemed", "already_used"] and again["redeemed"] == 1)
+            overlapping = await asyncio.gather(*(
+                client.post("/verify/batch", headers=admin, json={"token_ids": list(range(1003 + n, 1200, 2))})
+                for n in (0, 1, 0, 1)
+            ))
+            redeemed = [r["token_id"] for response in overlapping for r in response.json()["results"]
+                        if r["result"] == "redeemed"]
+            check("concurrent batches redeem each ticket once", sorted(redeemed) == list(range(1003, 1200)))
+            check("batch requires the admin key", (await client.post("/verify/batch", json={"token_ids": [1]})).status_code == 403)
+
+            # Offline scanner snapshots and deltas
+            full = await client.get("/events/3/scan-snapshot", headers=admin)
+            snapshot = scan_snapshot.decode(full.content, signer=full.headers["x-snapshot-signer"])
+            check("signed full snapshot lists event tickets", snapshot["kind"] == "full" and snapshot["version"] > 0
+                  and {snapshot["tickets"][t] for t in range(1000, 1200)} == {"used"})
+            await main.repository.apply_chain_changes({
+                "mints": [(t, 3, BUYER, f"GA-{t}") for t in range(1200, 1205)], "transfers": [], "used": [],
+                "verified": [], "minted_by_tx": {}}, None, None)
+            await client.post("/verify/batch", headers=admin, json={"token_ids": [1200]})
+            delta = await client.get("/events/3/scan-snapshot", headers=admin, params={"since": snapshot["version"]})
+            changes = scan_snapshot.decode(delta.content, signer=full.headers["x-snapshot-signer"])
+            check("delta carries only later changes", changes["kind"] == "delta" and changes["tickets"] == {
+                1200: "used", 1201: "active", 1202: "active", 1203: "active", 1204: "active"}
+                  and changes["version"] > snapshot["version"])
+            refreshed = scan_snapshot.decode((await client.get("/events/3/scan-snapshot", headers=admin)).content)
+            check("cached snapshot moves forward incrementally", refreshed["version"] == changes["version"]
+                  and len(refreshed["tickets"]) == 205 and main.scan_snapshots.refreshes > 0)
+            tampered = bytearray(full.content)
+            tampered[30] ^= 1
+            try:
+                scan_snapshot.decode(bytes(tampered), signer=full.headers["x-snapshot-signer"])
+                check("tampered snapshot rejected", False)
+            except ValueError:
+                check("tampered snapshot rejected", True)
+            wide = array("q", [5, 6, 6 + 2 ** 40])
+            wide_body = scan_snapshot.encode(scan_snapshot.signer_key("check"), scan_snapshot.FULL, 3, 1, 0, wide,
+                                             bytearray(3))
+            check("snapshot with 64-bit gaps round-trips", wide_body[4] == 2 and
+                  list(scan_snapshot.decode(wide_body)["tickets"]) == list(wide))
+
+            # Logout, and revocations/nonces as a restarted worker would reload them
+            logout = await client.post("/auth/logout", headers=user)
+            after = await client.get("/orders", headers=user)
+            check("logout revokes the token", logout.status_code == 200 and after.status_code == 401)
+            revocations = RevocationList()
+            check("revocation persisted", await revocations.load() == 1)
+            legacy = {"Authorization": "Bearer " + jwt.encode(
+                {"address": BUYER, "exp": int(time.time()) + 3600}, main.JWT_SECRET, algorithm=main.JWT_ALGORITHM)}
+            logout = await client.post("/auth/logout", headers=legacy)
+            after = await client.get("/orders", headers=legacy)
+            check("logout revokes a token without a jti", logout.status_code == 200 and after.status_code == 401)
+            store = NonceStore(persist_interval=1)
+            nonce = store.issue(BUYER)
+            await store.persist()
+            restarted = NonceStore()
+            await restarted.load()
+            check("nonce persisted across restart", restarted.take(BUYER, nonce) == nonce)
+
+            # Sales reports agree with the orders they sum
+            dump = await client.get("/admin/export/orders", headers=admin)
+            pending = [order for order in map(json.loads, dump.text.splitlines()) if order["status"] == "pending"]
+            by_event = (await client.get("/admin/sales/events", headers=admin, params={"status": "pending"})).json()
+            expected = {}
+            for order in pending:
+                orders, tickets, revenue = expected.get(order["event_id"], (0, 0, 0))
+                expected[order["event_id"]] = (orders + 1, tickets + order["quantity"], revenue + order["total_price_gwei"])
+            check("sales per event summed in SQL", {
+                row["event_id"]: (row["orders"], row["tickets"], int(row["revenue_wei"]) // 10 ** 9)
+                for row in by_event["events"]} == expected and by_event["events"][0]["event_name"] == "Neon Dreams Festival")
+            daily = (await client.get("/admin/sales/daily", headers=admin,
+                                      params={"status": "pending", "event_id": 3, "since": "2000-01-01"})).json()
+            check("daily sales filter by event", len(daily["days"]) == 1 and daily["days"][0]["tickets"] == expected[3][1]
+                  and daily["days"][0]["revenue"] == f"{expected[3][2] / 10 ** 9:.3f} ETH")
+            check("sales reports require the admin key", (await client.get("/admin/sales/events")).status_code == 403)
+
+            # Hold expiry returns unconfirmed seats
+            before = (await client.get("/events/2")).json()["sold"]
+            user = auth(address)
+            await client.post("/purchase", headers=user, json={
+                "event_id": 2, "quantity": 4, "seat_type": "general", "tx_hash": "0x" + "cc" * 32})
+            await asyncio.sleep(HOLD_TTL + 0.1)
+            released = await main.repository.release_expired_holds()
+            main.catalog_cache.invalidate()
+            after = (await client.get("/events/2")).json()["sold"]
+            check("expired holds are released", 2 in released and after == before)
+            failed = (await client.get("/orders", headers=user, params={"fields": "status", "limit": 1})).json()
+            check("expired order marked failed", failed["orders"][0]["status"] == "failed")
+
+            # Organizer analytics: rollups kept in step with every write above
+            await verification_log.flush()
+            dump = await client.get("/admin/export/orders", headers=admin)
+            confirmed = [order for order in map(json.loads, dump.text.splitlines()) if order["status"] == "confirmed"]
+            dashboard = (await client.get("/admin/analytics/events", headers=admin)).json()["events"]
+            check("dashboard sales match the orders", {
+                stats["event_id"]: stats["sold"] for stats in dashboard if stats["sold"]} == {
+                order["event_id"]: order["quantity"] for order in confirmed})
+            stats = (await client.get("/admin/analytics/events/1", headers=admin)).json()
+            logs = [json.loads(line) for line in
+                    (await client.get("/admin/export/verification_logs", headers=admin)).text.splitlines()]
+            check("event stats count sales and scans", stats["sold"] == 2 and stats["revenue"] == "0.100 ETH"
+                  and stats["avg_ticket_price"] == "0.050 ETH" and stats["seat_types"][0]["seat_type"] == "general"
+                  and stats["scans"]["valid"] == sum(log["token_id"] in (1, 2) and log["status"] == "valid" for log in logs))
+            hourly = (await client.get("/admin/analytics/events/2/hourly", headers=admin,
+                                       params={"since": "2000-01-01"})).json()
+            check("hourly rollup splits order statuses", {row["status"] for row in hourly["sales"]} == {
+                "pending", "confirmed", "failed"})
+            # A token scanned before the indexer mints it stays counted under event 0
+            await client.get("/verify/777777")
+            await verification_log.flush()
+            await main.repository.apply_chain_changes({"mints": [(777777, 3, BUYER, "GA-777777")], "transfers": [],
+                                                       "used": [], "verified": [], "minted_by_tx": {}}, None, None)
+            consistency = (await client.post("/admin/analytics/check", headers=admin)).json()
+            check("rollups match the raw tables", consistency["consistent"] and not consistency["repaired"])
+            check("analytics require the admin key", (await client.get("/admin/analytics/events")).status_code == 403)
+
+            # Bulk import: one transaction per file, caches and rollups kept in step
+            await client.get("/events", params={"limit": 50})
+            imported = await client.post("/admin/import/events", headers=admin, content="\n".join(json.dumps({
+                "name": f"Imported {n}", "date": "2030-01-01", "time": "20:00", "venue": "Hall", "location": "Town",
+                "price": "0.02 ETH", "capacity": 10, "sold": 2}) for n in range(2)))
+            catalog = (await client.get("/events", params={"limit": 50})).json()["events"]
+            event_id = max(event["id"] for event in catalog)
+            check("imported events served past the cache", imported.json()["rows"] == 2
+                  and [event["name"] for event in catalog[-2:]] == ["Imported 0", "Imported 1"]
+                  and catalog[-1]["price"] == "0.02 ETH")
+            tickets_csv = "token_id,event_id,owner_address,seat\n" + "".join(
+                f"{token_id},{event_id},{BUYER},I-{token_id}\n" for token_id in (900001, 900002))
+            imported = await client.post("/admin/import/tickets", headers=admin, params={"format": "csv"},
+                                         content=tickets_csv)
+            check("imported tickets verify", imported.json()["rows"] == 2
+                  and (await client.get("/verify/900001")).json()["is_valid"])
+            duplicate = await client.post("/admin/import/tickets", headers=admin, params={"format": "csv"},
+                                          content=tickets_csv.replace("900001", "900003"))
+            check("duplicate rejects the whole file", duplicate.status_code == 400
+                  and not (await client.get("/verify/900003")).json()["is_valid"])
+            oversold = await client.post("/admin/import/events", headers=admin, content="\n".join(json.dumps({
+                "name": "Oversold", "date": "2030-01-01", "time": "20:00", "venue": "Hall", "location": "Town",
+                "price": "0.02 ETH", "capacity": 10, "sold": sold}) for sold in (10, 11)))
+            check("event sold past capacity rejected by line", oversold.status_code == 400
+                  and oversold.json()["detail"] == "line 2: sold 11 exceeds capacity 10"
+                  and len((await client.get("/events", params={"limit": 50})).json()["events"]) == len(catalog))
+            garbled = await client.post("/admin/import/tickets", headers=admin, params={"format": "csv"},
+                                        content="token_id,event_id,owner_address,seat,created_at\n"
+                                                f"900004,{event_id},{BUYER},I-900004,abcd-ef-gh ij:kl:mn\n")
+            check("malformed created_at rejected", garbled.status_code == 400
+                  and garbled.json()["detail"].startswith("line 2:"))
+            imported = await client.post("/admin/import/orders", headers=admin, content=json.dumps({
+                "user_address": BUYER, "event_id": event_id, "quantity": 2, "seat_type": "general",
+                "total_price": "0.04 ETH", "token_ids": [900001, 900002], "created_at": "2030-01-01T19:00:00Z"}))
+            stats = (await client.get(f"/admin/analytics/events/{event_id}", headers=admin)).json()
+            consistency = (await client.post("/admin/analytics/check", headers=admin)).json()
+            check("imported orders reach the rollups", imported.json()["rows"] == 1 and stats["revenue"] == "0.040 ETH"
+                  and consistency["consistent"])
+            check("imports require the admin key", (await client.post("/admin/import/orders", content="")).status_code == 403)
+
+            # Live availability: driven over raw ASGI, since the stream never completes
+            frames, gone = [], asyncio.Event()
+
+            async def receive():
+                if not frames:
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await gone.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                frames.append(message.get("body", b""))
+
+            stream = asyncio.create_task(main.app({
+                "type": "http", "method": "GET", "path": "/events/1/availability/stream", "raw_path": b"",
+                "query_string": b"", "root_path": "", "headers": [], "scheme": "http", "http_version": "1.1",
+            }, receive, send))
+            while len(frames) < 2:
+                await asyncio.sleep(0.01)
+            before = (await client.get("/events/1")).json()["sold"]
+            await client.post("/purchase", headers=auth(BUYER), json={
+                "event_id": 1, "quantity": 3, "seat_type": "general", "tx_hash": "0x" + "c3" * 32})
+            await main.availability_feed.tick()
+            while len(frames) < 3:
+                await asyncio.sleep(0.01)
+            gone.set()
+            await stream
+            check("availability stream pushes the new sold count", b'"sold":%d' % before in frames[1]
+                  and b'"event_id":1,"capacity":5000,"sold":%d' % (before + 3) in frames[2])
+            missing = await client.get("/events/999/availability/stream")
+            check("availability stream of unknown event is 404", missing.status_code == 404)
+
+            # Observability: request and SQL metrics of everything above
+            exposition = (await client.get("/metrics")).text
+            check("metrics time requests per route template", 'http_request_duration_seconds_count{method="GET",'
+                  'route="/events/{event_id}"}' in exposition
+                  and 'http_responses_total{method="GET",route="/events/{event_id}",status="404"} 1' in exposition)
+            check("metrics time SQL statements", 'db_query_duration_seconds_count{statement="SELECT events"}'
+                  in exposition and "cache_hits_total" in exposition)
+            threshold, metrics.DB_SLOW_QUERY_MS = metrics.DB_SLOW_QUERY_MS, 0
+            try:
+                main.catalog_cache.invalidate()
+                await client.get("/events/2")
+            finally:
+                metrics.DB_SLOW_QUERY_MS = threshold
+            slow = await client.get("/admin/metrics/slow-queries", headers=admin)
+            check("slow queries listed for admins", any("FROM events" in query["sql"] for query in slow.json()["queries"])
+                  and (await client.get("/admin/metrics/slow-queries")).status_code == 403)
+            started = (await client.post("/admin/profiler/start", headers=admin, params={"interval_ms": 1})).json()
+            await asyncio.sleep(0.05)
+            stopped = (await client.post("/admin/profiler/stop", headers=admin)).json()
+            folded = (await client.get("/admin/profiler/folded", headers=admin)).text
+            check("profiler samples while switched on", started["running"] and not stopped["running"]
+                  and stopped["samples"] > 0 and folded.count("\n") == stopped["stacks"])
+    finally:
+        await main.shutdown_event()
+
+
+def run_backend():
+    """Child process: run the scenario against DATABASE_URL and print JSON results"""
+    sys.path.insert(0, BACKEND_DIR)
+    checks = []
+    try:
+        asyncio.run(scenario(checks))
+    except Exception as exc:
+        checks.append((f"scenario crashed: {exc!r}", False))
+    print(json.dumps(checks))
+
+
+def start_embedded_postgres(directory):
+    try:
+        import pgserver
+    except ImportError:
+        return None, None
+    server = pgserver.get_server(directory, cleanup_mode="stop")
+    return server, server.get_uri()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repository backend conformance check")
+    parser.add_argument("--backend", choices=["all", "sqlite", "postgresql"], default="all")
+    parser.add_argument("--postgres-url", default=os.getenv("CHECK_POSTGRES_URL", ""),
+                        help="Empty database to use (default: embedded pgserver)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_backend()
+        return
+
+    print("🔎 Repository conformance")
+    print("=" * 50)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = {}
+        server = None
+        if args.backend in ("all", "sqlite"):
+            urls["sqlite"] = f"sqlite:///{os.path.join(tmp, 'check.db')}"
+        if args.backend in ("all", "postgresql"):
+            url = args.postgres_url
+            if not url:
+                server, url = start_embedded_postgres(os.path.join(tmp, "pgdata"))
+            if url:
+                urls["postgresql"] = url
+            else:
+                print("⚠️  postgresql skipped: pass --postgres-url or pip install pgserver")
+                failed |= args.backend == "postgresql"
+
+        try:
+            for backend, url in urls.items():
+                env = {name: value for name, value in os.environ.items() if name != "DATABASE_PATH"}
+                env.update(
+                    DATABASE_URL=url,
+                    SHARED_STATE_BACKEND="memory",
+                    SHARED_STATE_PATH=os.path.join(tmp, f"{backend}.state"),
+                    ADMIN_API_KEY=ADMIN_KEY,
+                    INVENTORY_HOLD_TTL=str(HOLD_TTL),
+                    VERIFICATION_PRELOAD_EVENTS="",
+                )
+                start = time.perf_counter()
+                child = subprocess.run([sys.executable, __file__, "--child"], env=env, cwd=BACKEND_DIR,
+                                       capture_output=True, text=True)
+                elapsed = time.perf_counter() - start
+                print(f"\n{backend} ({elapsed:.1f} s)")
+                try:
+                    checks = json.loads(child.stdout.strip().splitlines()[-1])
+                except (IndexError, ValueError):
+                    checks = [("scenario did not report results", False)]
+                    print(child.stderr[-2000:])
+                for name, passed in checks:
+                    print(f"   {'✅' if passed else '❌'} {name}")
+                    failed |= not passed
+        finally:
+            if server is not None:
+                server.cleanup()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Load test for the NFT Ticketing API
+
+Drives concurrent /events, /events/{id} and /verify/{token_id} requests
+and reports throughput and p50/p99 latency.
+
+By default the FastAPI app runs in-process (no network) and each run is
+repeated with database work executed inline on the event loop ("blocking",
+the pre-executor behaviour) and through the DB thread pool ("async").
+In-process requests never yield while SQLite works, so the blocking run
+hides queueing delay; use --url against servers started with
+DB_EXECUTOR_WORKERS=0 and with the default to compare real latencies.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+async def drive(client, paths, requests_total, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests_total):
+        queue.put_nowait(random.choice(paths)())
+
+    async def worker():
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 99)
+
+
+async def drive_url(args):
+    import httpx
+
+    paths = [
+        lambda: "/events",
+        lambda: f"/events/{random.randint(1, 3)}",
+        lambda: f"/verify/{random.randint(1, args.tickets)}",
+    ]
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        print(f"\nlive server at {args.url}")
+        for concurrency in args.concurrency:
+            rps, p50, p99 = await drive(client, paths, args.requests, concurrency)
+            print(f"   c={concurrency:<4} {rps:>9,.0f} req/s   p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms")
+
+
+async def main_async(args):
+    import httpx
+
+    import db
+    import main
+
+    main.init_database()
+    main.seed_database()
+    with main.get_db() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tickets (token_id, event_id, owner_address, seat) VALUES (?, ?, ?, ?)",
+            [(i, i % 3 + 1, f"0x{i:040x}", f"GA-{i}") for i in range(1, args.tickets + 1)],
+        )
+        conn.commit()
+
+    paths = [
+        lambda: "/events",
+        lambda: f"/events/{random.randint(1, 3)}",
+        lambda: f"/verify/{random.randint(1, args.tickets)}",
+    ]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        for mode, workers in (("blocking", 0), ("async", args.workers)):
+            db.shutdown_executor()
+            db.DB_EXECUTOR_WORKERS = workers
+            print(f"\n{mode} data access (DB_EXECUTOR_WORKERS={workers})")
+            for concurrency in args.concurrency:
+                rps, p50, p99 = await drive(client, paths, args.requests, concurrency)
+                print(f"   c={concurrency:<4} {rps:>9,.0f} req/s   p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms")
+
+    db.shutdown_executor()
+    db.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test for the NFT Ticketing API")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--workers", type=int, default=8, help="DB executor threads for the async run")
+    parser.add_argument("--tickets", type=int, default=10000)
+    parser.add_argument("--url", help="Load test a running server instead of the in-process app")
+    args = parser.parse_args()
+
+    print("🧪 NFT Ticketing API load test")
+    print("=" * 50)
+
+    if args.url:
+        asyncio.run(drive_url(args))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "loadtest.db")
+        os.environ.setdefault("DB_POOL_SIZE", str(max(args.workers, 1)))
+        sys.path.insert(0, BACKEND_DIR)
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
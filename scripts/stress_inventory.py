@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Stress test for the seat inventory engine
+
+Fires hundreds of concurrent POST /purchase requests at a single event
+through the in-process FastAPI app and checks that the event is never
+oversold, that every reserved seat belongs to exactly one order, and that
+expired holds go back to inventory. Reports purchase throughput.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+async def run(args):
+    import httpx
+
+    import db
+    import inventory
+    import main
+
+    main.init_database()
+    with main.get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO events (name, date, time, venue, location, price, price_gwei, capacity, sold)
+            VALUES ('Stress Drop', '2024-05-01', '20:00', 'Test Hall', 'Nowhere', '0.05 ETH', 50000000, ?, 0)
+        """, (args.capacity,))
+        event_id = cursor.lastrowid
+        conn.commit()
+
+    buyers = [f"0x{n:040x}" for n in range(args.buyers)]
+    tokens = {buyer: main.create_jwt_token(buyer) for buyer in buyers}
+    outcomes = {"ok": 0, "sold_out": 0, "error": 0}
+
+    async def purchase(client, buyer):
+        response = await client.post(
+            "/purchase",
+            json={
+                "event_id": event_id,
+                "quantity": random.randint(1, args.max_quantity),
+                "seat_type": "general",
+                "tx_hash": f"0x{random.getrandbits(256):064x}",
+            },
+            headers={"Authorization": f"Bearer {tokens[buyer]}"},
+        )
+        if response.status_code == 200:
+            outcomes["ok"] += 1
+        elif response.status_code == 400:
+            outcomes["sold_out"] += 1
+        else:
+            outcomes["error"] += 1
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(purchase(client, buyer) for buyer in buyers))
+        elapsed = time.perf_counter() - start
+
+    with main.get_db() as conn:
+        sold = conn.execute("SELECT sold FROM events WHERE id = ?", (event_id,)).fetchone()[0]
+        ordered = conn.execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM orders WHERE event_id = ?", (event_id,)
+        ).fetchone()[0]
+        held = conn.execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM seat_holds WHERE event_id = ?", (event_id,)
+        ).fetchone()[0]
+
+        # Pretend no transaction ever confirmed: every hold must be released
+        inventory.release_expired_holds(conn, now=time.time() + inventory.HOLD_TTL + 1)
+        released_sold = conn.execute("SELECT sold FROM events WHERE id = ?", (event_id,)).fetchone()[0]
+
+    db.shutdown_executor()
+    db.close_pool()
+
+    print(f"buyers={args.buyers} capacity={args.capacity} max_quantity={args.max_quantity}")
+    print(f"   orders accepted:  {outcomes['ok']}")
+    print(f"   sold out (400):   {outcomes['sold_out']}")
+    print(f"   errors:           {outcomes['error']}")
+    print(f"   seats sold:       {sold} / {args.capacity}")
+    print(f"   throughput:       {args.buyers / elapsed:,.0f} purchases/s")
+    print(f"   sold after expiry: {released_sold}")
+
+    checks = [
+        ("no oversell", sold <= args.capacity),
+        ("sold matches orders", sold == ordered),
+        ("every order is held", held == ordered),
+        ("no request errors", outcomes["error"] == 0),
+        ("expired holds released", released_sold == 0),
+    ]
+    failed = False
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+        failed |= not passed
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent purchase stress test")
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--capacity", type=int, default=300)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    args = parser.parse_args()
+
+    print("🧪 Inventory stress test")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "stress.db")
+        sys.path.insert(0, BACKEND_DIR)
+        sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()